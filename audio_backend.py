@@ -0,0 +1,113 @@
+import logging
+import os
+
+from config import load_config
+
+
+class NullAudioBackend:
+    """Backend sem dispositivo de áudio, para execuções headless
+
+    Mantém o estado de reprodução (carregado, tocando, pausado) sem abrir
+    nenhum dispositivo, então o player continua funcional em servidores.
+    """
+
+    name = "null"
+
+    def __init__(self):
+        self.loaded_file = None
+        self.playing = False
+        self.paused = False
+        self.volume = 1.0
+
+    def load(self, file_path):
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+        self.loaded_file = file_path
+
+    def play(self):
+        self.playing = self.loaded_file is not None
+        self.paused = False
+
+    def pause(self):
+        self.paused = True
+
+    def unpause(self):
+        self.paused = False
+
+    def stop(self):
+        self.playing = False
+        self.paused = False
+
+    def get_busy(self):
+        return self.playing and not self.paused
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+    def quit(self):
+        self.stop()
+        self.loaded_file = None
+
+
+class PygameAudioBackend:
+    """Backend usando pygame.mixer, inicializado no primeiro uso"""
+
+    name = "pygame"
+
+    def __init__(self):
+        import pygame
+
+        self.pygame = pygame
+        self.pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=2048)
+        self.music = self.pygame.mixer.music
+
+    def load(self, file_path):
+        self.music.load(file_path)
+
+    def play(self):
+        self.music.play()
+
+    def pause(self):
+        self.music.pause()
+
+    def unpause(self):
+        self.music.unpause()
+
+    def stop(self):
+        self.music.stop()
+
+    def get_busy(self):
+        return self.music.get_busy()
+
+    def set_volume(self, volume):
+        self.music.set_volume(volume)
+
+    def quit(self):
+        self.pygame.mixer.quit()
+
+
+def create_audio_backend(name=None):
+    """Cria o backend de áudio configurado
+
+    Args:
+        name: "auto", "pygame" ou "null". Se omitido, usa a variável de
+            ambiente U2BE_AUDIO_BACKEND ou a opção "audio_backend" do config.
+            Em "auto", o pygame é usado se houver dispositivo de áudio e o
+            backend nulo caso contrário.
+    """
+    name = (
+        name
+        or os.getenv("U2BE_AUDIO_BACKEND")
+        or load_config().get("audio_backend", "auto")
+    )
+
+    if name == "null":
+        return NullAudioBackend()
+
+    try:
+        return PygameAudioBackend()
+    except Exception as e:
+        if name == "pygame":
+            raise
+        logging.warning(f"Dispositivo de áudio indisponível, usando backend nulo: {e}")
+        return NullAudioBackend()
@@ -4,6 +4,9 @@ import threading
 import logging
 import subprocess
 
+# Extensões de áudio reconhecidas pela biblioteca e pelo player
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".ogg", ".m4a")
+
 
 class SimpleAudioProcessor:
     """Processador de áudio simples usando ffmpeg para ajustes de pitch"""
@@ -203,6 +206,52 @@ class AsyncSimpleAudioProcessor:
         self.processor.cleanup()
 
 
+def stream_pcm(file_path, sample_rate=8000, chunk_samples=65536):
+    """Decodifica um arquivo com ffmpeg em blocos PCM mono (int16)
+
+    O áudio é lido do pipe do ffmpeg aos poucos, então o arquivo inteiro
+    nunca fica decodificado na memória.
+    """
+    import numpy as np
+
+    cmd = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-i",
+        file_path,
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-ar",
+        str(sample_rate),
+        "-",
+    ]
+
+    process = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    chunk_bytes = chunk_samples * 2
+    leftover = b""
+
+    try:
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            data = leftover + data
+            usable = len(data) - (len(data) % 2)
+            leftover = data[usable:]
+            if usable:
+                yield np.frombuffer(data[:usable], dtype="<i2")
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+
 def check_ffmpeg():
     """Verifica se ffmpeg está instalado"""
     try:
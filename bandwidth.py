@@ -0,0 +1,219 @@
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+
+from config import load_config
+
+# Intervalo para reavaliar a agenda de limites do config (segundos)
+SCHEDULE_REFRESH_INTERVAL = 30
+
+# Downloads que consumiram banda nesse intervalo contam como ativos (segundos)
+ACTIVE_WINDOW = 2.0
+
+_RATE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+
+
+def parse_size(value):
+    """Converte um tamanho ("500K", "2M", "1.5MiB", 250000) em bytes
+
+    Returns:
+        Bytes, ou None para valores vazios (None, 0 ou "")
+    """
+    if value in (None, "", 0, "0"):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMG]?)(?:i?B)?(?:/s)?\s*", str(value), re.I)
+    if not match:
+        raise ValueError(f"Tamanho inválido: {value!r}")
+    return float(match.group(1)) * _RATE_UNITS[match.group(2).upper()]
+
+
+def parse_rate(value):
+    """Converte um limite ("500K", "2M/s", 250000) em bytes/s
+
+    Returns:
+        Bytes por segundo, ou None para "sem limite" (None, 0 ou "")
+    """
+    try:
+        return parse_size(value)
+    except ValueError:
+        raise ValueError(f"Limite de banda inválido: {value!r}") from None
+
+
+def _minutes(clock):
+    hours, minutes = clock.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def scheduled_rate(config, now=None):
+    """Retorna o limite em bytes/s válido no horário `now`
+
+    A primeira entrada de "bandwidth_schedule" que cobre o horário vence;
+    fora delas vale "bandwidth_limit". Exemplo de entrada:
+
+        {"start": "09:00", "end": "18:00", "limit": "2M", "weekdays": [0, 1, 2, 3, 4]}
+
+    "weekdays" é opcional (0 = segunda) e janelas que passam da meia-noite
+    ("22:00" a "06:00") são aceitas.
+    """
+    now = now or datetime.now()
+    current = now.hour * 60 + now.minute
+
+    for entry in config.get("bandwidth_schedule") or []:
+        weekdays = entry.get("weekdays")
+        start, end = _minutes(entry["start"]), _minutes(entry["end"])
+        if start <= end:
+            in_window = start <= current < end
+            weekday = now.weekday()
+        else:
+            in_window = current >= start or current < end
+            # Depois da meia-noite a janela pertence ao dia anterior
+            weekday = now.weekday() if current >= start else (now.weekday() - 1) % 7
+        if in_window and (weekdays is None or weekday in weekdays):
+            return parse_rate(entry.get("limit"))
+
+    return parse_rate(config.get("bandwidth_limit"))
+
+
+class TokenBucket:
+    """Token bucket thread-safe com reserva antecipada
+
+    Cada consumidor desconta os bytes que já recebeu e dorme o tempo da
+    dívida, fora do lock. Como o balde é compartilhado, a banda que um
+    worker deixa de usar (convertendo, por exemplo) fica para os outros.
+    """
+
+    def __init__(self, rate=None, burst_seconds=1.0):
+        self.burst_seconds = burst_seconds
+        self.lock = threading.Lock()
+        self.rate = None
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = rate
+            self.tokens = min(self.tokens, self.capacity)
+            self.updated = time.monotonic()
+
+    @property
+    def capacity(self):
+        return (self.rate or 0) * self.burst_seconds
+
+    def reserve(self, amount):
+        """Desconta `amount` bytes e retorna quantos segundos esperar"""
+        with self.lock:
+            if not self.rate:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+
+class BandwidthLimiter:
+    """Limite de banda global compartilhado por todos os downloads do processo
+
+    O limite segue a agenda do config (reavaliada periodicamente) ou um
+    valor fixo definido com set_fixed_rate (ex.: --limit-rate na CLI).
+    """
+
+    def __init__(self):
+        self.bucket = TokenBucket()
+        self.fixed_rate = None
+        self.next_refresh = 0.0
+        self.last_activity = {}
+        self.lock = threading.Lock()
+
+    def set_fixed_rate(self, rate):
+        self.fixed_rate = parse_rate(rate)
+        self.next_refresh = 0.0
+
+    def refresh(self):
+        now = time.monotonic()
+        if now < self.next_refresh:
+            return
+        self.next_refresh = now + SCHEDULE_REFRESH_INTERVAL
+
+        rate = self.fixed_rate
+        if rate is None:
+            try:
+                rate = scheduled_rate(load_config())
+            except (KeyError, ValueError) as e:
+                logging.warning(f"Agenda de banda inválida no config: {e}")
+                rate = None
+        if rate != self.bucket.rate:
+            logging.info(
+                f"🚦 Limite de banda: {rate / 1024:.0f} KB/s"
+                if rate
+                else "🚦 Limite de banda: sem limite"
+            )
+            self.bucket.set_rate(rate)
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def active_downloads(self):
+        cutoff = time.monotonic() - ACTIVE_WINDOW
+        with self.lock:
+            # Downloads parados (convertendo, com erro) saem da contagem
+            for key, last in list(self.last_activity.items()):
+                if last < cutoff:
+                    del self.last_activity[key]
+            return len(self.last_activity)
+
+    def consume(self, key, amount, cancel_event=None):
+        """Registra `amount` bytes recebidos por `key` e segura a thread se
+        o limite global foi ultrapassado
+
+        Returns:
+            Segundos que a thread ficou esperando
+        """
+        self.refresh()
+        with self.lock:
+            self.last_activity[key] = time.monotonic()
+
+        wait = self.bucket.reserve(amount)
+        if wait > 0:
+            if cancel_event is not None:
+                cancel_event.wait(wait)
+            else:
+                time.sleep(wait)
+        return wait
+
+    def release(self, key):
+        """Remove um download encerrado da contagem de downloads ativos"""
+        with self.lock:
+            self.last_activity.pop(key, None)
+
+    def status(self):
+        """Dados de observabilidade incluídos no progresso dos downloads"""
+        active = self.active_downloads()
+        rate = self.rate
+        return {
+            "rate_limit": rate,
+            "active_downloads": active,
+            "bandwidth_share": rate / max(1, active) if rate else None,
+        }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_bandwidth_limiter():
+    """Retorna o limitador compartilhado do processo"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = BandwidthLimiter()
+        return _limiter
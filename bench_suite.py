@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline do pipeline completo, comparável entre execuções
+
+Um servidor HTTP local serve os arquivos de mídia e um extrator falso do
+yt-dlp (registrado em main.youtube_dl_hooks) responde URLs
+"benchplaylist:<tamanho>:<nome>" com playlists sintéticas. Mede parse,
+download, conversão, histórico, memória dos vídeos extraídos, leitura da
+biblioteca e a tabela da GUI, tudo dentro de uma pasta temporária
+(histórico e config incluídos), além de vários processos disputando o
+histórico ao mesmo tempo.
+
+    python bench_suite.py --json bench_output.txt
+    python bench_suite.py --baseline bench_baseline.json
+    python bench_suite.py --save-baseline bench_baseline.json
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from yt_dlp.extractor.common import InfoExtractor
+
+import main
+from config import (
+    add_download_to_history,
+    flush_downloads_history,
+    load_downloads_history,
+    modify_downloads_history,
+    save_downloads_history,
+    update_download_status,
+)
+from music_library import scan_music_library
+from scheduler import DownloadQueue
+from video_info import VideoInfo
+
+# Regressão: item mais lento (ou maior) que o baseline por mais que esta fração
+DEFAULT_TOLERANCE = 0.3
+
+# Métricas por item comparadas com o baseline
+COMPARED_METRICS = ("ms_per_item", "bytes_per_item")
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class BenchPlaylistIE(InfoExtractor):
+    """Playlists sintéticas apontando para o servidor de mídia local"""
+
+    IE_NAME = "benchplaylist"
+    _VALID_URL = r"benchplaylist:(?P<size>\d+)(?::(?P<name>\w+))?"
+    base_url = None
+
+    def _real_extract(self, url):
+        match = self._match_valid_url(url)
+        size = int(match.group("size"))
+        name = match.group("name") or "bench"
+        entries = [
+            self.url_result(
+                f"{self.base_url}/clip{number}.mp4",
+                video_id=f"{name}{number}",
+                video_title=f"{name} {number}",
+                duration=30 + number % 7 * 60,
+                uploader="Bench",
+                webpage_url=f"{self.base_url}/clip{number}.mp4",
+            )
+            for number in range(size)
+        ]
+        return self.playlist_result(entries, name, f"Playlist {name}")
+
+
+def install_stub_extractor(ydl):
+    """Hook de create_youtube_dl que registra o BenchPlaylistIE"""
+    ie = BenchPlaylistIE()
+    ydl.add_info_extractor(ie)
+    # O extrator genérico aceita qualquer URL, então o falso vem primeiro
+    ydl._ies = {ie.ie_key(): ie, **ydl._ies}
+
+
+def timed(name, items, function, repeat=1):
+    """Executa function e retorna o resultado do benchmark
+
+    Etapas idempotentes e rápidas rodam repeat vezes e guardam o melhor
+    tempo, o que reduz o ruído na comparação com o baseline.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    seconds = min(timings)
+    result = {
+        "name": name,
+        "items": items,
+        "seconds": round(seconds, 4),
+        "ms_per_item": round(seconds / max(items, 1) * 1000, 3),
+    }
+    print(
+        f"{name:14} {items:5} itens {seconds:8.3f}s {result['ms_per_item']:9.3f} ms/item"
+    )
+    return result
+
+
+def skipped(name, reason):
+    print(f"{name:14} pulado: {reason}")
+    return {"name": name, "skipped": reason}
+
+
+def make_media(media_dir, count, size):
+    os.makedirs(media_dir, exist_ok=True)
+    for number in range(count):
+        with open(os.path.join(media_dir, f"clip{number}.mp4"), "wb") as file:
+            file.write(os.urandom(size))
+
+
+def ffmpeg_clip(path, seconds, extension="mp4"):
+    """Gera um clipe com áudio via ffmpeg (retorna False sem ffmpeg)"""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return False
+    command = [ffmpeg, "-loglevel", "error", "-y"]
+    command += ["-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}"]
+    if extension == "mp4":
+        command += ["-f", "lavfi", "-i", f"color=size=64x64:duration={seconds}"]
+        command += ["-shortest"]
+    subprocess.run(command + [path], check=True)
+    return True
+
+
+def bench_parse(playlists, size):
+    urls = [f"benchplaylist:{size}:p{number}" for number in range(playlists)]
+    videos = []
+    result = timed(
+        "parse",
+        playlists * size,
+        lambda: videos.extend(main.parse_urls_parallel(urls)),
+    )
+    assert len(videos) == playlists * size, "Parse não encontrou todos os vídeos"
+    return result, videos
+
+
+def bench_download(videos, output_dir, workers):
+    outcomes = []
+
+    def run():
+        # O yt-dlp escreve o progresso no stdout; os resultados ficam limpos
+        with contextlib.redirect_stdout(sys.stderr):
+            outcomes.extend(
+                main.download_videos_parallel(
+                    videos,
+                    output_dir,
+                    to_mp3=False,
+                    max_workers=workers,
+                    queue=DownloadQueue("fifo"),
+                )
+            )
+
+    result = timed("download", len(videos), run)
+    failed = [video["url"] for video, success in outcomes if not success]
+    assert not failed, f"Downloads falharam: {failed[:3]}"
+    return result
+
+
+def bench_convert(work_dir, items):
+    clip = os.path.join(work_dir, "convert.mp4")
+    try:
+        main.set_ffmpeg_path()
+        if not ffmpeg_clip(clip, 10):
+            return skipped("convert", "ffmpeg não encontrado")
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        return skipped("convert", str(e))
+
+    copies = []
+    for number in range(items):
+        copy = os.path.join(work_dir, f"convert{number}.mp4")
+        shutil.copy(clip, copy)
+        copies.append(copy)
+
+    def run():
+        with contextlib.redirect_stdout(sys.stderr):
+            for copy in copies:
+                assert main.convert_video_to_audio(copy, "mp3"), "Conversão falhou"
+
+    return timed("convert", items, run)
+
+
+def bench_history(items):
+    urls = [f"https://bench.invalid/watch?v=h{number}" for number in range(items)]
+
+    def run():
+        for number, url in enumerate(urls):
+            add_download_to_history(f"History {number}", url, "", "pending")
+        for url in urls:
+            update_download_status(url, "completed", file_path="/tmp/bench.mp3")
+        flush_downloads_history()
+
+    return timed("history", items * 2, run)
+
+
+def _history_process(args):
+    """Processo do bench_history_processes; retorna a maior latência (s)"""
+    directory, worker, rounds = args
+    os.chdir(directory)
+
+    def increment(downloads):
+        downloads[0]["count"] += 1
+
+    slowest = 0.0
+    for number in range(rounds):
+        start = time.perf_counter()
+        modify_downloads_history(increment)
+        update_download_status(f"https://bench.invalid/watch?v=h{number}", "pending")
+        slowest = max(slowest, time.perf_counter() - start)
+    # O Pool encerra os workers sem atexit; grava o que ficou pendente
+    flush_downloads_history()
+    return slowest
+
+
+def bench_history_processes(processes, rounds):
+    """Processos (GUI + lotes da CLI) atualizando o histórico ao mesmo tempo"""
+    downloads = [entry for entry in load_downloads_history() if entry["url"] != "mp"]
+    save_downloads_history([{"url": "mp", "status": "bench", "count": 0}] + downloads)
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        # Os processos já sobem antes da medição
+        pool.map(abs, range(processes))
+        latencies = []
+        arguments = [(os.getcwd(), worker, rounds) for worker in range(processes)]
+        result = timed(
+            "history_procs",
+            processes * rounds * 2,
+            lambda: latencies.extend(pool.map(_history_process, arguments)),
+        )
+
+    count = load_downloads_history()[0]["count"]
+    assert count == processes * rounds, f"Atualizações perdidas: {count}"
+    result["max_op_ms"] = round(max(latencies) * 1000, 3)
+    print(f"{'':14} pior operação {result['max_op_ms']:.3f} ms")
+    return result
+
+
+def _parsed_rows(items, playlist_size=500):
+    """Vídeos como o parse os entrega: cada um com suas próprias strings"""
+    for number in range(items):
+        playlist = number // playlist_size
+        yield {
+            "id": f"v{number:010d}",
+            "title": f"Video {number}",
+            "url": f"https://www.youtube.com/watch?v=v{number:010d}",
+            "duration": 30 + number % 600,
+            "uploader": f"Channel {playlist}",
+            "playlist_title": f"Playlist {playlist}",
+            "playlist_uploader": f"Channel {playlist}",
+            "is_playlist": True,
+        }
+
+
+def _retained_bytes(build):
+    """Memória que continua alocada pelo resultado de build()"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del kept
+    return retained
+
+
+def bench_video_info_memory(items):
+    """Memória por vídeo de um lote grande em VideoInfo e em dicts"""
+    result = timed(
+        "video_info",
+        items,
+        lambda: [VideoInfo.from_dict(row) for row in _parsed_rows(items)],
+    )
+    compact = _retained_bytes(
+        lambda: [VideoInfo.from_dict(row) for row in _parsed_rows(items)]
+    )
+    plain = _retained_bytes(lambda: list(_parsed_rows(items)))
+    result["bytes_per_item"] = round(compact / items)
+    result["dict_bytes_per_item"] = round(plain / items)
+    print(
+        f"{'':14} {result['bytes_per_item']} bytes/item "
+        f"(dicts: {result['dict_bytes_per_item']})"
+    )
+    return result
+
+
+def bench_library(library_dir, items):
+    os.makedirs(library_dir, exist_ok=True)
+    sample = os.path.join(library_dir, "sample.mp3")
+    try:
+        has_audio = ffmpeg_clip(sample, 1, "mp3")
+    except subprocess.CalledProcessError:
+        has_audio = False
+    if not has_audio:
+        with open(sample, "wb") as file:
+            file.write(os.urandom(16 * 1024))
+    for number in range(items - 1):
+        shutil.copy(sample, os.path.join(library_dir, f"track{number}.mp3"))
+
+    tracks = scan_music_library(library_dir)
+    assert len(tracks) == items
+    return timed(
+        "library_scan", items, lambda: scan_music_library(library_dir), repeat=5
+    )
+
+
+def bench_gui_table(rows):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtWidgets import QApplication
+
+        import gui
+    except ImportError as e:
+        return skipped("gui_table", str(e))
+
+    # Grava as linhas de uma vez
+    downloads = load_downloads_history()
+    downloads.extend(
+        {
+            "title": f"Row {number}",
+            "url": f"https://bench.invalid/watch?v=g{number}",
+            "file_path": "",
+            "status": "pending",
+            "timestamp": "2024-01-01T00:00:00",
+        }
+        for number in range(rows)
+    )
+    save_downloads_history(downloads)
+
+    app = QApplication.instance() or QApplication([])
+    window = gui.YouTubeDownloader()
+    window.update_timer.stop()
+    try:
+        # A tabela mostra o histórico inteiro, inclusive o do bench_history
+        total_rows = len(load_downloads_history())
+        return timed("gui_table", total_rows, window.load_downloads_history, repeat=5)
+    finally:
+        window.close()
+        app.processEvents()
+
+
+def run_benchmark(
+    playlists=2,
+    playlist_size=25,
+    media_size=64 * 1024,
+    workers=2,
+    convert_items=2,
+    history_items=200,
+    history_processes=4,
+    video_info_items=50000,
+    library_items=200,
+    gui_rows=2000,
+):
+    """Executa o benchmark completo e retorna os resultados"""
+    results = []
+    original_dir = os.getcwd()
+    main.youtube_dl_hooks.append(install_stub_extractor)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        media_dir = os.path.join(temp_dir, "media")
+        make_media(media_dir, playlist_size, media_size)
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), functools.partial(QuietHandler, directory=media_dir)
+        )
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        BenchPlaylistIE.base_url = f"http://127.0.0.1:{server.server_port}"
+
+        # Histórico, config e caches relativos ficam na pasta temporária
+        os.chdir(temp_dir)
+        with open("config.json", "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "metrics_port": None,
+                    "staging_dir": os.path.join(temp_dir, "staging"),
+                    "default_download_path": os.path.join(temp_dir, "library"),
+                },
+                file,
+            )
+
+        try:
+            parse_result, videos = bench_parse(playlists, playlist_size)
+            results.append(parse_result)
+            results.append(
+                bench_download(videos, os.path.join(temp_dir, "downloads"), workers)
+            )
+            results.append(bench_convert(temp_dir, convert_items))
+            results.append(bench_history(history_items))
+            results.append(
+                bench_history_processes(history_processes, history_items // 4)
+            )
+            results.append(bench_video_info_memory(video_info_items))
+            results.append(
+                bench_library(os.path.join(temp_dir, "music"), library_items)
+            )
+            results.append(bench_gui_table(gui_rows))
+        finally:
+            flush_downloads_history()
+            os.chdir(original_dir)
+            main.youtube_dl_hooks.remove(install_stub_extractor)
+            server.shutdown()
+            server.server_close()
+
+    return results
+
+
+def environment():
+    import yt_dlp.version
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "yt_dlp": yt_dlp.version.__version__,
+    }
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Lista os benchmarks mais lentos (ou maiores) que o baseline além da
+    tolerância, métrica a métrica (COMPARED_METRICS)"""
+    reference = {entry["name"]: entry for entry in baseline.get("results", [])}
+    regressions = []
+    for entry in results:
+        base = reference.get(entry["name"])
+        if base is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if metric not in entry or metric not in base:
+                continue
+            ratio = entry[metric] / base[metric] if base[metric] else 1
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    {
+                        "name": entry["name"],
+                        "metric": metric,
+                        metric: entry[metric],
+                        f"baseline_{metric}": base[metric],
+                        "ratio": round(ratio, 2),
+                    }
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark")
+    parser.add_argument("--playlists", type=int, default=2)
+    parser.add_argument("--playlist-size", type=int, default=25)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--json", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against this baseline file")
+    parser.add_argument("--save-baseline", help="Store the results as a baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Allowed slowdown per item before failing (default: 0.3 = 30%%)",
+    )
+
+    args = parser.parse_args()
+    report = {
+        "environment": environment(),
+        "results": run_benchmark(
+            args.playlists, args.playlist_size, workers=args.workers
+        ),
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            report["regressions"] = compare_results(
+                report["results"], json.load(baseline_file), args.tolerance
+            )
+        for regression in report["regressions"]:
+            metric = regression["metric"]
+            print(
+                f"⚠️ {regression['name']}: {regression[metric]} {metric} "
+                f"(baseline {regression['baseline_' + metric]}, "
+                f"{regression['ratio']}x)"
+            )
+        exit_code = 1 if report["regressions"] else 0
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+    sys.exit(exit_code)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Benchmark das opções de transporte contra um servidor HTTP local que limita
+a velocidade por conexão (como o YouTube faz com downloads longos)
+
+Cada requisição recebe os primeiros `burst` bytes na velocidade máxima e o
+restante a `rate` bytes/s. Compara conexão única, download em blocos
+(http_chunk_size), fragmentos HLS em paralelo e o aria2c, se instalado.
+
+    python bench_transport.py --rate 256K --burst 256K --json bench_output.txt
+"""
+
+import argparse
+import functools
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from bandwidth import parse_size
+from main import create_youtube_dl
+from transport import transport_options
+
+BLOCK_SIZE = 16 * 1024
+
+
+class ThrottledRequestHandler(SimpleHTTPRequestHandler):
+    """Serve arquivos com suporte a Range e limite de velocidade por conexão"""
+
+    rate = 256 * 1024
+    burst = 256 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return None
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2) or end), end)
+            else:
+                start = max(0, size - int(match.group(2)))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+        file = open(path, "rb")
+        file.seek(start)
+        self.remaining = end - start + 1
+        return file
+
+    def copyfile(self, source, outputfile):
+        sent = 0
+        started = time.monotonic()
+        while self.remaining > 0:
+            block = source.read(min(BLOCK_SIZE, self.remaining))
+            if not block:
+                break
+            try:
+                outputfile.write(block)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            sent += len(block)
+            self.remaining -= len(block)
+
+            # Depois da rajada inicial, segura a conexão na velocidade limite
+            if sent > self.burst:
+                expected = (sent - self.burst) / self.rate
+                delay = expected - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                started = time.monotonic()
+
+
+def create_media(root, progressive_size, segments, segment_size):
+    """Gera um arquivo progressivo e uma playlist HLS com dados aleatórios"""
+    with open(os.path.join(root, "progressive.mp4"), "wb") as file:
+        file.write(os.urandom(progressive_size))
+
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:4"]
+    for number in range(segments):
+        with open(os.path.join(root, f"segment{number}.ts"), "wb") as file:
+            file.write(os.urandom(segment_size))
+        lines += ["#EXTINF:4.0,", f"segment{number}.ts"]
+    lines.append("#EXT-X-ENDLIST")
+    with open(os.path.join(root, "stream.m3u8"), "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def start_server(root, rate, burst):
+    handler = functools.partial(
+        type(
+            "BenchHandler",
+            (ThrottledRequestHandler,),
+            {"rate": rate, "burst": burst},
+        ),
+        directory=root,
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def timed_download(url, output_dir, options):
+    """Baixa uma URL com as opções de transporte e retorna os segundos gastos"""
+    shutil.rmtree(output_dir, ignore_errors=True)
+    ydl_opts = {
+        "outtmpl": os.path.join(output_dir, "%(title)s.%(ext)s"),
+        "quiet": True,
+        "no_warnings": True,
+        "noprogress": True,
+        "fixup": "never",
+        **options,
+    }
+    start = time.perf_counter()
+    with create_youtube_dl(ydl_opts) as ydl:
+        ydl.download([url])
+    return time.perf_counter() - start
+
+
+def scenarios(chunk_size, fragments):
+    """Combinações de transporte comparadas no benchmark"""
+    native = {"external_downloader": "native"}
+    cases = [
+        ("progressive", "conexão única", {}),
+        (
+            "progressive",
+            f"blocos de {chunk_size}",
+            transport_options({**native, "http_chunk_size": chunk_size}),
+        ),
+        ("hls", "fragmentos sequenciais", {}),
+        (
+            "hls",
+            f"{fragments} fragmentos em paralelo",
+            transport_options({**native, "concurrent_fragment_downloads": fragments}),
+        ),
+    ]
+    if shutil.which("aria2c"):
+        cases.append(
+            (
+                "progressive",
+                "aria2c",
+                transport_options({"external_downloader": "aria2c"}),
+            )
+        )
+    return cases
+
+
+def run_benchmark(
+    rate="256K",
+    burst="256K",
+    chunk_size="256K",
+    fragments=4,
+    progressive_size="2M",
+    segments=16,
+    segment_size="512K",
+):
+    """Executa todos os cenários e retorna a lista de resultados"""
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        media_dir = os.path.join(temp_dir, "media")
+        os.makedirs(media_dir)
+        create_media(
+            media_dir,
+            int(parse_size(progressive_size)),
+            segments,
+            int(parse_size(segment_size)),
+        )
+        server = start_server(media_dir, parse_size(rate), parse_size(burst))
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        urls = {
+            "progressive": f"{base_url}/progressive.mp4",
+            "hls": f"{base_url}/stream.m3u8",
+        }
+
+        try:
+            for media, name, options in scenarios(chunk_size, fragments):
+                elapsed = timed_download(
+                    urls[media], os.path.join(temp_dir, "out"), options
+                )
+                results.append(
+                    {
+                        "media": media,
+                        "scenario": name,
+                        "options": options,
+                        "seconds": round(elapsed, 2),
+                    }
+                )
+                print(f"{media:12} {name:28} {elapsed:7.2f}s")
+        finally:
+            server.shutdown()
+            server.server_close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark download transports")
+    parser.add_argument("--rate", default="256K", help="Per-connection rate")
+    parser.add_argument("--burst", default="256K", help="Unthrottled bytes")
+    parser.add_argument("--chunk-size", default="256K", help="http_chunk_size")
+    parser.add_argument("--fragments", type=int, default=4)
+    parser.add_argument("--json", help="Write results as JSON to this file")
+
+    args = parser.parse_args()
+    bench_results = run_benchmark(
+        args.rate, args.burst, args.chunk_size, args.fragments
+    )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(bench_results, output, indent=2, ensure_ascii=False)
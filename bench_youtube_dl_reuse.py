@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark do custo por item de criar um YoutubeDL por URL versus reaproveitar
+a instância da thread (youtube_dl_pool)
+
+Usa um servidor HTTP local (HTTP/1.1, com keep-alive) com arquivos pequenos,
+então o tempo medido é quase todo overhead do yt-dlp, não transferência.
+
+    python bench_youtube_dl_reuse.py --items 200 --json bench_output.txt
+"""
+
+import argparse
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from main import create_youtube_dl
+from youtube_dl_pool import close_thread_instances, reused_youtube_dl
+
+
+class KeepAliveHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        # Instâncias novas fecham as conexões keep-alive a cada item
+        try:
+            super().handle()
+        except ConnectionResetError:
+            pass
+
+
+def job_options(output_dir, number, hook):
+    """Opções no formato das de download_single_video, variando por item"""
+    return {
+        "format": "best/worst",
+        "outtmpl": os.path.join(output_dir, f"{number}", "%(title)s.%(ext)s"),
+        "progress_hooks": [hook],
+        "quiet": True,
+        "no_warnings": True,
+        "noprogress": True,
+    }
+
+
+def run_items(urls, output_dir, reuse, download):
+    """Processa as URLs em sequência e retorna os ms médios por item"""
+    hook_calls = []
+    start = time.perf_counter()
+    for number, url in enumerate(urls):
+        ydl_opts = job_options(output_dir, number, hook_calls.append)
+        session = (
+            reused_youtube_dl(ydl_opts, create_youtube_dl)
+            if reuse
+            else create_youtube_dl(ydl_opts)
+        )
+        with session as ydl:
+            ydl.extract_info(url, download=download)
+    elapsed = time.perf_counter() - start
+    close_thread_instances()
+
+    if download:
+        assert hook_calls, "Os hooks de progresso do job não foram chamados"
+    return elapsed / len(urls) * 1000
+
+
+def run_benchmark(items=100, size=4096):
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        media_dir = os.path.join(temp_dir, "media")
+        os.makedirs(media_dir)
+        for number in range(items):
+            with open(os.path.join(media_dir, f"clip{number}.mp4"), "wb") as file:
+                file.write(os.urandom(size))
+
+        handler = functools.partial(KeepAliveHandler, directory=media_dir)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        urls = [f"{base_url}/clip{number}.mp4" for number in range(items)]
+
+        try:
+            # Aquece imports e caches do yt-dlp antes de medir
+            run_items(urls[:2], os.path.join(temp_dir, "warmup"), False, False)
+
+            for download in (False, True):
+                for reuse in (False, True):
+                    output_dir = os.path.join(temp_dir, f"out-{download}-{reuse}")
+                    per_item = run_items(urls, output_dir, reuse, download)
+                    results.append(
+                        {
+                            "operation": "download" if download else "extract",
+                            "reuse": reuse,
+                            "items": items,
+                            "ms_per_item": round(per_item, 2),
+                        }
+                    )
+                    mode = "reaproveitado" if reuse else "novo por item"
+                    operation = "download" if download else "extract"
+                    print(f"{operation:9} {mode:14} {per_item:8.2f} ms/item")
+        finally:
+            server.shutdown()
+            server.server_close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark per-item YoutubeDL overhead"
+    )
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--json", help="Write results as JSON to this file")
+
+    args = parser.parse_args()
+    bench_results = run_benchmark(args.items)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(bench_results, output, indent=2, ensure_ascii=False)
@@ -1,27 +1,37 @@
+import atexit
+import contextlib
 import json
 import logging
 import os
 import threading
+import time
 from datetime import datetime
 
+from video_info import INTERNED_FIELDS, intern_value
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 CONFIG_FILE = "config.json"
 DOWNLOADS_HISTORY_FILE = "downloads_history.json"
 
-# Lock para proteger acesso ao arquivo JSON
+# Lock para proteger acesso ao arquivo JSON entre threads; entre processos
+# (GUI, CLI do cron, daemon) vale o lock do arquivo .lock ao lado dele
 _file_lock = threading.Lock()
 
-# Configurar logging específico para debug
-debug_logger = logging.getLogger("downloads_debug")
-debug_logger.setLevel(logging.DEBUG)
+# Intervalo do flusher do HistoryCache: alterações feitas nesse intervalo
+# vão para o arquivo numa única gravação
+HISTORY_FLUSH_INTERVAL = 0.3
 
-# Adicionar handler se ainda não existir
-if not debug_logger.handlers:
-    handler = logging.StreamHandler()
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    handler.setFormatter(formatter)
-    debug_logger.addHandler(handler)
+# Campos do histórico com poucos valores distintos, internados na memória
+HISTORY_INTERNED_FIELDS = ("status",) + INTERNED_FIELDS
+
+# Logger detalhado do histórico; nível e destino vêm de logging_setup
+# ("log_levels" no config), sem handler próprio
+debug_logger = logging.getLogger("downloads_debug")
 
 
 def get_default_config():
@@ -31,6 +41,53 @@ def get_default_config():
         "logging_enabled": True,
         "auto_convert_to_mp3": True,
         "keep_video": False,
+        "waveform_cache_dir": ".waveform_cache",
+        "skip_duplicate_audio": False,
+        "fingerprint_index_file": "fingerprints.json",
+        "audio_backend": "auto",
+        "use_daemon": False,
+        "daemon_port": 8765,
+        "daemon_workers": 2,
+        "bandwidth_limit": None,
+        "bandwidth_schedule": [],
+        "retry_max_attempts": 4,
+        "retry_base_delay": 5.0,
+        "retry_max_delay": 300.0,
+        "concurrent_fragment_downloads": 4,
+        "http_chunk_size": "10M",
+        "external_downloader": "auto",
+        "aria2c_connections": 8,
+        "reuse_youtube_dl": True,
+        "parse_concurrency": 8,
+        "parse_per_host": 4,
+        "playlist_items": None,
+        "playlist_newest": None,
+        "watch_list": [],
+        "watch_interval": "6h",
+        "watch_stagger": 60,
+        "watch_newest": 100,
+        "watch_state_file": "watch_state.json",
+        "watch_pause_on_battery": True,
+        "watch_pause_on_metered": True,
+        "download_scheduling": "fifo",
+        "use_staging": True,
+        "staging_dir": None,
+        "disk_admission_control": True,
+        "use_media_store": True,
+        "media_store_dir": None,
+        "metrics_port": 9464,
+        "metrics_file": None,
+        "trace_file": None,
+        "log_file": "u2be_down.log",
+        "log_max_bytes": 5 * 1024 * 1024,
+        "log_backup_count": 3,
+        "log_levels": {
+            "root": "INFO",
+            "downloads_debug": "WARNING",
+            "urllib3": "WARNING",
+            "PIL": "WARNING",
+            "numba": "WARNING",
+        },
     }
 
 
@@ -55,144 +112,583 @@ def save_config(config):
         json.dump(config, file, indent=2, ensure_ascii=False)
 
 
-def load_downloads_history():
-    """Carrega o histórico de downloads do arquivo JSON"""
-    with _file_lock:  # Proteger acesso ao arquivo
-        if os.path.exists(DOWNLOADS_HISTORY_FILE):
+@contextlib.contextmanager
+def _history_file_lock(path=None):
+    """Lock exclusivo do histórico entre threads e processos"""
+    path = path or DOWNLOADS_HISTORY_FILE
+    with _file_lock:
+        with open(path + ".lock", "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK desiste após ~10s; outro processo ainda escreve
+                        time.sleep(0.1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_history(path=None):
+    """Lê o arquivo do histórico; retorna (downloads, erro)"""
+    try:
+        with open(path or DOWNLOADS_HISTORY_FILE, "r", encoding="utf-8") as file:
+            return json.load(file), None
+    except FileNotFoundError:
+        return [], None
+    except Exception as e:
+        return [], e
+
+
+def _write_history(downloads, path=None):
+    """Grava o histórico num arquivo temporário e o troca pelo atual
+
+    Leitores (de qualquer processo) veem o arquivo antigo ou o novo inteiro,
+    nunca um arquivo truncado no meio da escrita.
+    """
+    path = path or DOWNLOADS_HISTORY_FILE
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(downloads, file, indent=2, ensure_ascii=False)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def _compact_row(row):
+    """Interna os textos repetidos da entrada (status, playlist, canal)
+
+    Milhares de entradas carregadas do JSON teriam cada uma sua cópia de
+    "pending" ou do nome da playlist; internadas, dividem a mesma string.
+    """
+    for key in HISTORY_INTERNED_FIELDS:
+        value = row.get(key)
+        if value is not None:
+            row[key] = intern_value(value)
+    return row
+
+
+def _merge_changes(row, cached, fields, attempts=None):
+    """Linha do arquivo com as alterações feitas no cache aplicadas
+
+    Args:
+        row: Entrada lida do arquivo (pode ter mudanças de outro processo)
+        cached: Entrada no cache, com as alterações deste processo
+        fields: Campos alterados no cache (None = a entrada inteira)
+        attempts: Tentativas acrescentadas a "attempts" no cache
+    """
+    if fields is None:
+        return _copy_row(cached)
+    merged = dict(row)
+    for key in fields:
+        if key in cached:
+            merged[key] = cached[key]
+    if attempts:
+        merged["attempts"] = list(row.get("attempts") or []) + list(attempts)
+    return merged
+
+
+def _copy_row(row):
+    """Cópia de uma entrada que pode ser alterada sem afetar o cache"""
+    return {
+        key: list(value) if isinstance(value, list) else value
+        for key, value in row.items()
+    }
+
+
+class HistoryCache:
+    """Histórico em memória com gravação em grupo (write-behind)
+
+    A cópia em memória é a autoritativa do processo: add_many e update_many
+    alteram as entradas e anotam quais campos mudaram, e uma thread grava
+    todas as alterações numa única reescrita do arquivo a cada
+    flush_interval segundos (e na saída do processo). Cada gravação aplica
+    só os campos alterados (e as tentativas acrescentadas) sobre a linha
+    lida do arquivo sob o lock entre processos, então campos que outro
+    processo mudou nesse meio-tempo não são sobrescritos; essas mudanças
+    são recarregadas na próxima leitura.
+    """
+
+    def __init__(self, path, flush_interval=HISTORY_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        # Serializa gravações inteiras (arquivo + adoção do resultado)
+        self.flush_lock = threading.Lock()
+        self.downloads = []
+        self.index = {}
+        # url -> campos alterados (None = entrada nova), na ordem em que sujaram
+        self.dirty = {}
+        # url -> tentativas acrescentadas a "attempts" desde a última gravação
+        self.appended = {}
+        self.removed = set()
+        self.signature = False  # False = arquivo ainda não lido
+        self.wakeup = threading.Event()
+        self.flusher = None
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _adopt(self, rows, signature):
+        """Troca a cópia em memória pelas linhas do arquivo, mantendo as sujas"""
+        downloads = []
+        index = {}
+        for row in rows:
+            url = row.get("url")
+            if url in self.removed:
+                continue
+            if url in self.dirty:
+                row = _merge_changes(
+                    row, self.index[url], self.dirty[url], self.appended.get(url)
+                )
+            _compact_row(row)
+            downloads.append(row)
+            index[url] = row
+        for url, fields in list(self.dirty.items()):
+            if url in index:
+                continue
+            if fields is None:
+                # Entrada criada aqui e ainda não gravada
+                downloads.append(self.index[url])
+                index[url] = self.index[url]
+            else:
+                # Outro processo apagou a entrada: a alteração é descartada
+                del self.dirty[url]
+                self.appended.pop(url, None)
+        self.downloads = downloads
+        self.index = index
+        self.signature = signature
+
+    def _refresh(self):
+        """Recarrega o arquivo se outro processo o alterou (chamar com lock)"""
+        signature = self._signature()
+        if signature == self.signature:
+            return
+        rows, error = _read_history(self.path)
+        if error is not None:
+            # Mantém a cópia em memória; a próxima gravação recria o arquivo
+            logging.error(f"❌ LOAD_HISTORY: Erro ao carregar histórico: {error}")
+            self.signature = signature
+            return
+        self._adopt(rows, signature)
+
+    def _mark(self, url, fields=None, attempt=None):
+        """Anota a alteração de url: os campos dados, ou a entrada inteira"""
+        if fields is None:
+            self.dirty[url] = None
+        elif url not in self.dirty:
+            self.dirty[url] = set(fields)
+        elif self.dirty[url] is not None:
+            self.dirty[url].update(fields)
+        if attempt is not None:
+            self.appended.setdefault(url, []).append(attempt)
+        self.removed.discard(url)
+        if self.flusher is None or not self.flusher.is_alive():
+            self.flusher = threading.Thread(
+                target=self._run, name="history-flusher", daemon=True
+            )
+            self.flusher.start()
+        self.wakeup.set()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait()
+            # Espera o intervalo para juntar as alterações seguintes
+            time.sleep(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def snapshot(self):
+        """Cópia da lista de downloads (pode ser alterada pelo chamador)"""
+        with self.lock:
+            self._refresh()
+            return [_copy_row(row) for row in self.downloads]
+
+    def add_many(self, entries):
+        """Adiciona ou atualiza várias entradas de uma vez
+
+        Args:
+            entries: Dicts com title e url, e opcionalmente file_path, status
+                (padrão "pending") e campos extras (duration, playlist...)
+
+        Returns:
+            Número de entradas novas ou alteradas
+        """
+        timestamp = datetime.now().isoformat()
+        changed_count = 0
+        with self.lock:
+            self._refresh()
+            for entry in entries:
+                details = dict(entry)
+                title = details.pop("title")
+                url = details.pop("url")
+                file_path = details.pop("file_path", "")
+                status = details.pop("status", "pending")
+
+                existing = self.index.get(url)
+                if existing is None:
+                    row = {
+                        "title": title,
+                        "url": url,
+                        "file_path": file_path,
+                        "status": status,
+                        "timestamp": timestamp,
+                        **details,
+                    }
+                    _compact_row(row)
+                    self.downloads.append(row)
+                    self.index[url] = row
+                    self._mark(url)
+                    changed_count += 1
+                    continue
+
+                debug_logger.info(
+                    f"➕ ADD_DOWNLOAD: URL já existe, status atual: {existing.get('status')}"
+                )
+                changed = [
+                    key for key, value in details.items() if existing.get(key) != value
+                ]
+                existing.update(details)
+                if existing.get("status") != status:
+                    debug_logger.info(
+                        f"➕ ADD_DOWNLOAD: Atualizando status de {existing.get('status')} para {status}"
+                    )
+                    existing["status"] = status
+                    changed.append("status")
+                if changed:
+                    _compact_row(existing)
+                    self._mark(url, changed)
+                    changed_count += 1
+            total = len(self.downloads)
+
+        debug_logger.info(
+            f"➕ ADD_DOWNLOAD: {changed_count} entradas novas/alteradas. Total agora: {total}"
+        )
+        return changed_count
+
+    def update_many(self, updates):
+        """Altera campos de várias entradas existentes de uma vez
+
+        Args:
+            updates: Dicts com url e os campos a definir; valores None são
+                ignorados e "attempt" é acrescentado à lista "attempts"
+
+        Returns:
+            Número de entradas encontradas
+        """
+        found = 0
+        with self.lock:
+            self._refresh()
+            for update in updates:
+                fields = dict(update)
+                url = fields.pop("url")
+                row = self.index.get(url)
+                if row is None:
+                    debug_logger.warning(
+                        f"⚠️ UPDATE_STATUS: URL não encontrada no histórico! {url[:50]}"
+                    )
+                    continue
+                found += 1
+
+                attempt = fields.pop("attempt", None)
+                if attempt is not None:
+                    row.setdefault("attempts", []).append(attempt)
+                changed = []
+                for key, value in fields.items():
+                    if value is not None and row.get(key) != value:
+                        row[key] = value
+                        changed.append(key)
+                if changed or attempt is not None:
+                    _compact_row(row)
+                    self._mark(url, changed, attempt)
+        return found
+
+    def flush(self):
+        """Grava agora as entradas sujas; retorna False se não havia nada"""
+        with self.flush_lock:
+            with self.lock:
+                if not self.dirty and not self.removed:
+                    return False
+                pending = {url: _copy_row(self.index[url]) for url in self.dirty}
+                dirty = self.dirty
+                appended = self.appended
+                removed = self.removed
+                memory = [_copy_row(row) for row in self.downloads]
+                self.dirty = {}
+                self.appended = {}
+                self.removed = set()
+
+            error = None
             try:
-                with open(DOWNLOADS_HISTORY_FILE, "r", encoding="utf-8") as file:
-                    downloads = json.load(file)
-                    return downloads
+                with _history_file_lock(self.path):
+                    rows, read_error = _read_history(self.path)
+                    if read_error is not None:
+                        # Arquivo corrompido: a cópia em memória o substitui
+                        logging.error(
+                            f"❌ LOAD_HISTORY: Erro ao carregar histórico: {read_error}"
+                        )
+                        rows = memory
+                    else:
+                        rows = [
+                            (
+                                _merge_changes(
+                                    row,
+                                    pending[row["url"]],
+                                    dirty[row["url"]],
+                                    appended.get(row["url"]),
+                                )
+                                if row.get("url") in pending
+                                else row
+                            )
+                            for row in rows
+                            if row.get("url") not in removed
+                        ]
+                        present = {row.get("url") for row in rows}
+                        # Só entradas novas entram; alterações de entradas
+                        # que outro processo apagou são descartadas
+                        rows += [
+                            row
+                            for url, row in pending.items()
+                            if url not in present and dirty[url] is None
+                        ]
+                    _write_history(rows, self.path)
+                    signature = self._signature()
             except Exception as e:
-                debug_logger.error(f"❌ LOAD_HISTORY: Erro ao carregar histórico: {e}")
-                logging.error(f"❌ LOAD_HISTORY: Erro ao carregar histórico: {e}")
+                error = e
+
+            with self.lock:
+                if error is not None:
+                    logging.error(f"Erro ao salvar histórico: {error}")
+                    # Volta a marcar as entradas para a próxima tentativa
+                    for url, fields in dirty.items():
+                        if url not in self.index:
+                            continue
+                        if fields is None:
+                            self._mark(url)
+                        else:
+                            self._mark(url, fields)
+                        if url in appended:
+                            # As tentativas antigas vêm antes das mais novas
+                            self.appended[url] = appended[url] + self.appended.get(
+                                url, []
+                            )
+                    self.removed |= removed
+                    return False
+                self._adopt(rows, signature)
+            return True
+
+    def replace(self, downloads):
+        """Grava a lista inteira já, descartando as alterações pendentes"""
+        error = None
+        with self.flush_lock:
+            with self.lock:
+                self.dirty = {}
+                self.appended = {}
+                self.removed = set()
+            with _history_file_lock(self.path):
+                try:
+                    _write_history(downloads, self.path)
+                except Exception as e:
+                    error = e
+                signature = self._signature()
+            with self.lock:
+                self._adopt([_copy_row(row) for row in downloads], signature)
+
+        if error is not None:
+            logging.error(f"Erro ao salvar histórico: {error}")
+
+    def modify(self, change):
+        """Leitura-alteração-gravação do arquivo numa transação entre processos"""
+        self.flush()
+        error = None
+        with self.flush_lock:
+            with _history_file_lock(self.path):
+                rows, read_error = _read_history(self.path)
+                if read_error is not None:
+                    logging.error(
+                        f"❌ LOAD_HISTORY: Erro ao carregar histórico: {read_error}"
+                    )
+                result = change(rows)
+                if result is not False:
+                    if result is not None:
+                        rows = result
+                    try:
+                        _write_history(rows, self.path)
+                    except Exception as e:
+                        error = e
+                signature = self._signature()
+            with self.lock:
+                self._adopt(rows, signature)
+                downloads = [_copy_row(row) for row in self.downloads]
+
+        if error is not None:
+            logging.error(f"Erro ao salvar histórico: {error}")
+        return downloads
+
+
+_history_caches = {}
+_history_caches_lock = threading.Lock()
+
+
+def get_history_cache():
+    """HistoryCache do arquivo de histórico atual (relativo ao diretório atual)"""
+    path = os.path.abspath(DOWNLOADS_HISTORY_FILE)
+    with _history_caches_lock:
+        cache = _history_caches.get(path)
+        if cache is None:
+            cache = _history_caches[path] = HistoryCache(path)
+    return cache
+
+
+def flush_downloads_history():
+    """Grava já as alterações pendentes do histórico (também roda na saída)
+
+    Processos encerrados sem passar pelo atexit (os._exit, SIGKILL, workers
+    de multiprocessing.Pool) devem chamá-la antes de terminar.
+    """
+    with _history_caches_lock:
+        caches = list(_history_caches.values())
+    for cache in caches:
+        cache.flush()
+
+
+atexit.register(flush_downloads_history)
 
-        debug_logger.info("🔍 LOAD_HISTORY: Arquivo não existe, retornando lista vazia")
-        logging.info("🔍 LOAD_HISTORY: Arquivo não existe, retornando lista vazia")
-        return []
+
+def load_downloads_history():
+    """Carrega o histórico de downloads (cópia do cache em memória)"""
+    return get_history_cache().snapshot()
 
 
 def save_downloads_history(downloads):
-    """Salva o histórico de downloads no arquivo JSON"""
-    with _file_lock:  # Proteger acesso ao arquivo
-        try:
-            with open(DOWNLOADS_HISTORY_FILE, "w", encoding="utf-8") as file:
-                json.dump(downloads, file, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logging.error(f"Erro ao salvar histórico: {e}")
+    """Salva o histórico de downloads inteiro no arquivo JSON"""
+    get_history_cache().replace(downloads)
 
 
-def add_download_to_history(title, url, file_path="", status="pending"):
-    """Adiciona um download ao histórico com logs detalhados"""
-    debug_logger.info(f"➕ ADD_DOWNLOAD: Adicionando '{title}' com status '{status}'")
+def modify_downloads_history(change):
+    """Lê, altera e grava o histórico numa única transação entre processos
 
-    downloads = load_downloads_history()
+    Sem isso, dois processos (GUI e um lote da CLI) que leem o histórico ao
+    mesmo tempo perdem a alteração de quem gravar primeiro. As alterações
+    pendentes do cache são gravadas antes.
 
-    # Verifica se já existe
-    existing = None
-    for download in downloads:
-        if download["url"] == url:
-            existing = download
-            break
+    Args:
+        change: Função que recebe a lista atual e a altera no lugar (ou
+            retorna uma nova lista). Retornar False descarta a gravação.
 
-    if existing:
-        debug_logger.info(
-            f"➕ ADD_DOWNLOAD: URL já existe, status atual: {existing.get('status')}"
-        )
-        if existing.get("status") != status:
-            debug_logger.info(
-                f"➕ ADD_DOWNLOAD: Atualizando status de {existing.get('status')} para {status}"
-            )
-            existing["status"] = status
-        return
-
-    download_entry = {
-        "title": title,
-        "url": url,
-        "file_path": file_path,
-        "status": status,
-        "timestamp": datetime.now().isoformat(),
-    }
+    Returns:
+        A lista de downloads resultante
+    """
+    return get_history_cache().modify(change)
 
-    downloads.append(download_entry)
-    debug_logger.info(
-        f"➕ ADD_DOWNLOAD: Nova entrada adicionada. Total agora: {len(downloads)}"
-    )
 
-    save_downloads_history(downloads)
+def add_downloads_to_history(entries):
+    """Adiciona várias entradas ao histórico (ver HistoryCache.add_many)"""
+    return get_history_cache().add_many(entries)
 
 
-def update_download_status(url, status, file_path=None, error_msg=None):
-    """Atualiza o status de um download no histórico com logs detalhados"""
-    debug_logger.info(f"🔄 UPDATE_STATUS: URL={url[:50]}... Status={status}")
+def update_downloads_in_history(updates):
+    """Altera várias entradas do histórico (ver HistoryCache.update_many)"""
+    return get_history_cache().update_many(updates)
 
-    downloads = load_downloads_history()
-    found = False
 
-    for download in downloads:
-        if download["url"] == url:
-            old_status = download.get("status", "unknown")
-            download["status"] = status
-            if file_path:
-                download["file_path"] = file_path
-            if error_msg:
-                download["error_message"] = error_msg
-            found = True
-            debug_logger.info(f"🔄 UPDATE_STATUS: Encontrado! {old_status} → {status}")
-            break
+def add_download_to_history(title, url, file_path="", status="pending", **details):
+    """Adiciona um download ao histórico com logs detalhados
 
-    if not found:
-        debug_logger.warning(f"⚠️ UPDATE_STATUS: URL não encontrada no histórico!")
+    Args:
+        **details: Campos extras da entrada (duration, priority, playlist...)
+    """
+    debug_logger.info(f"➕ ADD_DOWNLOAD: Adicionando '{title}' com status '{status}'")
+    add_downloads_to_history(
+        [
+            {
+                "title": title,
+                "url": url,
+                "file_path": file_path,
+                "status": status,
+                **details,
+            }
+        ]
+    )
 
-    save_downloads_history(downloads)
 
+def update_download_status(url, status, file_path=None, error_msg=None, attempt=None):
+    """Atualiza o status de um download no histórico com logs detalhados
 
-def clear_completed_downloads():
-    """Remove downloads concluídos do histórico com logs detalhados"""
-    debug_logger.info("🧹 CLEAR_COMPLETED: Iniciando limpeza de downloads concluídos")
+    Args:
+        attempt: Registro de uma tentativa de download (número, duração,
+            resultado), acrescentado ao histórico de tentativas da entrada
+    """
+    debug_logger.info(f"🔄 UPDATE_STATUS: URL={url[:50]}... Status={status}")
+    update_downloads_in_history(
+        [
+            {
+                "url": url,
+                "status": status,
+                "file_path": file_path or None,
+                "error_message": error_msg or None,
+                "attempt": attempt,
+            }
+        ]
+    )
 
-    downloads = load_downloads_history()
-    original_count = len(downloads)
-    completed_count = len([d for d in downloads if d["status"] == "completed"])
 
-    downloads = [d for d in downloads if d["status"] != "completed"]
-    final_count = len(downloads)
+def set_download_priority(url, priority):
+    """Define a prioridade de um download do histórico (maior sai primeiro)"""
+    return update_downloads_in_history([{"url": url, "priority": priority}]) > 0
 
-    debug_logger.info(
-        f"🧹 CLEAR_COMPLETED: {original_count} → {final_count} (removidos {completed_count} concluídos)"
-    )
 
-    save_downloads_history(downloads)
-    return downloads
+def clear_completed_downloads():
+    """Remove downloads concluídos do histórico com logs detalhados"""
+    debug_logger.info("🧹 CLEAR_COMPLETED: Iniciando limpeza de downloads concluídos")
+    return modify_downloads_history(
+        lambda downloads: _remove_status(downloads, "completed")
+    )
 
 
 def clear_all_downloads():
     """Remove todos os downloads do histórico com logs detalhados"""
     debug_logger.info("🧹 CLEAR_ALL: Removendo TODOS os downloads do histórico")
 
-    downloads = load_downloads_history()
-    original_count = len(downloads)
+    removed = []
 
-    save_downloads_history([])
+    def change(downloads):
+        removed.extend(downloads)
+        return []
+
+    modify_downloads_history(change)
 
-    debug_logger.info(f"🧹 CLEAR_ALL: {original_count} downloads removidos")
+    debug_logger.info(f"🧹 CLEAR_ALL: {len(removed)} downloads removidos")
     return []
 
 
 def clear_failed_downloads():
     """Remove downloads com falha do histórico com logs detalhados"""
     debug_logger.info("🧹 CLEAR_FAILED: Iniciando limpeza de downloads falhados")
+    return modify_downloads_history(
+        lambda downloads: _remove_status(downloads, "failed")
+    )
 
-    downloads = load_downloads_history()
-    original_count = len(downloads)
-    failed_count = len([d for d in downloads if d["status"] == "failed"])
-
-    downloads = [d for d in downloads if d["status"] != "failed"]
-    final_count = len(downloads)
 
+def _remove_status(downloads, status):
+    """Lista sem as entradas com o status dado (para modify_downloads_history)"""
+    kept = [d for d in downloads if d["status"] != status]
     debug_logger.info(
-        f"🧹 CLEAR_FAILED: {original_count} → {final_count} (removidos {failed_count} falhados)"
+        f"🧹 CLEAR_{status.upper()}: {len(downloads)} → {len(kept)} "
+        f"(removidos {len(downloads) - len(kept)})"
     )
-
-    save_downloads_history(downloads)
-    return downloads
+    return kept
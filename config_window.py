@@ -59,6 +59,15 @@ class ConfigWindow(QDialog):
         self.keep_video_checkbox.setChecked(self.config.get("keep_video", False))
         download_layout.addWidget(self.keep_video_checkbox)
 
+        # Verificação de áudio duplicado antes da conversão
+        self.skip_duplicates_checkbox = QCheckBox(
+            "Pular conversão de áudio que já existe na biblioteca"
+        )
+        self.skip_duplicates_checkbox.setChecked(
+            self.config.get("skip_duplicate_audio", False)
+        )
+        download_layout.addWidget(self.skip_duplicates_checkbox)
+
         download_group.setLayout(download_layout)
         layout.addWidget(download_group)
 
@@ -98,12 +107,17 @@ class ConfigWindow(QDialog):
 
     def save_config(self):
         """Salva as configurações"""
-        new_config = {
-            "default_download_path": self.path_input.text(),
-            "logging_enabled": self.logging_checkbox.isChecked(),
-            "auto_convert_to_mp3": self.auto_mp3_checkbox.isChecked(),
-            "keep_video": self.keep_video_checkbox.isChecked(),
-        }
+        # Preserva chaves que não são editadas nesta janela
+        new_config = load_config()
+        new_config.update(
+            {
+                "default_download_path": self.path_input.text(),
+                "logging_enabled": self.logging_checkbox.isChecked(),
+                "auto_convert_to_mp3": self.auto_mp3_checkbox.isChecked(),
+                "keep_video": self.keep_video_checkbox.isChecked(),
+                "skip_duplicate_audio": self.skip_duplicates_checkbox.isChecked(),
+            }
+        )
         save_config(new_config)
         self.accept()
 
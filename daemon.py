@@ -0,0 +1,465 @@
+import argparse
+import concurrent.futures
+import json
+import logging
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import metrics
+from config import load_config
+from daemon_client import DEFAULT_DAEMON_PORT
+from logging_setup import setup_logging
+from main import JsonLinesReporter, run_batch, set_ffmpeg_path
+from tracing import enable_tracing
+from video_info import VideoInfo
+from watcher import PlaylistWatcher
+
+# Jobs terminados mantidos em memória para consulta
+MAX_FINISHED_JOBS = 100
+
+# Intervalo dos comentários de keep-alive no stream SSE (segundos)
+SSE_KEEPALIVE_INTERVAL = 15
+
+# Opções de job aceitas pela API (as mesmas da CLI)
+JOB_OPTIONS = (
+    "output",
+    "audio_format",
+    "keep_video",
+    "archive",
+    "playlist_items",
+    "newest",
+    "parse_workers",
+    "parse_per_host",
+)
+
+# Opções que precisam ser inteiros positivos
+INTEGER_JOB_OPTIONS = ("newest", "parse_workers", "parse_per_host")
+
+# Hosts aceitos no cabeçalho Host (evita DNS rebinding contra a API local)
+ALLOWED_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+
+
+class JobEventLog(JsonLinesReporter):
+    """Reporter que guarda os eventos de um job em memória
+
+    Cada evento recebe um id sequencial, usado como id do evento SSE para
+    que clientes possam reconectar sem perder eventos (Last-Event-ID).
+    """
+
+    def __init__(self, on_record=None, progress_interval=0.5):
+        super().__init__(None, progress_interval)
+        self.on_record = on_record
+        self.condition = threading.Condition(self.lock)
+        self.records = []
+        self.closed = False
+
+    def write_record(self, record):
+        if self.on_record:
+            self.on_record(record)
+        record["id"] = len(self.records) + 1
+        self.records.append(record)
+        self.condition.notify_all()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.condition.notify_all()
+
+    def wait_events(self, after=0, timeout=None):
+        """Retorna os eventos com id maior que `after`, esperando se preciso
+
+        Returns:
+            Tupla (eventos, fechado). A lista vem vazia se o timeout expirar.
+        """
+        with self.lock:
+            self.condition.wait_for(
+                lambda: len(self.records) > after or self.closed, timeout
+            )
+            return list(self.records[after:]), self.closed
+
+
+class DownloadJob:
+    """Lote de downloads submetido ao daemon"""
+
+    def __init__(self, urls=None, videos=None, **options):
+        self.id = uuid.uuid4().hex[:12]
+        self.urls = list(urls or [])
+        self.videos = videos
+        self.options = options
+        self.state = "queued"
+        self.created = time.time()
+        self.finished = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.items = {}
+        self.events = JobEventLog(on_record=self.track_item)
+
+    def track_item(self, record):
+        """Atualiza o estado de cada vídeo a partir dos eventos do job"""
+        event, url = record["event"], record.get("url")
+        if event == "queued":
+            self.items[url] = {"title": record.get("title"), "status": "pending"}
+        elif event == "progress" and url in self.items:
+            self.items[url]["status"] = record.get("status")
+            self.items[url]["percent"] = record.get("percent")
+        elif event == "finished" and url in self.items:
+            self.items[url]["status"] = "completed" if record["success"] else "failed"
+
+    @property
+    def done(self):
+        return self.state in ("completed", "failed", "cancelled")
+
+    def to_dict(self):
+        statuses = [item["status"] for item in list(self.items.values())]
+        return {
+            "id": self.id,
+            "state": self.state,
+            "created": self.created,
+            "finished": self.finished,
+            "error": self.error,
+            "options": self.options,
+            "total": len(statuses),
+            "completed": statuses.count("completed"),
+            "failed": statuses.count("failed"),
+            "items": [{"url": url, **item} for url, item in list(self.items.items())],
+        }
+
+
+class DownloadService:
+    """Mantém o pool de downloads aquecido e os jobs submetidos
+
+    Todos os jobs compartilham o mesmo pool, então o número de downloads
+    simultâneos é global, não por lote.
+    """
+
+    def __init__(self, max_workers=None):
+        config = load_config()
+        self.default_output = config.get("default_download_path", ".")
+        self.max_workers = max_workers or config.get("daemon_workers", 2)
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="download"
+        )
+        metrics.WORKER_SLOTS.inc(self.max_workers)
+        self.watcher = None
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+
+    def submit(self, urls=None, videos=None, **options):
+        """Cria um job e começa a processá-lo em segundo plano
+
+        Args:
+            urls: URLs a extrair
+            videos: Vídeos já extraídos (como os do ParseThread da GUI)
+            **options: As de JOB_OPTIONS (output, audio_format, keep_video,
+                archive, playlist_items, newest, parse_workers, parse_per_host)
+        """
+        if not urls and not videos:
+            raise ValueError("Informe 'urls' ou 'videos'")
+        for key in INTEGER_JOB_OPTIONS:
+            value = options.get(key)
+            if value is not None and (
+                not isinstance(value, int) or isinstance(value, bool) or value < 1
+            ):
+                raise ValueError(f"'{key}' precisa ser um inteiro positivo")
+        if videos and not all("url" in video and "title" in video for video in videos):
+            raise ValueError("Cada vídeo precisa de 'url' e 'title'")
+        if videos:
+            videos = [VideoInfo.from_dict(video) for video in videos]
+
+        options.setdefault("output", self.default_output)
+        job = DownloadJob(urls, videos, **options)
+        with self.jobs_lock:
+            self.jobs[job.id] = job
+            self._prune_jobs()
+
+        logging.info(f"📥 Job {job.id} recebido ({len(job.urls or job.videos)} itens)")
+        threading.Thread(
+            target=self._run_job, args=(job,), name=f"job-{job.id}", daemon=True
+        ).start()
+        return job
+
+    def _run_job(self, job):
+        job.state = "running"
+        try:
+            if job.options.get("audio_format"):
+                set_ffmpeg_path()
+
+            _, results = run_batch(
+                job.events,
+                job.urls,
+                job.options["output"],
+                audio_format=job.options.get("audio_format"),
+                keep_video=job.options.get("keep_video", False),
+                archive_path=job.options.get("archive"),
+                parse_workers=job.options.get("parse_workers"),
+                parse_per_host=job.options.get("parse_per_host"),
+                playlist_items=job.options.get("playlist_items"),
+                newest=job.options.get("newest"),
+                videos=job.videos,
+                max_workers=self.max_workers,
+                executor=self.executor,
+                cancel_event=job.cancel_event,
+            )
+            if job.cancel_event.is_set():
+                job.state = "cancelled"
+            elif results and all(success for _, success in results):
+                job.state = "completed"
+            else:
+                job.state = "failed"
+        except Exception as e:
+            logging.error(f"❌ Job {job.id} falhou: {e}")
+            job.error = str(e)
+            job.state = "failed"
+            job.events.emit("error", message=str(e))
+        finally:
+            job.finished = time.time()
+            job.events.close()
+            logging.info(f"📦 Job {job.id} terminou: {job.state}")
+
+    def _prune_jobs(self):
+        finished = [job for job in self.jobs.values() if job.done]
+        for job in sorted(finished, key=lambda job: job.created)[:-MAX_FINISHED_JOBS]:
+            del self.jobs[job.id]
+
+    def get_job(self, job_id):
+        with self.jobs_lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self.jobs_lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        """Cancela um job: downloads na fila são pulados e os ativos interrompidos"""
+        job = self.get_job(job_id)
+        if job is not None and not job.done:
+            job.cancel_event.set()
+            logging.info(f"🛑 Cancelando job {job_id}")
+        return job
+
+    def start_watcher(self, config=None):
+        """Começa a observar as playlists de "watch_list" (ver watcher.py)
+
+        Os vídeos novos de cada fonte viram um job comum, na pasta e formato
+        da fonte ("output", "audio_format") ou nos padrões do config.
+        """
+        if config is None:
+            config = load_config()
+        default_format = "mp3" if config.get("auto_convert_to_mp3", True) else None
+
+        def submit_new(videos, source):
+            options = {
+                "output": source.get("output") or self.default_output,
+                "keep_video": config.get("keep_video", False),
+            }
+            audio_format = source.get("audio_format", default_format)
+            if audio_format:
+                options["audio_format"] = audio_format
+            self.submit(videos=videos, **options)
+
+        self.watcher = PlaylistWatcher(submit_new, config).start()
+        return self.watcher
+
+    def shutdown(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+        for job in self.list_jobs():
+            job.cancel_event.set()
+        self.executor.shutdown(wait=False)
+        metrics.WORKER_SLOTS.dec(self.max_workers)
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """API HTTP/JSON do daemon
+
+    GET    /health               estado do daemon
+    POST   /jobs                 submete {"urls": [...]} ou {"videos": [...]}
+    GET    /jobs                 lista os jobs
+    GET    /jobs/<id>            detalhes de um job
+    GET    /jobs/<id>/events     eventos do job via Server-Sent Events
+    GET    /metrics              métricas no formato texto do Prometheus
+    GET    /watch                estado da lista de observação de playlists
+    DELETE /jobs/<id>            cancela um job
+    """
+
+    server_version = "U2BeDaemon/1.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logging.debug(f"🌐 {self.address_string()} {format % args}")
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self):
+        """Valida o Host e retorna os segmentos do caminho (ou None)"""
+        host = self.headers.get("Host", "").rsplit(":", 1)[0]
+        if host not in ALLOWED_HOSTS:
+            self.send_json(403, {"error": "Host não permitido"})
+            return None
+        return [part for part in urlparse(self.path).path.split("/") if part]
+
+    def find_job(self, job_id):
+        job = self.service.get_job(job_id)
+        if job is None:
+            self.send_json(404, {"error": f"Job {job_id} não encontrado"})
+        return job
+
+    def do_GET(self):
+        parts = self.route()
+        if parts is None:
+            return
+
+        if parts == ["health"]:
+            self.send_json(
+                200,
+                {
+                    "status": "ok",
+                    "workers": self.service.max_workers,
+                    "jobs": len(self.service.list_jobs()),
+                },
+            )
+        elif parts == ["metrics"]:
+            metrics.send_metrics(self)
+        elif parts == ["watch"]:
+            watcher = self.service.watcher
+            self.send_json(
+                200,
+                watcher.status() if watcher else {"paused": None, "sources": []},
+            )
+        elif parts == ["jobs"]:
+            jobs = [job.to_dict() for job in self.service.list_jobs()]
+            self.send_json(200, {"jobs": jobs})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.find_job(parts[1])
+            if job is not None:
+                self.send_json(200, job.to_dict())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+            job = self.find_job(parts[1])
+            if job is not None:
+                self.stream_events(job)
+        else:
+            self.send_json(404, {"error": "Rota não encontrada"})
+
+    def do_POST(self):
+        parts = self.route()
+        if parts is None:
+            return
+        if parts != ["jobs"]:
+            self.send_json(404, {"error": "Rota não encontrada"})
+            return
+
+        # Exigir JSON impede que páginas web submetam jobs sem preflight CORS
+        if not self.headers.get("Content-Type", "").startswith("application/json"):
+            self.send_json(415, {"error": "Use Content-Type: application/json"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            options = {
+                key: payload[key] for key in JOB_OPTIONS if payload.get(key) is not None
+            }
+            job = self.service.submit(
+                urls=payload.get("urls"), videos=payload.get("videos"), **options
+            )
+        except (ValueError, TypeError, AttributeError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        self.send_json(202, job.to_dict())
+
+    def do_DELETE(self):
+        parts = self.route()
+        if parts is None:
+            return
+        if len(parts) != 2 or parts[0] != "jobs":
+            self.send_json(404, {"error": "Rota não encontrada"})
+            return
+
+        if self.find_job(parts[1]) is not None:
+            self.send_json(200, self.service.cancel(parts[1]).to_dict())
+
+    def stream_events(self, job):
+        """Envia os eventos do job como SSE até o job terminar"""
+        query = parse_qs(urlparse(self.path).query)
+        after = int(
+            self.headers.get("Last-Event-ID") or query.get("after", ["0"])[0] or 0
+        )
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        try:
+            while True:
+                records, closed = job.events.wait_events(after, SSE_KEEPALIVE_INTERVAL)
+                for record in records:
+                    data = json.dumps(record, ensure_ascii=False, default=str)
+                    self.wfile.write(
+                        f"id: {record['id']}\nevent: {record['event']}\n"
+                        f"data: {data}\n\n".encode("utf-8")
+                    )
+                    after = record["id"]
+                if not records:
+                    if closed:
+                        break
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            logging.debug(f"Cliente SSE do job {job.id} desconectou")
+
+
+def create_server(service, port=None, host="127.0.0.1"):
+    """Cria o servidor HTTP do daemon (só escuta em localhost por padrão)"""
+    if port is None:
+        port = load_config().get("daemon_port", DEFAULT_DAEMON_PORT)
+    server = ThreadingHTTPServer((host, port), DaemonRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def run_daemon(port=None, max_workers=None):
+    trace_file = load_config().get("trace_file")
+    if trace_file:
+        enable_tracing(trace_file)
+
+    service = DownloadService(max_workers)
+    service.start_watcher()
+    server = create_server(service, port)
+    logging.info(
+        f"🚀 Daemon escutando em http://127.0.0.1:{server.server_port} "
+        f"({service.max_workers} downloads simultâneos)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Encerrando daemon")
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the local download daemon")
+    parser.add_argument("--port", type=int, help="HTTP port (default: config)")
+    parser.add_argument(
+        "--workers", type=int, help="Simultaneous downloads across all jobs"
+    )
+
+    args = parser.parse_args()
+    setup_logging()
+    run_daemon(args.port, args.workers)
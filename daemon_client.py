@@ -0,0 +1,101 @@
+import json
+import urllib.error
+import urllib.request
+
+from config import load_config
+
+DEFAULT_DAEMON_PORT = 8765
+
+
+class DaemonClient:
+    """Cliente da API HTTP do daemon de downloads (daemon.py)"""
+
+    def __init__(self, host="127.0.0.1", port=None, timeout=5):
+        if port is None:
+            port = load_config().get("daemon_port", DEFAULT_DAEMON_PORT)
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None):
+        data = None
+        headers = {}
+        if payload is not None:
+            data = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        request = urllib.request.Request(
+            self.base_url + path, data=data, headers=headers, method=method
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode("utf-8")).get("error")
+            except ValueError:
+                message = e.reason
+            raise RuntimeError(f"Daemon respondeu {e.code}: {message}") from e
+        except OSError as e:
+            raise RuntimeError(f"Daemon indisponível em {self.base_url}: {e}") from e
+
+    def is_available(self):
+        """Retorna True se o daemon está respondendo"""
+        try:
+            return self._request("GET", "/health").get("status") == "ok"
+        except RuntimeError:
+            return False
+
+    def submit(self, urls=None, videos=None, **options):
+        """Submete um job com URLs ou vídeos já extraídos
+
+        Args:
+            **options: output, audio_format, keep_video, archive,
+                playlist_items, newest, parse_workers e parse_per_host
+        """
+        if videos is not None:
+            videos = [dict(video) for video in videos]
+        return self._request(
+            "POST", "/jobs", {"urls": urls, "videos": videos, **options}
+        )
+
+    def list_jobs(self):
+        return self._request("GET", "/jobs")["jobs"]
+
+    def get_job(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def cancel(self, job_id):
+        return self._request("DELETE", f"/jobs/{job_id}")
+
+    def watch_status(self):
+        """Estado da lista de observação de playlists do daemon"""
+        return self._request("GET", "/watch")
+
+    def iter_events(self, job_id, after=0):
+        """Acompanha os eventos de um job (SSE) até ele terminar
+
+        Reconecta a partir do último id recebido se a conexão cair.
+
+        Yields:
+            Dicionários de evento, os mesmos emitidos pela CLI em JSON
+        """
+        while True:
+            request = urllib.request.Request(
+                f"{self.base_url}/jobs/{job_id}/events",
+                headers={"Last-Event-ID": str(after)},
+            )
+            try:
+                with urllib.request.urlopen(request) as response:
+                    for line in response:
+                        if line.startswith(b"data: "):
+                            record = json.loads(line[6:].decode("utf-8"))
+                            after = record["id"]
+                            yield record
+                return
+            except urllib.error.HTTPError as e:
+                raise RuntimeError(
+                    f"Daemon respondeu {e.code} para o job {job_id}"
+                ) from e
+            except (ConnectionResetError, urllib.error.URLError) as e:
+                if not self.is_available():
+                    raise RuntimeError(f"Conexão com o daemon perdida: {e}") from e
@@ -0,0 +1,143 @@
+import errno
+import logging
+import os
+import shutil
+import threading
+
+from config import load_config
+from scheduler import estimated_size
+from staging import FREE_SPACE_MARGIN, STAGING_SIZE_FACTOR, staging_root
+
+# Tamanho assumido quando nem tamanho nem duração são conhecidos (bytes)
+UNKNOWN_SIZE_ESTIMATE = 100 * 1024**2
+
+# Bitrate máximo do áudio convertido, para estimar o arquivo final (bytes/s)
+AUDIO_BYTES_PER_SECOND = 320 * 1024 // 8
+
+# Intervalo para reavaliar o espaço livre enquanto um job espera (segundos)
+RECHECK_INTERVAL = 5
+
+_guard = None
+_guard_lock = threading.Lock()
+
+
+def _device(path):
+    """(dispositivo, pasta existente) onde path ficará"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return os.stat(path).st_dev, path
+
+
+def required_space(
+    video_info, output_path, convert_to_audio, keep_video=False, config=None
+):
+    """Espaço que um download ocupa no pior momento, por sistema de arquivos
+
+    O estágio (ou o destino, sem estágio) guarda vídeo, áudio separado e o
+    resultado do merge/conversão ao mesmo tempo: STAGING_SIZE_FACTOR vezes
+    o tamanho estimado. Se o estágio está em outro sistema de arquivos, o
+    destino também precisa comportar o arquivo final (e o vídeo mantido).
+
+    Returns:
+        Dict {dispositivo: (pasta, bytes)}
+    """
+    size = estimated_size(video_info) or UNKNOWN_SIZE_ESTIMATE
+    final_size = size
+    if convert_to_audio:
+        duration = video_info.get("duration")
+        final_size = min(size, duration * AUDIO_BYTES_PER_SECOND) if duration else size
+        if keep_video:
+            final_size += size
+
+    work_dir = staging_root(config) or output_path
+    needs = {}
+    device, path = _device(work_dir)
+    needs[device] = (path, size * STAGING_SIZE_FACTOR)
+    device, path = _device(output_path)
+    if device not in needs:
+        needs[device] = (path, final_size)
+    return needs
+
+
+class DiskSpaceGuard:
+    """Controle de admissão dos downloads pelo espaço livre em disco
+
+    Cada job reserva o espaço estimado (required_space) antes de começar e
+    libera ao terminar. Um job cuja reserva não cabe no espaço livre menos
+    as reservas dos jobs em andamento espera, em vez de começar e falhar no
+    meio deixando .part pelas pastas. A conta é conservadora: o que um job
+    ativo já gravou sai do espaço livre e continua reservado.
+
+    Compartilhado entre os lotes do processo (ver get_disk_space_guard).
+    """
+
+    def __init__(self, margin=FREE_SPACE_MARGIN):
+        self.margin = margin
+        self.condition = threading.Condition()
+        self.reserved = {}
+
+    def reserve(self, needs):
+        """Reserva o espaço de um job
+
+        Returns:
+            A reserva (para release) ou None se o job deve esperar
+
+        Raises:
+            OSError(ENOSPC): O job não cabe nem com o disco sem reservas
+        """
+        with self.condition:
+            for device, (path, needed) in needs.items():
+                free = shutil.disk_usage(path).free - self.margin
+                if needed <= free - self.reserved.get(device, 0):
+                    continue
+                if needed > free and not self.reserved.get(device):
+                    raise OSError(
+                        errno.ENOSPC,
+                        f"Espaço insuficiente em {path}: "
+                        f"{needed / 1024**2:.1f} MB necessários, "
+                        f"{max(free, 0) / 1024**2:.1f} MB livres",
+                    )
+                return None
+            for device, (_, needed) in needs.items():
+                self.reserved[device] = self.reserved.get(device, 0) + needed
+            return needs
+
+    def release(self, reservation):
+        """Devolve o espaço de um job que terminou e acorda quem espera"""
+        if not reservation:
+            return
+        with self.condition:
+            for device, (_, needed) in reservation.items():
+                self.reserved[device] -= needed
+                if self.reserved[device] <= 0:
+                    del self.reserved[device]
+            self.condition.notify_all()
+
+    def wait(self, timeout=RECHECK_INTERVAL):
+        """Espera alguma reserva ser liberada (ou o timeout)"""
+        with self.condition:
+            self.condition.wait(timeout)
+
+    def reserved_bytes(self):
+        with self.condition:
+            return sum(self.reserved.values())
+
+
+def get_disk_space_guard(config=None):
+    """DiskSpaceGuard do processo, ou None se "disk_admission_control" está
+    desligado"""
+    global _guard
+
+    if config is None:
+        config = load_config()
+    if not config.get("disk_admission_control", True):
+        return None
+    with _guard_lock:
+        if _guard is None:
+            _guard = DiskSpaceGuard()
+            logging.debug("💽 Controle de admissão por espaço em disco ativo")
+        return _guard
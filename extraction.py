@@ -0,0 +1,142 @@
+import concurrent.futures
+import logging
+import re
+from urllib.parse import parse_qs, urlsplit
+
+from config import load_config
+
+# Hosts que levam ao mesmo serviço dividem o mesmo limite por host
+HOST_ALIASES = {
+    "youtu.be": "youtube.com",
+    "m.youtube.com": "youtube.com",
+    "music.youtube.com": "youtube.com",
+    "youtube-nocookie.com": "youtube.com",
+}
+
+# Caminhos de um vídeo do YouTube com o ID no próprio caminho
+_YOUTUBE_PATH_ID = re.compile(r"^/(?:shorts|embed|live|v)/([\w-]+)")
+_YOUTUBE_ID = re.compile(r"^[\w-]+$")
+
+
+def host_key(url):
+    """Host usado no limite de extrações simultâneas por site"""
+    host = (urlsplit(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return HOST_ALIASES.get(host, host)
+
+
+def youtube_video_id(url):
+    """ID do vídeo de uma URL do YouTube (watch?v=, youtu.be, music, shorts,
+    embed), ou None se a URL não aponta para um vídeo do YouTube"""
+    if host_key(url) != "youtube.com":
+        return None
+
+    parts = urlsplit(url)
+    if (parts.hostname or "").lower() == "youtu.be":
+        video_id = parts.path.strip("/").split("/")[0]
+    elif parts.path == "/watch":
+        video_id = parse_qs(parts.query).get("v", [""])[0]
+    else:
+        match = _YOUTUBE_PATH_ID.match(parts.path)
+        video_id = match.group(1) if match else ""
+    return video_id if _YOUTUBE_ID.match(video_id) else None
+
+
+def canonical_video_url(url):
+    """URL única para o mesmo vídeo do YouTube, qualquer que seja a forma
+    colada; outras URLs voltam sem mudança"""
+    video_id = youtube_video_id(url)
+    if video_id is None:
+        return url
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def extraction_limits(config=None):
+    """(total, por host) de extrações simultâneas configurados"""
+    if config is None:
+        config = load_config()
+    return (
+        max(1, int(config.get("parse_concurrency", 8))),
+        max(1, int(config.get("parse_per_host", 4))),
+    )
+
+
+async def extract_stream(
+    urls, extract, concurrency=8, per_host=4, executor=None, cancel_event=None
+):
+    """Extrai várias URLs e entrega (url, vídeos) conforme cada uma termina
+
+    As chamadas bloqueantes do yt-dlp (extract) rodam num executor de
+    threads; o loop só decide quantas rodam ao mesmo tempo, no total e por
+    host, então milhares de URLs não viram milhares de threads.
+
+    Args:
+        urls: URLs a extrair
+        extract: Função bloqueante url -> lista de vídeos
+        concurrency: Máximo de extrações simultâneas
+        per_host: Máximo de extrações simultâneas por host (ver host_key)
+        executor: Executor para as chamadas; se None, um próprio é criado e
+            encerrado no fim
+        cancel_event: threading.Event; quando ativado, URLs que ainda não
+            começaram são descartadas (as em andamento terminam sozinhas)
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    owns_executor = executor is None
+    if owns_executor:
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="extract"
+        )
+    total_slots = asyncio.Semaphore(concurrency)
+    host_slots = {}
+
+    async def run(url):
+        # O limite do host vem antes do total: uma URL esperando pelo seu
+        # host não ocupa uma vaga que outro host poderia usar
+        host = host_slots.setdefault(host_key(url), asyncio.Semaphore(per_host))
+        async with host, total_slots:
+            if cancel_event is not None and cancel_event.is_set():
+                return url, None
+            try:
+                return url, await loop.run_in_executor(executor, extract, url)
+            except Exception as e:
+                logging.error(f"Erro no parse de {url}: {e}")
+                return url, []
+
+    tasks = [asyncio.ensure_future(run(url)) for url in urls]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            url, videos = await next_done
+            if videos is not None:
+                yield url, videos
+    finally:
+        for task in tasks:
+            task.cancel()
+        if owns_executor:
+            executor.shutdown(wait=False)
+
+
+def extract_all(urls, extract, on_result=None, **options):
+    """Versão bloqueante de extract_stream, com um loop de eventos próprio
+
+    Args:
+        on_result: Callback (url, vídeos) chamado assim que cada URL termina
+        **options: Opções de extract_stream (concurrency, per_host,
+            executor, cancel_event)
+
+    Returns:
+        Lista com os vídeos de todas as URLs, na ordem em que terminaram
+    """
+    import asyncio
+
+    async def collect():
+        all_videos = []
+        async for url, videos in extract_stream(urls, extract, **options):
+            all_videos.extend(videos)
+            if on_result is not None:
+                on_result(url, videos)
+        return all_videos
+
+    return asyncio.run(collect())
@@ -0,0 +1,469 @@
+import argparse
+import atexit
+import base64
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from audio_processor import stream_pcm
+from config import load_config
+from music_library import iter_audio_files
+
+FINGERPRINT_INDEX_VERSION = 1
+
+# Parâmetros do fingerprint espectral (estilo Haitsma-Kalker)
+FP_SAMPLE_RATE = 5512
+FP_FRAME = 2048
+FP_HOP = 512
+FP_BANDS = 33  # 33 bandas → 32 bits por sub-fingerprint
+FP_MIN_FREQ = 300.0
+FP_MAX_FREQ = 2000.0
+FP_MAX_SECONDS = 120  # Só o início da faixa é analisado
+
+# Limiar de bits diferentes para considerar duas faixas iguais
+MAX_BIT_ERROR_RATE = 0.35
+MIN_MATCH_VOTES = 3
+
+_SILENT_VALUES = (0, 0xFFFFFFFF)
+
+# Espera antes de gravar o índice depois de uma faixa nova, para juntar as
+# faixas de um lote numa só gravação (segundos)
+FINGERPRINT_SAVE_DELAY = 5
+
+
+def _band_edges():
+    """Índices das bandas logarítmicas no espectro do frame"""
+    freqs = np.geomspace(FP_MIN_FREQ, FP_MAX_FREQ, FP_BANDS + 1)
+    return np.round(freqs * FP_FRAME / FP_SAMPLE_RATE).astype(np.int64)
+
+
+def fingerprint_from_chunks(chunks, max_seconds=FP_MAX_SECONDS):
+    """Calcula o fingerprint de blocos PCM mono int16 a 5512 Hz
+
+    Cada frame gera um inteiro de 32 bits com o sinal da variação de energia
+    entre bandas vizinhas e entre frames consecutivos. Os blocos são
+    consumidos aos poucos, sem manter o áudio inteiro na memória.
+
+    Returns:
+        Array uint32 com um sub-fingerprint por frame
+    """
+    edges = _band_edges()
+    window = np.hanning(FP_FRAME).astype(np.float32)
+    weights = (1 << np.arange(FP_BANDS - 1, dtype=np.uint64)).astype(np.uint64)
+    max_samples = int(max_seconds * FP_SAMPLE_RATE) if max_seconds else None
+
+    buffer = np.empty(0, dtype=np.float32)
+    consumed = 0
+    previous_diff = None
+    subfingerprints = []
+
+    for chunk in chunks:
+        if max_samples is not None:
+            if consumed >= max_samples:
+                break
+            chunk = chunk[: max_samples - consumed]
+        consumed += len(chunk)
+        buffer = np.concatenate((buffer, chunk.astype(np.float32)))
+
+        frame_count = (
+            0 if len(buffer) < FP_FRAME else 1 + (len(buffer) - FP_FRAME) // FP_HOP
+        )
+        if not frame_count:
+            continue
+
+        indices = (
+            np.arange(FP_FRAME)[None, :] + FP_HOP * np.arange(frame_count)[:, None]
+        )
+        spectrum = np.abs(np.fft.rfft(buffer[indices] * window, axis=1)) ** 2
+        energies = np.add.reduceat(spectrum, edges[:-1], axis=1)
+        diffs = energies[:, :-1] - energies[:, 1:]
+
+        if previous_diff is not None:
+            diffs = np.vstack((previous_diff, diffs))
+        bits = (diffs[1:] - diffs[:-1]) > 0
+        if len(bits):
+            subfingerprints.append((bits.astype(np.uint64) @ weights).astype(np.uint32))
+        previous_diff = diffs[-1:]
+
+        buffer = buffer[frame_count * FP_HOP :]
+
+    if not subfingerprints:
+        return np.zeros(0, dtype=np.uint32)
+    return np.concatenate(subfingerprints)
+
+
+def fingerprint_file(file_path, max_seconds=FP_MAX_SECONDS):
+    """Calcula o fingerprint de um arquivo (áudio ou vídeo) via ffmpeg"""
+    chunks = stream_pcm(file_path, sample_rate=FP_SAMPLE_RATE)
+    return fingerprint_from_chunks(chunks, max_seconds)
+
+
+def bit_error_rate(first, second, offset=0):
+    """Fração de bits diferentes entre dois fingerprints alinhados
+
+    offset é a posição de second em relação a first.
+    """
+    start_first = max(0, offset)
+    start_second = max(0, -offset)
+    length = min(len(first) - start_first, len(second) - start_second)
+    if length <= 0:
+        return 1.0
+
+    xor = np.bitwise_xor(
+        first[start_first : start_first + length],
+        second[start_second : start_second + length],
+    )
+    differing = np.unpackbits(xor.view(np.uint8)).sum()
+    return float(differing) / (length * 32)
+
+
+def _file_identity(path):
+    """(dispositivo, inode) do arquivo para onde path aponta"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return path
+    return stat.st_dev, stat.st_ino
+
+
+class FingerprintIndex:
+    """Índice de fingerprints com busca invertida por sub-fingerprint
+
+    A busca consulta apenas as faixas que compartilham sub-fingerprints
+    exatos com a consulta (tabela hash), e só essas candidatas têm a taxa de
+    erro de bits calculada. O custo não cresce linearmente com a biblioteca.
+    """
+
+    def __init__(self, index_path=None):
+        self.index_path = index_path
+        self.tracks = {}  # path -> {"size", "mtime_ns", "fp"}
+        self.inverted = {}  # sub-fingerprint -> [(path, posição), ...]
+        self.lock = threading.RLock()
+        # Serializa as gravações inteiras (serialização, escrita e troca)
+        self.save_lock = threading.Lock()
+        self.save_timer = None
+
+    def add(self, path, fingerprint, size=None, mtime_ns=None):
+        """Adiciona ou substitui o fingerprint de uma faixa"""
+        with self.lock:
+            self.remove(path)
+            if size is None or mtime_ns is None:
+                stat = os.stat(path)
+                size, mtime_ns = stat.st_size, stat.st_mtime_ns
+            self.tracks[path] = {"size": size, "mtime_ns": mtime_ns, "fp": fingerprint}
+            for position, value in enumerate(fingerprint.tolist()):
+                # Frames de silêncio (sem variação) não ajudam a identificar
+                if value not in _SILENT_VALUES:
+                    self.inverted.setdefault(value, []).append((path, position))
+
+    def remove(self, path):
+        """Remove uma faixa do índice"""
+        with self.lock:
+            track = self.tracks.pop(path, None)
+            if not track:
+                return
+            for value in set(track["fp"].tolist()):
+                entries = [
+                    entry for entry in self.inverted.get(value, ()) if entry[0] != path
+                ]
+                if entries:
+                    self.inverted[value] = entries
+                else:
+                    self.inverted.pop(value, None)
+
+    def is_current(self, path):
+        """Verifica se o fingerprint salvo ainda corresponde ao arquivo"""
+        track = self.tracks.get(path)
+        if not track:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return track["size"] == stat.st_size and track["mtime_ns"] == stat.st_mtime_ns
+
+    def query(self, fingerprint, exclude=None, max_ber=MAX_BIT_ERROR_RATE):
+        """Procura faixas com áudio equivalente ao fingerprint
+
+        Returns:
+            Lista de (path, taxa de erro de bits) ordenada da melhor para a pior
+        """
+        votes = Counter()
+        with self.lock:
+            for position, value in enumerate(fingerprint.tolist()):
+                # Vota no par (faixa, deslocamento) para alinhar os frames
+                for path, other_position in self.inverted.get(value, ()):
+                    if path != exclude:
+                        votes[(path, other_position - position)] += 1
+
+            matches = {}
+            for (path, offset), count in votes.most_common(20):
+                if count < MIN_MATCH_VOTES or path in matches:
+                    continue
+                ber = bit_error_rate(fingerprint, self.tracks[path]["fp"], -offset)
+                if ber <= max_ber:
+                    matches[path] = ber
+
+        return sorted(matches.items(), key=lambda item: item[1])
+
+    def find_duplicates(self):
+        """Agrupa as faixas do índice que têm o mesmo áudio
+
+        Caminhos que são o mesmo arquivo (hardlinks ou symlinks, como os das
+        pastas de playlist ligadas ao acervo de mídia) não são duplicatas:
+        de cada arquivo só o primeiro caminho entra no grupo, e remover os
+        outros tiraria o vídeo dessas playlists.
+
+        Returns:
+            Lista de grupos (listas de paths ordenadas) com 2 ou mais faixas
+        """
+        parent = {}
+
+        def find(path):
+            while parent.get(path, path) != path:
+                path = parent[path]
+            return path
+
+        with self.lock:
+            for path, track in self.tracks.items():
+                for other, _ in self.query(track["fp"], exclude=path):
+                    root_a, root_b = find(path), find(other)
+                    if root_a != root_b:
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+            groups = {}
+            for path in self.tracks:
+                groups.setdefault(find(path), []).append(path)
+
+        duplicates = []
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+            files = {}
+            for path in sorted(group):
+                files.setdefault(_file_identity(path), path)
+            if len(files) > 1:
+                duplicates.append(sorted(files.values()))
+        return duplicates
+
+    def load(self):
+        """Carrega o índice do arquivo JSON"""
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Índice de fingerprints inválido, recriando: {e}")
+            return
+
+        if data.get("version") != FINGERPRINT_INDEX_VERSION:
+            return
+        for entry in data.get("tracks", []):
+            fingerprint = np.frombuffer(base64.b64decode(entry["fp"]), dtype="<u4")
+            self.add(entry["path"], fingerprint, entry["size"], entry["mtime_ns"])
+
+    def save(self):
+        """Salva o índice no arquivo JSON (escrita atômica)
+
+        Cada gravação usa um arquivo temporário próprio, e gravações de
+        threads diferentes acontecem uma de cada vez.
+        """
+        if not self.index_path:
+            return
+        with self.save_lock:
+            with self.lock:
+                tracks = [
+                    {
+                        "path": path,
+                        "size": track["size"],
+                        "mtime_ns": track["mtime_ns"],
+                        "fp": base64.b64encode(
+                            track["fp"].astype("<u4").tobytes()
+                        ).decode("ascii"),
+                    }
+                    for path, track in self.tracks.items()
+                ]
+
+            directory, name = os.path.split(os.path.abspath(self.index_path))
+            descriptor, temp_path = tempfile.mkstemp(
+                prefix=f".{name}.", suffix=".tmp", dir=directory
+            )
+            try:
+                with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                    json.dump(
+                        {"version": FINGERPRINT_INDEX_VERSION, "tracks": tracks}, file
+                    )
+                os.replace(temp_path, self.index_path)
+            except BaseException:
+                try:
+                    os.remove(temp_path)
+                except FileNotFoundError:
+                    pass
+                raise
+
+    def save_later(self, delay=FINGERPRINT_SAVE_DELAY):
+        """Agenda uma gravação; as faixas adicionadas até lá vão juntas"""
+        with self.lock:
+            if self.save_timer is None:
+                self.save_timer = threading.Timer(delay, self._save_scheduled)
+                self.save_timer.daemon = True
+                self.save_timer.start()
+
+    def _save_scheduled(self):
+        with self.lock:
+            self.save_timer = None
+        try:
+            self.save()
+        except OSError as e:
+            logging.error(f"❌ Erro ao salvar o índice de fingerprints: {e}")
+
+    def flush(self):
+        """Grava já uma gravação agendada por save_later (se houver)"""
+        with self.lock:
+            timer, self.save_timer = self.save_timer, None
+        if timer is not None:
+            timer.cancel()
+            self._save_scheduled()
+
+    def update_from_library(self, library_path, progress_callback=None):
+        """Indexa a biblioteca, processando apenas arquivos novos ou alterados
+
+        Returns:
+            Número de faixas (re)processadas
+        """
+        files = [str(path) for path in iter_audio_files(library_path)]
+
+        # Remove faixas que não existem mais
+        existing = set(files)
+        for path in list(self.tracks):
+            if path.startswith(str(library_path)) and path not in existing:
+                self.remove(path)
+
+        processed = 0
+        for position, path in enumerate(files):
+            if self.is_current(path):
+                continue
+            try:
+                fingerprint = fingerprint_file(path)
+            except OSError as e:
+                logging.warning(f"Erro ao gerar fingerprint de {path}: {e}")
+                continue
+            if len(fingerprint):
+                self.add(path, fingerprint)
+                processed += 1
+            if progress_callback:
+                progress_callback(position + 1, len(files))
+
+        logging.info(f"Fingerprints atualizados: {processed} de {len(files)} faixas")
+        return processed
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_fingerprint_index():
+    """Retorna o índice compartilhado, carregado do arquivo na primeira vez"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            index_path = load_config().get(
+                "fingerprint_index_file", "fingerprints.json"
+            )
+            _index = FingerprintIndex(index_path)
+            atexit.register(_index.flush)
+            _index.load()
+        return _index
+
+
+def find_known_duplicate(file_path):
+    """Verifica se o áudio de um download já existe na biblioteca
+
+    Returns:
+        Tupla (path da faixa existente ou None, fingerprint calculado)
+    """
+    fingerprint = fingerprint_file(file_path)
+    if not len(fingerprint):
+        return None, fingerprint
+
+    index = get_fingerprint_index()
+    for path, _ in index.query(fingerprint, exclude=file_path):
+        if os.path.exists(path):
+            return path, fingerprint
+    return None, fingerprint
+
+
+def resolve_duplicates(groups, mode="hardlink"):
+    """Substitui por hardlinks ou remove as cópias de cada grupo
+
+    A primeira faixa de cada grupo é mantida. Hardlinks só são criados entre
+    arquivos com a mesma extensão (o conteúdo passa a ser o da faixa mantida).
+
+    Args:
+        groups: Grupos retornados por FingerprintIndex.find_duplicates
+        mode: "hardlink" ou "remove"
+
+    Returns:
+        Número de arquivos substituídos ou removidos
+    """
+    index = get_fingerprint_index()
+    changed = 0
+
+    for group in groups:
+        keep = group[0]
+        for duplicate in group[1:]:
+            try:
+                if mode == "remove":
+                    os.remove(duplicate)
+                    index.remove(duplicate)
+                elif Path(duplicate).suffix.lower() == Path(keep).suffix.lower():
+                    if os.path.samefile(keep, duplicate):
+                        continue
+                    temp_path = f"{duplicate}.link"
+                    os.link(keep, temp_path)
+                    os.replace(temp_path, duplicate)
+                    index.add(duplicate, index.tracks[keep]["fp"])
+                else:
+                    logging.info(f"Formato diferente, mantendo: {duplicate}")
+                    continue
+                changed += 1
+            except OSError as e:
+                logging.warning(f"Erro ao tratar duplicata {duplicate}: {e}")
+
+    index.save()
+    return changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find duplicate audio in the library")
+    parser.add_argument("path", nargs="?", help="Library directory")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--hardlink", action="store_true", help="Hardlink duplicates")
+    action.add_argument("--remove", action="store_true", help="Remove duplicates")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    library_path = args.path or load_config().get("default_download_path", ".")
+    fingerprint_index = get_fingerprint_index()
+    fingerprint_index.update_from_library(library_path)
+    fingerprint_index.save()
+
+    duplicate_groups = fingerprint_index.find_duplicates()
+    for duplicate_group in duplicate_groups:
+        print("\n".join(duplicate_group))
+        print()
+    print(f"{len(duplicate_groups)} grupos de duplicatas encontrados")
+
+    if args.hardlink or args.remove:
+        count = resolve_duplicates(
+            duplicate_groups, "remove" if args.remove else "hardlink"
+        )
+        print(f"{count} arquivos tratados")
@@ -2,6 +2,7 @@ import logging
 import os
 import subprocess
 import sys
+import threading
 from datetime import datetime
 
 from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
@@ -29,37 +30,55 @@ from PyQt5.QtWidgets import (
 )
 
 from config import (
-    add_download_to_history,
+    add_downloads_to_history,
     load_config,
     load_downloads_history,
     save_config,
+    set_download_priority,
     update_download_status,
 )
 from config_window import ConfigWindow
+from logging_setup import setup_logging
 from main import (
     download_videos_parallel,
+    history_details,
     parse_urls_and_extract_info,
     parse_urls_parallel,
 )
-from music_player import MusicPlayer
+from scheduler import DownloadQueue
+from video_info import VideoInfo
 
 
 class ParseThread(QThread):
     """Thread para parsing paralelo de URLs"""
 
     parse_finished = pyqtSignal(list)
+    parse_progress = pyqtSignal(int, int)  # URLs concluídas, total
     parse_error = pyqtSignal(str)
 
     def __init__(self, urls):
         super().__init__()
         self.urls = urls
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """Descarta as URLs que ainda não começaram a ser analisadas"""
+        self.cancel_event.set()
 
     def run(self):
         try:
             logging.info(f"Iniciando parse paralelo de {len(self.urls)} URLs")
             for url in self.urls:
                 logging.info(f"Processando URL: {url}")
-            videos = parse_urls_parallel(self.urls, max_workers=3)
+            finished_urls = []
+
+            def on_result(url, videos):
+                finished_urls.append(url)
+                self.parse_progress.emit(len(finished_urls), len(self.urls))
+
+            videos = parse_urls_parallel(
+                self.urls, on_result=on_result, cancel_event=self.cancel_event
+            )
             self.parse_finished.emit(videos)
         except Exception as e:
             self.parse_error.emit(str(e))
@@ -78,6 +97,8 @@ class ParallelDownloadThread(QThread):
         self.download_path = download_path
         self.to_mp3 = to_mp3
         self.keep_video = keep_video
+        # Fila compartilhada com a GUI para reordenar itens ainda não iniciados
+        self.queue = DownloadQueue()
 
     def progress_callback(self, url, data):
         """Callback para progresso de download"""
@@ -85,6 +106,9 @@ class ParallelDownloadThread(QThread):
 
     def run(self):
         try:
+            if load_config().get("use_daemon", False) and self.run_via_daemon():
+                return
+
             logging.info(
                 f"Iniciando download paralelo de {len(self.videos_info)} vídeos"
             )
@@ -95,6 +119,7 @@ class ParallelDownloadThread(QThread):
                 self.keep_video,
                 max_workers=2,
                 progress_callback=self.progress_callback,
+                queue=self.queue,
             )
             logging.info(f"Downloads concluídos: {len(results)}")
         except Exception as e:
@@ -102,6 +127,57 @@ class ParallelDownloadThread(QThread):
         finally:
             self.all_finished.emit()
 
+    def run_via_daemon(self):
+        """Envia os vídeos ao daemon e repassa o progresso dos eventos do job
+
+        Returns:
+            False se o daemon não estiver rodando (o download é feito aqui)
+        """
+        from daemon_client import DaemonClient
+
+        client = DaemonClient()
+        if not client.is_available():
+            logging.info("Daemon indisponível, baixando neste processo")
+            return False
+
+        job = client.submit(
+            videos=self.videos_info,
+            output=os.path.abspath(self.download_path),
+            audio_format="mp3" if self.to_mp3 else None,
+            keep_video=self.keep_video,
+        )
+        logging.info(f"Download enviado ao daemon (job {job['id']})")
+
+        for record in client.iter_events(job["id"]):
+            if record["event"] == "progress":
+                self.progress_update.emit(record["url"], record)
+            elif record["event"] == "finished":
+                status = "finished" if record["success"] else "error"
+                self.progress_update.emit(record["url"], {"status": status})
+        return True
+
+
+class DuplicateScanThread(QThread):
+    """Thread para indexar a biblioteca e procurar áudio duplicado"""
+
+    scan_finished = pyqtSignal(list)  # grupos de duplicatas
+    scan_error = pyqtSignal(str)
+
+    def __init__(self, library_path):
+        super().__init__()
+        self.library_path = library_path
+
+    def run(self):
+        from fingerprint import get_fingerprint_index
+
+        try:
+            index = get_fingerprint_index()
+            index.update_from_library(self.library_path)
+            index.save()
+            self.scan_finished.emit(index.find_duplicates())
+        except Exception as e:
+            self.scan_error.emit(str(e))
+
 
 class YouTubeDownloader(QMainWindow):
     def __init__(self):
@@ -110,23 +186,36 @@ class YouTubeDownloader(QMainWindow):
         self.download_thread = None
         self.parse_thread = None
         self.parallel_download_thread = None
+        self.duplicate_scan_thread = None
         self.setup_logging()
         self.initUI()
         self.load_downloads_history()
 
+        # Métricas do pipeline em http://127.0.0.1:<metrics_port>/metrics
+        self.metrics_server = None
+        if self.config.get("metrics_port"):
+            from metrics import start_metrics_server
+
+            self.metrics_server = start_metrics_server(self.config["metrics_port"])
+
+        # Trace opcional das fases de cada download, gravado ao sair
+        if self.config.get("trace_file"):
+            from tracing import enable_tracing
+
+            enable_tracing(self.config["trace_file"])
+
         # Timer para atualizar a lista periodicamente (reduzido para evitar spam de logs)
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self.load_downloads_history)
         self.update_timer.start(10000)  # Atualiza a cada 10 segundos
 
     def setup_logging(self):
-        """Configura o logging baseado nas configurações"""
-        if self.config.get("logging_enabled", True):
-            logging.basicConfig(
-                level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s"
-            )
-        else:
-            logging.disable(logging.CRITICAL)
+        """Configura o logging baseado nas configurações
+
+        Níveis por módulo ("log_levels"), arquivo rotativo em JSON ("log_file")
+        e escrita numa thread própria, fora das threads de download.
+        """
+        setup_logging(self.config)
 
     def initUI(self):
         self.setWindowTitle("U2Be Down - YouTube Downloader & Music Player")
@@ -169,11 +258,13 @@ class YouTubeDownloader(QMainWindow):
         self.downloader_tab = self.create_downloader_tab()
         self.tab_widget.addTab(self.downloader_tab, "📥 Downloader")
 
-        # Aba 2: Music Player
-        self.music_player = MusicPlayer(
-            self.config.get("default_download_path", "downloads")
-        )
-        self.tab_widget.addTab(self.music_player, "🎵 Player")
+        # Aba 2: Music Player (construído só quando a aba é aberta)
+        self.music_player = None
+        self.player_tab = QWidget()
+        self.player_tab.setLayout(QVBoxLayout())
+        self.player_tab.layout().setContentsMargins(0, 0, 0, 0)
+        self.tab_widget.addTab(self.player_tab, "🎵 Player")
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
 
         main_layout.addWidget(self.tab_widget)
         central_widget.setLayout(main_layout)
@@ -329,6 +420,12 @@ class YouTubeDownloader(QMainWindow):
             self.downloads_table.setColumnWidth(4, 130)  # Data - 130px
             self.downloads_table.setColumnWidth(5, 100)  # Ações - 100px
 
+        # Menu de contexto para mudar a prioridade de itens na fila
+        self.downloads_table.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.downloads_table.customContextMenuRequested.connect(
+            self.show_downloads_context_menu
+        )
+
         downloads_layout.addWidget(self.downloads_table)
 
         downloads_widget.setLayout(downloads_layout)
@@ -364,13 +461,78 @@ class YouTubeDownloader(QMainWindow):
                 if refresh_library_action:
                     refresh_library_action.triggered.connect(self.refresh_music_library)
 
+                find_duplicates_action = player_menu.addAction("Procurar Duplicatas")
+                if find_duplicates_action:
+                    find_duplicates_action.triggered.connect(self.find_duplicates)
+
+    def on_tab_changed(self, index):
+        """Constrói o player na primeira vez que a aba é aberta"""
+        if self.tab_widget.widget(index) is self.player_tab:
+            self.get_music_player()
+
+    def get_music_player(self):
+        """Retorna o player, criando-o (e importando pygame/mutagen) se preciso"""
+        if self.music_player is None:
+            from music_player import MusicPlayer
+
+            self.music_player = MusicPlayer(
+                self.config.get("default_download_path", "downloads")
+            )
+            self.player_tab.layout().addWidget(self.music_player)
+        return self.music_player
+
     def open_player_tab(self):
         """Abre a aba do player"""
         self.tab_widget.setCurrentIndex(1)
 
     def refresh_music_library(self):
         """Atualiza a biblioteca de músicas do player"""
-        self.music_player.load_music_library()
+        self.get_music_player().load_music_library()
+
+    def find_duplicates(self):
+        """Indexa a biblioteca e procura músicas com o mesmo áudio"""
+        if self.duplicate_scan_thread and self.duplicate_scan_thread.isRunning():
+            return
+
+        library_path = self.path_label.text()
+        self.duplicate_scan_thread = DuplicateScanThread(library_path)
+        self.duplicate_scan_thread.scan_finished.connect(self.on_duplicates_found)
+        self.duplicate_scan_thread.scan_error.connect(
+            lambda error: QMessageBox.critical(self, "Erro", error)
+        )
+        self.duplicate_scan_thread.start()
+
+    def on_duplicates_found(self, groups):
+        """Mostra as duplicatas encontradas e oferece hardlink ou remoção"""
+        if not groups:
+            QMessageBox.information(
+                self, "Duplicatas", "Nenhum áudio duplicado encontrado."
+            )
+            return
+
+        details = "\n\n".join("\n".join(group) for group in groups)
+        message = QMessageBox(self)
+        message.setWindowTitle("Duplicatas")
+        message.setText(
+            f"{len(groups)} grupos de áudio duplicado encontrados.\n"
+            "A primeira faixa de cada grupo será mantida."
+        )
+        message.setDetailedText(details)
+        hardlink_button = message.addButton("Criar Hardlinks", QMessageBox.AcceptRole)
+        remove_button = message.addButton("Remover", QMessageBox.DestructiveRole)
+        message.addButton("Cancelar", QMessageBox.RejectRole)
+        message.exec_()
+
+        clicked = message.clickedButton()
+        if clicked in (hardlink_button, remove_button):
+            from fingerprint import resolve_duplicates
+
+            mode = "hardlink" if clicked == hardlink_button else "remove"
+            count = resolve_duplicates(groups, mode)
+            self.refresh_music_library()
+            QMessageBox.information(
+                self, "Concluído", f"{count} arquivos duplicados tratados."
+            )
 
     def open_config(self):
         """Abre a janela de configurações"""
@@ -421,6 +583,11 @@ class YouTubeDownloader(QMainWindow):
 
         # Inicia o parse paralelo em thread separada
         self.parse_thread = ParseThread(urls)
+        self.parse_thread.parse_progress.connect(
+            lambda done, total: self.parse_urls_button.setText(
+                f"Analisando {done}/{total}..."
+            )
+        )
         self.parse_thread.parse_finished.connect(self.on_parse_finished)
         self.parse_thread.parse_error.connect(self.on_parse_error)
         self.parse_thread.start()
@@ -431,9 +598,11 @@ class YouTubeDownloader(QMainWindow):
             # Remove apenas duplicados pendentes
             self.clear_duplicate_downloads(videos)
 
-            # Adiciona cada vídeo à lista com status "pending"
-            for video in videos:
-                add_download_to_history(video["title"], video["url"], "", "pending")
+            # Adiciona todos os vídeos à lista com status "pending" de uma vez
+            add_downloads_to_history(
+                {"title": video["title"], "url": video["url"], **history_details(video)}
+                for video in videos
+            )
 
             # Atualiza a lista
             self.load_downloads_history()
@@ -475,6 +644,11 @@ class YouTubeDownloader(QMainWindow):
 
         # Inicia parse seguido de download automático
         self.parse_thread = ParseThread(urls)
+        self.parse_thread.parse_progress.connect(
+            lambda done, total: self.download_button.setText(
+                f"Analisando URLs {done}/{total}..."
+            )
+        )
         self.parse_thread.parse_finished.connect(self.on_parse_finished_for_download)
         self.parse_thread.parse_error.connect(self.on_parse_error_for_download)
         self.parse_thread.start()
@@ -485,9 +659,11 @@ class YouTubeDownloader(QMainWindow):
             # Remove apenas duplicados pendentes
             self.clear_duplicate_downloads(videos)
 
-            # Adiciona cada vídeo à lista com status "pending"
-            for video in videos:
-                add_download_to_history(video["title"], video["url"], "", "pending")
+            # Adiciona todos os vídeos à lista com status "pending" de uma vez
+            add_downloads_to_history(
+                {"title": video["title"], "url": video["url"], **history_details(video)}
+                for video in videos
+            )
 
             # Atualiza a lista
             self.load_downloads_history()
@@ -518,19 +694,18 @@ class YouTubeDownloader(QMainWindow):
 
     def clear_duplicate_downloads(self, new_videos):
         """Remove apenas duplicados pendentes, mantendo downloads concluídos/em progresso"""
-        from config import load_downloads_history, save_downloads_history
+        from config import modify_downloads_history
 
-        downloads = load_downloads_history()
         new_urls = {video["url"] for video in new_videos}
 
         # Remove apenas entradas duplicadas que estão pendentes
-        filtered_downloads = [
-            d
-            for d in downloads
-            if not (d.get("url") in new_urls and d.get("status") == "pending")
-        ]
-
-        save_downloads_history(filtered_downloads)
+        modify_downloads_history(
+            lambda downloads: [
+                d
+                for d in downloads
+                if not (d.get("url") in new_urls and d.get("status") == "pending")
+            ]
+        )
 
     def on_download_progress(self, url, progress_data):
         """Atualiza progresso visual com informações detalhadas"""
@@ -547,11 +722,18 @@ class YouTubeDownloader(QMainWindow):
             if "speed" in progress_data and progress_data["speed"]:
                 speed_mb = progress_data["speed"] / (1024 * 1024)
                 progress_text = f"Download: {percent:.1f}% ({speed_mb:.1f} MB/s)"
+                if progress_data.get("bandwidth_share"):
+                    share_mb = progress_data["bandwidth_share"] / (1024 * 1024)
+                    progress_text += f" [limite {share_mb:.1f} MB/s]"
             else:
                 progress_text = f"Download: {percent:.1f}%"
         elif phase == "conversion":
             message = progress_data.get("message", "Convertendo...")
             progress_text = f"Conversão: {message} ({percent:.1f}%)"
+        elif phase == "retry":
+            progress_text = progress_data.get("message", "Nova tentativa agendada")
+        elif phase == "disk_space":
+            progress_text = progress_data.get("message", "Aguardando espaço em disco")
         elif status == "finished":
             progress_text = "100% - Concluído"
         else:
@@ -602,7 +784,10 @@ class YouTubeDownloader(QMainWindow):
     def download_pending(self):
         """Inicia o download paralelo de todos os itens pendentes"""
         downloads = load_downloads_history()
-        pending_downloads = [d for d in downloads if d.get("status") == "pending"]
+        # Tentativas agendadas que não chegaram a rodar (app fechado) também
+        pending_downloads = [
+            d for d in downloads if d.get("status") in ("pending", "retrying")
+        ]
 
         if not pending_downloads:
             QMessageBox.information(
@@ -620,13 +805,16 @@ class YouTubeDownloader(QMainWindow):
         # Prepara informações dos vídeos para download paralelo
         videos_info = []
         for download in pending_downloads:
+            # Duração e prioridade guardadas no histórico alimentam o agendador
             videos_info.append(
-                {
-                    "title": download["title"],
-                    "url": download["url"],
-                    "duration": 0,  # Não usado no download
-                    "uploader": "Unknown",  # Não usado no download
-                }
+                VideoInfo.from_dict(
+                    {
+                        "title": download["title"],
+                        "url": download["url"],
+                        "uploader": "Unknown",
+                        **history_details(download),
+                    }
+                )
             )
 
         convert_to_mp3 = self.mp3_checkbox.isChecked()
@@ -695,6 +883,11 @@ class YouTubeDownloader(QMainWindow):
             else:
                 display_title = title
 
+            priority = download.get("priority", 0)
+            if priority:
+                arrow = "⬆" if priority > 0 else "⬇"
+                display_title = f"{arrow}{abs(priority)} {display_title}"
+
             title_item = QTableWidgetItem(display_title)
             self.downloads_table.setItem(i, 1, title_item)
 
@@ -711,6 +904,8 @@ class YouTubeDownloader(QMainWindow):
                 status_item.setBackground(QColor("lightyellow"))
             elif status == "pending":
                 status_item.setBackground(QColor("lightblue"))
+            elif status == "retrying":
+                status_item.setBackground(QColor("orange"))
 
             self.downloads_table.setItem(i, 2, status_item)
 
@@ -724,6 +919,10 @@ class YouTubeDownloader(QMainWindow):
             elif status == "failed":
                 progress_item = QTableWidgetItem("Falhou")
                 progress_item.setBackground(QColor("lightcoral"))
+            elif status == "retrying":
+                attempts = len(download.get("attempts", []))
+                progress_item = QTableWidgetItem(f"Tentativa {attempts + 1} agendada")
+                progress_item.setBackground(QColor("orange"))
             else:
                 progress_item = QTableWidgetItem("0%")
 
@@ -758,6 +957,44 @@ class YouTubeDownloader(QMainWindow):
 
             self.downloads_table.setCellWidget(i, 5, open_button)
 
+    def show_downloads_context_menu(self, position):
+        """Menu de prioridade para downloads que ainda não começaram"""
+        row = self.downloads_table.rowAt(position.y())
+        downloads = load_downloads_history()
+        if row < 0 or row >= len(downloads):
+            return
+
+        download = downloads[row]
+        if download.get("status") not in ("pending", "retrying"):
+            return
+
+        priority = download.get("priority", 0)
+        top_priority = max(d.get("priority", 0) for d in downloads) + 1
+
+        menu = QMenu(self)
+        first_action = menu.addAction("⏫ Baixar primeiro")
+        raise_action = menu.addAction("⬆ Aumentar prioridade")
+        lower_action = menu.addAction("⬇ Diminuir prioridade")
+        reset_action = menu.addAction("Prioridade normal")
+
+        action = menu.exec_(self.downloads_table.viewport().mapToGlobal(position))
+        new_priority = {
+            first_action: top_priority,
+            raise_action: priority + 1,
+            lower_action: priority - 1,
+            reset_action: 0,
+        }.get(action)
+        if new_priority is not None:
+            self.set_priority(download["url"], new_priority)
+
+    def set_priority(self, url, priority):
+        """Grava a prioridade e reordena a fila do download em andamento"""
+        set_download_priority(url, priority)
+        thread = self.parallel_download_thread
+        if thread is not None and thread.isRunning():
+            thread.queue.set_priority(url, priority)
+        self.load_downloads_history()
+
     def clear_completed_downloads(self):
         """Remove downloads concluídos do histórico"""
         reply = QMessageBox.question(
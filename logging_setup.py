@@ -0,0 +1,121 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime
+
+from config import get_default_config, load_config
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Atributos padrão de um LogRecord; o resto veio de extra= e vai para o JSON
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_queue_handler = None
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha, com os campos passados em extra="""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def log_levels(config):
+    """Níveis por logger do config, sobre os padrões ("root" = logger raiz)"""
+    levels = dict(get_default_config()["log_levels"])
+    levels.update(config.get("log_levels") or {})
+    return levels
+
+
+def setup_logging(config=None, stream=None, console=True):
+    """Configura o logging assíncrono do processo
+
+    Os loggers só enfileiram os registros (QueueHandler); uma thread
+    (QueueListener) formata e escreve no console e no arquivo rotativo em
+    JSON. Assim nenhum lock do programa espera por I/O de log.
+
+    Pode ser chamada de novo para aplicar um config alterado.
+
+    Args:
+        config: Config a usar (padrão: load_config())
+        stream: Destino do console (padrão: stderr, já que a CLI reserva o
+            stdout para JSON)
+        console: Se False, só o arquivo recebe os registros
+    """
+    global _queue_handler, _listener
+
+    if config is None:
+        config = load_config()
+    shutdown_logging()
+
+    if not config.get("logging_enabled", True):
+        logging.disable(logging.CRITICAL)
+        return
+    logging.disable(logging.NOTSET)
+
+    handlers = []
+    if console:
+        console_handler = logging.StreamHandler(stream or sys.stderr)
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console_handler)
+
+    log_file = config.get("log_file")
+    if log_file:
+        try:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file,
+                maxBytes=config.get("log_max_bytes", 5 * 1024 * 1024),
+                backupCount=config.get("log_backup_count", 3),
+                encoding="utf-8",
+            )
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+        except OSError as e:
+            print(f"Não foi possível abrir o log {log_file}: {e}", file=sys.stderr)
+
+    for name, level in log_levels(config).items():
+        logger = logging.getLogger() if name == "root" else logging.getLogger(name)
+        logger.setLevel(level.upper() if isinstance(level, str) else level)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+    logging.getLogger().addHandler(_queue_handler)
+
+
+def shutdown_logging():
+    """Escreve os registros pendentes e remove o handler assíncrono"""
+    global _queue_handler, _listener
+
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
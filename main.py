@@ -1,18 +1,78 @@
 import argparse
 import concurrent.futures
+import contextlib
+import functools
+import heapq
+import itertools
+import json
 import logging
 import os
 import re
 import shutil
+import sys
+import time
+from datetime import datetime
 from threading import Lock
 
-from yt_dlp import YoutubeDL
-
-from config import add_download_to_history, load_config, update_download_status
+import metrics
+from audio_processor import AUDIO_EXTENSIONS
+from bandwidth import get_bandwidth_limiter
+from config import add_downloads_to_history, load_config, update_download_status
+from disk_space import RECHECK_INTERVAL, get_disk_space_guard, required_space
+from extraction import canonical_video_url, extract_all, extraction_limits
+from media_store import MediaStore, link_into, store_root
+from retry import RetryPolicy, classify_error
+from scheduler import DownloadQueue, estimated_size
+from staging import StagingArea
+from tracing import enable_tracing, get_tracer, traced_lock
+from transport import transport_options
+from video_info import VideoInfo
 
 # Lock para operações thread-safe no histórico
 history_lock = Lock()
 
+# Codec usado pelo ffmpeg para cada formato de áudio de saída
+AUDIO_CODECS = {
+    "mp3": "libmp3lame",
+    "m4a": "aac",
+    "ogg": "libvorbis",
+    "wav": "pcm_s16le",
+}
+
+
+# Funções chamadas com cada YoutubeDL criado, antes do primeiro uso (ex.: o
+# benchmark registra nelas um extrator falso que não acessa a internet)
+youtube_dl_hooks = []
+
+
+def create_youtube_dl(ydl_opts):
+    """Cria um YoutubeDL importando o yt_dlp apenas no primeiro uso
+
+    O import do yt_dlp é caro, então fica fora do carregamento do módulo
+    para não atrasar a abertura da GUI nem o `--help` da CLI.
+    """
+    from yt_dlp import YoutubeDL
+
+    ydl = YoutubeDL(ydl_opts)
+    for hook in youtube_dl_hooks:
+        hook(ydl)
+    return ydl
+
+
+def youtube_dl_session(ydl_opts):
+    """YoutubeDL para um job, reaproveitado entre jobs da mesma thread
+
+    Evita reinicializar extratores, cookies e conexões HTTP a cada item
+    (ver youtube_dl_pool). Com "reuse_youtube_dl" desligado no config, cada
+    job cria e fecha a sua própria instância.
+    """
+    if not load_config().get("reuse_youtube_dl", True):
+        return create_youtube_dl(ydl_opts)
+
+    from youtube_dl_pool import reused_youtube_dl
+
+    return reused_youtube_dl(ydl_opts, create_youtube_dl)
+
 
 def sanitize_folder_name(name):
     """Sanitiza nome de pasta removendo caracteres inválidos"""
@@ -26,62 +86,215 @@ def sanitize_folder_name(name):
     return name or "Unknown"
 
 
-def extract_video_info(url):
-    """Extrai informações de vídeo(s) de uma URL (suporta playlists)"""
+def playlist_entries(entries, playlist_items=None):
+    """Percorre as entradas de uma playlist do yt-dlp sob demanda
+
+    Listas, geradores e PagedLists são lidos item a item. Um PagedList é
+    lido pela API pública (getslice), como o próprio yt-dlp faz: cada
+    página é pedida só quando o primeiro item dela é consumido e fica no
+    cache do PagedList para os itens seguintes.
+
+    Args:
+        entries: info_dict["entries"] de extract_info(..., process=False)
+        playlist_items: Seleção no formato do yt-dlp ("1-10,15,20:30:2"),
+            contada a partir de 1. Índices positivos são lidos em streaming,
+            na ordem da playlist; índices negativos precisam do tamanho da
+            playlist, que então é lida inteira.
+    """
+    from yt_dlp.utils import PagedList, PlaylistEntries
+
+    segments = []
+    for segment in PlaylistEntries.parse_playlist_items(playlist_items or "1:"):
+        if isinstance(segment, int):
+            segment = slice(segment, segment, 1)
+        segments.append(segment)
+
+    def read(start=0, end=None):
+        if not isinstance(entries, PagedList):
+            yield from itertools.islice(entries, start, end)
+            return
+        while end is None or start < end:
+            entry = entries.getslice(start, start + 1)
+            if not entry:
+                return
+            yield entry[0]
+            start += 1
+
+    streamable = all(
+        (segment.start is None or segment.start > 0)
+        and (segment.stop is None or segment.stop > 0)
+        and (segment.step or 1) > 0
+        for segment in segments
+    )
+    if streamable:
+        first = min(segment.start or 1 for segment in segments)
+        last = max(
+            float("inf") if segment.stop is None else segment.stop
+            for segment in segments
+        )
+
+        def wanted(index):
+            for segment in segments:
+                start = segment.start or 1
+                stop = float("inf") if segment.stop is None else segment.stop
+                step = segment.step or 1
+                if start <= index <= stop and (index - start) % step == 0:
+                    return True
+            return False
+
+        end = None if last == float("inf") else int(last)
+        for index, entry in enumerate(read(first - 1, end), start=first):
+            if wanted(index):
+                yield entry
+        return
+
+    # Índices negativos: resolve cada segmento sobre a playlist inteira
+    all_entries = list(read())
+    count = len(all_entries)
+    for segment in segments:
+        step = segment.step or 1
+        start, stop = segment.start, segment.stop
+        if start is None:
+            start = 1 if step > 0 else count
+        if stop is None or stop == float("inf"):
+            stop = count if step > 0 else 1
+        start = start if start > 0 else count + start + 1
+        stop = int(stop if stop > 0 else count + stop + 1)
+        for index in range(start, stop + (1 if step > 0 else -1), step):
+            if 1 <= index <= count:
+                yield all_entries[index - 1]
+
+
+def approximate_filesize(info_dict):
+    """Tamanho esperado do download a partir dos formatos extraídos
+
+    Segue o format_selector de _download_single_video: o melhor formato
+    com áudio e vídeo até 1080p ou, sem ele, o melhor vídeo até 1080p mais
+    o melhor áudio. Retorna None se o extrator não informa tamanhos.
+    """
+    size = info_dict.get("filesize") or info_dict.get("filesize_approx")
+    if size:
+        return size
+
+    def largest(formats):
+        sizes = [f.get("filesize") or f.get("filesize_approx") or 0 for f in formats]
+        return max(sizes, default=0)
+
+    formats = [
+        f for f in info_dict.get("formats") or [] if (f.get("height") or 0) <= 1080
+    ]
+
+    def has_video(f):
+        return f.get("vcodec") not in (None, "none")
+
+    def has_audio(f):
+        return f.get("acodec") not in (None, "none")
+
+    size = largest(f for f in formats if has_video(f) and has_audio(f))
+    if not size:
+        size = largest(f for f in formats if has_video(f) and not has_audio(f))
+        size += largest(f for f in formats if has_audio(f) and not has_video(f))
+    return size or None
+
+
+def iter_video_info(url, playlist_items=None, newest=None):
+    """Gera as informações dos vídeos de uma URL, uma de cada vez
+
+    Playlists e canais não são montados antes de começar: com process=False
+    e lazy_playlist, o yt-dlp entrega as entradas conforme lê as páginas, e
+    só o vídeo atual fica em memória, seja qual for o tamanho do canal.
+
+    Args:
+        url: URL de vídeo, playlist ou canal
+        playlist_items: Seleção de itens da playlist (ver playlist_entries)
+        newest: Só os N primeiros itens; em canais, os N vídeos mais recentes
+    """
     ydl_opts = {
         "quiet": True,
         "no_warnings": True,
         "ignoreerrors": True,
         "extract_flat": True,  # Para playlists
+        "lazy_playlist": True,
     }
 
-    try:
-        with YoutubeDL(ydl_opts) as ydl:
-            info_dict = ydl.extract_info(url, download=False)
-
-            if info_dict and "entries" in info_dict and info_dict["entries"]:
-                # É uma playlist
-                playlist_title = info_dict.get("title", "Unknown Playlist")
-                playlist_uploader = info_dict.get("uploader", "Unknown")
-
-                videos = []
-                for entry in info_dict["entries"]:
-                    if entry and "id" in entry:
-                        videos.append(
-                            {
-                                "title": entry.get("title", "Unknown"),
-                                "url": entry.get(
-                                    "webpage_url",
-                                    f"https://www.youtube.com/watch?v={entry['id']}",
-                                ),
-                                "duration": entry.get("duration", 0),
-                                "uploader": entry.get("uploader", "Unknown"),
-                                "playlist_title": playlist_title,
-                                "playlist_uploader": playlist_uploader,
-                                "is_playlist": True,
-                            }
-                        )
-                logging.info(
-                    f"Playlist detectada: '{playlist_title}' com {len(videos)} vídeos"
+    with youtube_dl_session(ydl_opts) as ydl:
+        with get_tracer().span("parse", "parse", url=url):
+            info_dict = ydl.extract_info(url, download=False, process=False)
+            # Redirecionamentos (ex.: URL curta) até chegar ao vídeo ou playlist
+            for _ in range(5):
+                if not info_dict or info_dict.get("_type") not in (
+                    "url",
+                    "url_transparent",
+                ):
+                    break
+                info_dict = ydl.extract_info(
+                    info_dict["url"],
+                    download=False,
+                    process=False,
+                    ie_key=info_dict.get("ie_key"),
                 )
-                return videos
-            else:
-                # É um vídeo individual
-                if info_dict:
-                    title = info_dict.get("title", "Unknown")
-                    return [
-                        {
-                            "title": title,
-                            "url": url,
-                            "duration": info_dict.get("duration", 0),
-                            "uploader": info_dict.get("uploader", "Unknown"),
-                            "is_playlist": False,
-                        }
-                    ]
-                return []
+
+        if not info_dict:
+            return
+
+        if info_dict.get("_type") != "playlist" and "entries" not in info_dict:
+            # É um vídeo individual
+            yield VideoInfo(
+                id=info_dict.get("id"),
+                title=info_dict.get("title", "Unknown"),
+                url=canonical_video_url(url),
+                duration=info_dict.get("duration", 0),
+                uploader=info_dict.get("uploader", "Unknown"),
+                is_playlist=False,
+                filesize_approx=approximate_filesize(info_dict),
+            )
+            return
+
+        # É uma playlist ou canal
+        playlist_title = info_dict.get("title", "Unknown Playlist")
+        playlist_uploader = info_dict.get("uploader", "Unknown")
+        # Sem "or []": o bool() de um PagedList já buscaria a primeira página
+        entries = info_dict.get("entries")
+        entries = playlist_entries([] if entries is None else entries, playlist_items)
+        if newest:
+            entries = itertools.islice(entries, newest)
+
+        count = 0
+        for entry in entries:
+            if not entry or "id" not in entry:
+                continue
+            count += 1
+            yield VideoInfo(
+                id=entry["id"],
+                title=entry.get("title", "Unknown"),
+                url=canonical_video_url(
+                    entry.get("webpage_url")
+                    or (entry.get("url") if entry.get("_type") == "url" else None)
+                    or f"https://www.youtube.com/watch?v={entry['id']}"
+                ),
+                duration=entry.get("duration", 0),
+                uploader=entry.get("uploader", "Unknown"),
+                playlist_title=playlist_title,
+                playlist_uploader=playlist_uploader,
+                is_playlist=True,
+                filesize_approx=entry.get("filesize") or entry.get("filesize_approx"),
+            )
+        logging.info(f"Playlist detectada: '{playlist_title}' com {count} vídeos")
+
+
+def extract_video_info(url, playlist_items=None, newest=None):
+    """Extrai informações de vídeo(s) de uma URL (suporta playlists)
+
+    Lista montada a partir de iter_video_info; se a leitura de uma playlist
+    falhar no meio, os vídeos já lidos são mantidos.
+    """
+    videos = []
+    try:
+        for video in iter_video_info(url, playlist_items, newest):
+            videos.append(video)
     except Exception as e:
         logging.error(f"Erro ao extrair info de {url}: {e}")
-        return []
+    return videos
 
 
 def parse_urls_and_extract_info(urls):
@@ -100,6 +313,12 @@ def parse_urls_and_extract_info(urls):
 
 def convert_video_to_mp3(video_path, progress_callback=None):
     """Converte vídeo para MP3 com callback de progresso"""
+    return convert_video_to_audio(video_path, "mp3", progress_callback)
+
+
+def convert_video_to_audio(video_path, audio_format="mp3", progress_callback=None):
+    """Converte vídeo para um formato de áudio (ver AUDIO_CODECS)"""
+    started = time.perf_counter()
     try:
         # Import apenas quando necessário para evitar problemas no PyInstaller
         from moviepy.video.io.VideoFileClip import VideoFileClip
@@ -115,7 +334,7 @@ def convert_video_to_mp3(video_path, progress_callback=None):
             )
 
         video_clip = VideoFileClip(video_path)
-        audio_path = os.path.splitext(video_path)[0] + ".mp3"
+        audio_path = os.path.splitext(video_path)[0] + f".{audio_format}"
 
         if progress_callback:
             progress_callback(
@@ -128,7 +347,9 @@ def convert_video_to_mp3(video_path, progress_callback=None):
             )
 
         if video_clip.audio:
-            video_clip.audio.write_audiofile(audio_path)
+            video_clip.audio.write_audiofile(
+                audio_path, codec=AUDIO_CODECS.get(audio_format)
+            )
         video_clip.close()
 
         if progress_callback:
@@ -141,7 +362,8 @@ def convert_video_to_mp3(video_path, progress_callback=None):
                 }
             )
 
-        print(f"Converted to MP3: {audio_path}")
+        print(f"Converted to {audio_format.upper()}: {audio_path}")
+        record_phase("convert", started, time.perf_counter(), file=audio_path)
         return audio_path
     except OSError as e:
         logging.error(f"MoviePy error: the file {video_path} could not be found! {e}")
@@ -149,22 +371,292 @@ def convert_video_to_mp3(video_path, progress_callback=None):
         return None
 
 
+def find_duplicate_before_conversion(video_path):
+    """Procura o áudio do vídeo baixado na biblioteca antes de converter
+
+    Só atua com a opção "skip_duplicate_audio" ativa.
+
+    Returns:
+        Tupla (faixa existente ou None, fingerprint calculado ou None)
+    """
+    if not load_config().get("skip_duplicate_audio", False):
+        return None, None
+
+    from fingerprint import find_known_duplicate
+
+    try:
+        return find_known_duplicate(video_path)
+    except OSError as e:
+        logging.warning(f"Não foi possível verificar duplicatas de {video_path}: {e}")
+        return None, None
+
+
+def register_fingerprint(audio_path, fingerprint):
+    """Adiciona o fingerprint de uma faixa convertida ao índice
+
+    O índice é gravado um pouco depois (ver FingerprintIndex.save_later),
+    uma vez para várias faixas. Um erro aqui não faz o download, já
+    publicado, falhar.
+    """
+    if fingerprint is None or not len(fingerprint):
+        return
+
+    from fingerprint import get_fingerprint_index
+
+    try:
+        index = get_fingerprint_index()
+        index.add(audio_path, fingerprint)
+        index.save_later()
+    except OSError as e:
+        logging.error(f"❌ Erro ao registrar o fingerprint de {audio_path}: {e}")
+
+
+def record_phase(phase, start, end, **args):
+    """Registra a duração de uma fase nas métricas e no trace (se ligado)"""
+    metrics.PHASE_DURATION.observe(end - start, phase=phase)
+    get_tracer().add_span(phase, start, end, "phase", **args)
+
+
+def observe_download_phases(marks, url=None):
+    """Registra extração, transferência e merge de um extract_info(download=True)
+
+    A extração vai até o primeiro evento de progresso, a transferência até o
+    último arquivo terminar e o restante é o merge/pós-processamento do yt-dlp.
+    """
+    end = time.perf_counter()
+    first_event = marks.get("first_event")
+    if first_event is None:
+        return
+    record_phase("extract", marks["start"], first_event, url=url)
+    last_finished = marks.get("last_finished")
+    if last_finished is not None:
+        record_phase("fetch", first_event, last_finished, url=url)
+        record_phase("merge", last_finished, end, url=url)
+
+
+def playlist_output_path(output_path, video_info):
+    """Pasta de destino de um vídeo: a pasta da playlist, se ele vier de uma"""
+    if not video_info or not video_info.get("is_playlist", False):
+        return output_path
+
+    # Cria subdiretório para playlist
+    playlist_title = video_info.get("playlist_title", "Unknown Playlist")
+    sanitized_name = sanitize_folder_name(playlist_title)
+    playlist_dir = os.path.join(output_path, sanitized_name)
+
+    # Cria o diretório se não existir
+    try:
+        os.makedirs(playlist_dir, exist_ok=True)
+        logging.info(f"Criado diretório da playlist: {playlist_dir}")
+        return playlist_dir
+    except OSError as e:
+        logging.warning(f"Erro ao criar diretório da playlist: {e}")
+        # Continua com diretório original em caso de erro
+        return output_path
+
+
+def playlist_memberships(video_info):
+    """Pastas de um vídeo: o título de cada playlist (None = pasta base)
+
+    Um vídeo repetido no lote (ver merge_duplicate_videos) leva em
+    "playlists" as pastas de todas as cópias; os outros, só a sua.
+    """
+    if video_info.get("playlists"):
+        return list(video_info["playlists"])
+    if video_info.get("is_playlist", False):
+        return [video_info.get("playlist_title", "Unknown Playlist")]
+    return [None]
+
+
+def merge_duplicate_videos(videos):
+    """Une os vídeos repetidos do lote num único job
+
+    Duas playlists com as mesmas faixas, ou um vídeo colado junto com a sua
+    playlist, trariam o mesmo vídeo duas vezes. Vídeos com a mesma URL
+    canônica (ver canonical_video_url) viram um só: o primeiro fica e as
+    pastas dos outros vão para "playlists", onde o download cria links.
+
+    Returns:
+        Lista de VideoInfo sem repetições, na ordem da primeira ocorrência
+    """
+    merged = {}
+    total = 0
+    for video in videos:
+        total += 1
+        video = VideoInfo.from_dict(video)
+        key = canonical_video_url(video["url"])
+        first = merged.setdefault(key, video)
+        if first is video:
+            continue
+        memberships = playlist_memberships(first)
+        for membership in playlist_memberships(video):
+            if membership not in memberships:
+                memberships.append(membership)
+        if len(memberships) > 1:
+            first["playlists"] = memberships
+
+    if total > len(merged):
+        logging.info(f"🔁 {total - len(merged)} vídeos repetidos unidos no lote")
+    return list(merged.values())
+
+
+def link_into_playlists(path, output_path, video_info):
+    """Liga o arquivo baixado nas pastas das outras playlists do vídeo"""
+    for membership in playlist_memberships(video_info):
+        folder = playlist_output_path(
+            output_path,
+            {"is_playlist": membership is not None, "playlist_title": membership},
+        )
+        if os.path.abspath(folder) == os.path.abspath(os.path.dirname(path)):
+            continue
+        try:
+            destination, method = link_into(path, folder)
+            logging.info(f"🔗 Também em {destination} ({method})")
+        except OSError as e:
+            logging.warning(f"⚠️ Não foi possível ligar {path} em {folder}: {e}")
+
+
 def download_single_video(
-    url, output_path, convert_to_mp3=False, keep_video=False, progress_callback=None, video_info=None
+    url,
+    output_path,
+    convert_to_mp3=False,
+    keep_video=False,
+    progress_callback=None,
+    video_info=None,
+    audio_format="mp3",
+    archive_path=None,
+    cancel_event=None,
+    config=None,
 ):
     """Download de um único vídeo com progresso real das duas fases
 
+    Vídeos com ID conhecido (video_info["id"]) passam pelo acervo de mídia:
+    se o mesmo ID já foi baixado no mesmo formato (por outra playlist, por
+    exemplo), o job termina na hora com um link na pasta de destino; senão o
+    resultado do download é guardado no acervo para os próximos. Um vídeo
+    unido de várias playlists (video_info["playlists"]) é baixado uma vez e
+    ligado na pasta de cada uma.
+
     Args:
         url: URL do vídeo
         output_path: Caminho base de download
-        convert_to_mp3: Se deve converter para MP3
+        convert_to_mp3: Se deve converter para áudio (formato em audio_format)
         keep_video: Se deve manter o arquivo de vídeo original após conversão
         progress_callback: Callback para progresso
         video_info: Informações do vídeo (incluindo dados de playlist)
+        audio_format: Formato de áudio da conversão (ver AUDIO_CODECS)
+        archive_path: Arquivo de registro do yt-dlp (download_archive); vídeos
+            já registrados são pulados
+        cancel_event: threading.Event que, quando ativado, interrompe o
+            download em andamento
+        config: Config a usar (padrão: load_config()); lotes passam o seu
+            para não reler o arquivo a cada vídeo
+    """
+    arguments = (url, output_path, convert_to_mp3, keep_video, progress_callback)
+    options = {
+        "video_info": video_info,
+        "audio_format": audio_format,
+        "archive_path": archive_path,
+        "cancel_event": cancel_event,
+    }
+    video_id = (video_info or {}).get("id")
+    root = store_root(output_path, config)
+    # Com keep_video o job também entrega o vídeo, que o acervo não guarda
+    if not video_id or root is None or (keep_video and convert_to_mp3):
+        success, result = _download_single_video(*arguments, **options)
+    else:
+        success, result = _download_from_store(
+            MediaStore(root), MediaStore.key(url, video_id), *arguments, **options
+        )
+
+    if success and result and video_info and video_info.get("playlists"):
+        link_into_playlists(result, output_path, video_info)
+    return success, result
+
+
+def _download_from_store(
+    store,
+    key,
+    url,
+    output_path,
+    convert_to_mp3,
+    keep_video,
+    progress_callback,
+    **options,
+):
+    """Parte de download_single_video que usa o acervo de mídia"""
+    video_info = options["video_info"]
+    variant = MediaStore.variant(convert_to_mp3, options["audio_format"])
+    # O mesmo vídeo em duas playlists do lote: o segundo job espera o
+    # primeiro e depois só cria o link
+    with store.lock_for(key, variant):
+        destination_dir = playlist_output_path(output_path, video_info)
+        linked = store.materialise(key, variant, destination_dir)
+        if linked:
+            if progress_callback:
+                progress_callback(
+                    {
+                        "status": "finished",
+                        "phase": "linked",
+                        "percent": 100,
+                        "message": "Já baixado (acervo de mídia)",
+                    }
+                )
+            return True, linked
+
+        success, result = _download_single_video(
+            url, output_path, convert_to_mp3, keep_video, progress_callback, **options
+        )
+        if success and result:
+            store.add(key, variant, result)
+        return success, result
+
+
+def _download_single_video(
+    url,
+    output_path,
+    convert_to_mp3=False,
+    keep_video=False,
+    progress_callback=None,
+    video_info=None,
+    audio_format="mp3",
+    archive_path=None,
+    cancel_event=None,
+):
+    """Download de um único vídeo com progresso real das duas fases (sem acervo)
+
+    Argumentos como em download_single_video.
     """
+    limiter = get_bandwidth_limiter()
+    fetched_bytes = {}
+    # Instantes (perf_counter) que dividem o extract_info em fases
+    phase_marks = {}
 
     def enhanced_progress_hook(d):
         """Hook de progresso melhorado que considera download + conversão"""
+        if cancel_event is not None and cancel_event.is_set():
+            from yt_dlp.utils import DownloadCancelled
+
+            raise DownloadCancelled("Download cancelado")
+
+        now = time.perf_counter()
+        phase_marks.setdefault("first_event", now)
+        if d["status"] == "finished":
+            phase_marks["last_finished"] = now
+
+        # Desconta do limite global os bytes recebidos desde a última chamada
+        # (vídeo e áudio separados têm contagens próprias por arquivo)
+        if d["status"] == "downloading":
+            filename = d.get("filename")
+            downloaded = d.get("downloaded_bytes") or 0
+            received = downloaded - fetched_bytes.get(filename, 0)
+            fetched_bytes[filename] = downloaded
+            if received > 0:
+                metrics.DOWNLOADED_BYTES.inc(received)
+                limiter.consume(url, received, cancel_event)
+        else:
+            limiter.release(url)
+
         if progress_callback:
             if d["status"] == "downloading":
                 # Fase 1: Download (0-70% do progresso total)
@@ -179,6 +671,7 @@ def download_single_video(
                             "downloaded_bytes": d.get("downloaded_bytes", 0),
                             "total_bytes": d.get("total_bytes", 0),
                             "speed": d.get("speed", 0),
+                            **limiter.status(),
                         }
                     )
             elif d["status"] == "finished":
@@ -189,29 +682,28 @@ def download_single_video(
                             "status": "converting",
                             "phase": "conversion",
                             "percent": 70,  # Download completo = 70%
-                            "message": "Convertendo para MP3...",
+                            "message": f"Convertendo para {audio_format.upper()}...",
                         }
                     )
                 else:
                     progress_callback({"status": "finished", "percent": 100})
 
     # Determina o diretório de download baseado em playlist
-    final_output_path = output_path
-
-    if video_info and video_info.get("is_playlist", False):
-        # Cria subdiretório para playlist
-        playlist_title = video_info.get("playlist_title", "Unknown Playlist")
-        sanitized_name = sanitize_folder_name(playlist_title)
-        playlist_dir = os.path.join(output_path, sanitized_name)
-
-        # Cria o diretório se não existir
-        try:
-            os.makedirs(playlist_dir, exist_ok=True)
-            final_output_path = playlist_dir
-            logging.info(f"Criado diretório da playlist: {playlist_dir}")
-        except OSError as e:
-            logging.warning(f"Erro ao criar diretório da playlist: {e}")
-            # Continua com diretório original em caso de erro
+    final_output_path = playlist_output_path(output_path, video_info)
+
+    # Download, merge e conversão acontecem no estágio local; só os arquivos
+    # prontos vão para a biblioteca, cada um num único passo
+    staging = StagingArea(url, final_output_path, estimated_size(video_info or {}))
+
+    def publish_results(final_path, video_path):
+        """Move o resultado (e o vídeo, se mantido) do estágio para a biblioteca"""
+        started = time.perf_counter()
+        if keep_video and video_path != final_path and os.path.exists(video_path):
+            staging.publish(video_path)
+        final_path = staging.publish(final_path)
+        record_phase("publish", started, time.perf_counter(), file=final_path)
+        staging.discard()
+        return final_path
 
     # Formato com fallbacks para maior compatibilidade
     # 1. Tenta best (melhor qualidade com áudio+vídeo)
@@ -221,21 +713,51 @@ def download_single_video(
     
     ydl_opts = {
         "format": format_selector,
-        "outtmpl": os.path.join(final_output_path, "%(title)s.%(ext)s"),
-        "progress_hooks": [enhanced_progress_hook] if progress_callback else [],
+        "outtmpl": os.path.join(staging.path, "%(title)s.%(ext)s"),
+        "progress_hooks": [enhanced_progress_hook],
         "ignoreerrors": False,  # Mudamos para False para capturar erros
         "no_warnings": False,  # Ativar warnings para debug
         "merge_output_format": "mp4",  # Força saída em MP4 quando combina formatos
     }
+    # Fragmentos em paralelo, download em blocos e aria2c conforme o config
+    limiter.refresh()
+    transport = transport_options(rate_limited=limiter.rate is not None)
+    ydl_opts.update(transport)
+    if archive_path:
+        ydl_opts["download_archive"] = archive_path
 
     try:
         logging.info(f"Iniciando download de: {url}")
         logging.info(f"Diretório de saída: {final_output_path}")
 
-        with YoutubeDL(ydl_opts) as ydl:
+        with youtube_dl_session(ydl_opts) as ydl:
             # Download do vídeo
             logging.info(f"Extraindo informações para: {url}")
+            phase_marks["start"] = time.perf_counter()
             info_dict = ydl.extract_info(url, download=True)
+            observe_download_phases(phase_marks, url)
+
+            # Com download_archive, vídeos já registrados não são baixados (o
+            # yt-dlp retorna None ou as informações sem gravar o arquivo)
+            if archive_path and (
+                not info_dict
+                or (
+                    not os.path.exists(ydl.prepare_filename(info_dict))
+                    and ydl.in_download_archive(info_dict)
+                )
+            ):
+                logging.info(f"Já registrado no arquivo, pulando: {url}")
+                staging.discard()
+                if progress_callback:
+                    progress_callback(
+                        {
+                            "status": "finished",
+                            "phase": "skipped",
+                            "percent": 100,
+                            "message": "Já registrado no arquivo",
+                        }
+                    )
+                return True, ""
 
             # Verifica se info_dict é válido
             if not info_dict:
@@ -252,6 +774,32 @@ def download_single_video(
                 return False, f"Arquivo não foi baixado: {video_path}"
 
             final_path = video_path
+
+            # Evita converter um áudio que já existe na biblioteca
+            existing_path, fingerprint = (
+                find_duplicate_before_conversion(video_path)
+                if convert_to_mp3
+                else (None, None)
+            )
+            if existing_path:
+                logging.info(f"Áudio já existe na biblioteca: {existing_path}")
+                if not keep_video:
+                    try:
+                        os.remove(video_path)
+                    except FileNotFoundError:
+                        pass
+                publish_results(existing_path, video_path)
+                if progress_callback:
+                    progress_callback(
+                        {
+                            "status": "finished",
+                            "phase": "completed",
+                            "percent": 100,
+                            "message": "Áudio já existe na biblioteca",
+                        }
+                    )
+                return True, existing_path
+
             if convert_to_mp3:
                 # Fase 2: Conversão (70-100% do progresso total)
                 if progress_callback:
@@ -260,11 +808,13 @@ def download_single_video(
                             "status": "converting",
                             "phase": "conversion",
                             "percent": 75,
-                            "message": "Iniciando conversão para MP3...",
+                            "message": f"Iniciando conversão para {audio_format.upper()}...",
                         }
                     )
 
-                mp3_path = convert_video_to_mp3(video_path, progress_callback)
+                mp3_path = convert_video_to_audio(
+                    video_path, audio_format, progress_callback
+                )
                 if mp3_path:
                     final_path = mp3_path
                     if not keep_video:  # Só remove se não quiser manter o vídeo
@@ -284,6 +834,11 @@ def download_single_video(
                             }
                         )
 
+            converted = final_path != video_path
+            final_path = publish_results(final_path, video_path)
+            if converted:
+                register_fingerprint(final_path, fingerprint)
+
             logging.info(f"Download bem-sucedido: {final_path}")
             return True, final_path
 
@@ -292,21 +847,28 @@ def download_single_video(
         logging.error(f"Erro no download de {url}: {error_msg}")
         
         # Se o erro é sobre formato não disponível, tenta com formato mais básico
-        if "Requested format is not available" in error_msg or "format" in error_msg.lower():
+        # (erros de rede e throttling ficam para o agendador de novas tentativas)
+        if classify_error(error_msg) == "format":
             logging.info(f"Tentando download com formato de fallback para: {url}")
             try:
                 # Fallback com formato mais simples
                 fallback_ydl_opts = {
                     "format": "worst",  # Formato mais básico, sempre disponível
-                    "outtmpl": os.path.join(final_output_path, "%(title)s.%(ext)s"),
-                    "progress_hooks": [enhanced_progress_hook] if progress_callback else [],
+                    "outtmpl": os.path.join(staging.path, "%(title)s.%(ext)s"),
+                    "progress_hooks": [enhanced_progress_hook],
                     "ignoreerrors": False,
                     "no_warnings": False,
+                    **transport,
                 }
+                if archive_path:
+                    fallback_ydl_opts["download_archive"] = archive_path
                 
-                with YoutubeDL(fallback_ydl_opts) as ydl_fallback:
+                with youtube_dl_session(fallback_ydl_opts) as ydl_fallback:
                     logging.info(f"Tentativa de fallback para: {url}")
+                    phase_marks.clear()
+                    phase_marks["start"] = time.perf_counter()
                     info_dict = ydl_fallback.extract_info(url, download=True)
+                    observe_download_phases(phase_marks, url)
                     
                     if not info_dict:
                         return False, "Fallback: yt-dlp não conseguiu extrair informações do vídeo"
@@ -318,7 +880,9 @@ def download_single_video(
                     
                     final_path = video_path
                     if convert_to_mp3:
-                        mp3_path = convert_video_to_mp3(video_path, progress_callback)
+                        mp3_path = convert_video_to_audio(
+                            video_path, audio_format, progress_callback
+                        )
                         if mp3_path:
                             final_path = mp3_path
                             if not keep_video:  # Só remove se não quiser manter o vídeo
@@ -327,6 +891,7 @@ def download_single_video(
                                 except FileNotFoundError:
                                     pass
                     
+                    final_path = publish_results(final_path, video_path)
                     logging.info(f"Download de fallback bem-sucedido: {final_path}")
                     return True, final_path
                     
@@ -337,8 +902,20 @@ def download_single_video(
         return False, error_msg
 
 
-def download_video_safe(args):
-    """Wrapper thread-safe para download_single_video"""
+def download_video_safe(args, attempt=1, retry_policy=None, **download_options):
+    """Wrapper thread-safe para download_single_video
+
+    Args:
+        args: Tupla (video_info, download_path, to_mp3, keep_video,
+            progress_callback)
+        attempt: Número desta tentativa (a partir de 1)
+        retry_policy: RetryPolicy que decide se uma falha será repetida
+        **download_options: Opções extras repassadas a download_single_video
+            (audio_format, archive_path, cancel_event, config)
+
+    Returns:
+        Tupla (sucesso, segundos até a próxima tentativa ou None)
+    """
     video_info, download_path, to_mp3, keep_video, progress_callback = args
     url = video_info["url"]
     title = video_info["title"]
@@ -348,89 +925,358 @@ def download_video_safe(args):
         if progress_callback:
             progress_callback(url, data)
 
+    # Downloads cancelados antes de começar nem chegam ao yt-dlp
+    cancel_event = download_options.get("cancel_event")
+    if cancel_event is not None and cancel_event.is_set():
+        with traced_lock(history_lock, "history_lock"):
+            update_download_status(url, "cancelled")
+        metrics.DOWNLOADS.inc(result="cancelled")
+        return False, None
+
     # Thread-safe update do status
-    with history_lock:
+    with traced_lock(history_lock, "history_lock"):
         update_download_status(url, "downloading")
 
+    started = time.time()
+    span_start = time.perf_counter()
+    metrics.JOBS.inc(state="active")
     try:
         # Passa video_info para download_single_video para informações de playlist
         success, result = download_single_video(
-            url, download_path, to_mp3, keep_video, wrapped_progress_callback, video_info
+            url,
+            download_path,
+            to_mp3,
+            keep_video,
+            wrapped_progress_callback,
+            video_info,
+            **download_options,
         )
-
-        if success:
-            with history_lock:
-                update_download_status(url, "completed", file_path=result)
-            logging.info(f"✅ Download concluído: {title}")
-            return True
-        else:
-            with history_lock:
-                update_download_status(url, "failed", error_msg=result)
-            logging.error(f"❌ Erro no download de {title}: {result}")
-            return False
-
     except Exception as e:
         logging.error(f"Erro no wrapper de download de {url}: {e}")
-        with history_lock:
-            update_download_status(url, "failed", error_msg=str(e))
-        return False
+        success, result = False, str(e)
+    finally:
+        metrics.JOBS.dec(state="active")
+        metrics.WORKER_BUSY_SECONDS.inc(time.time() - started)
+    get_tracer().add_span(
+        "download",
+        span_start,
+        time.perf_counter(),
+        title=title,
+        url=url,
+        attempt=attempt,
+        success=success,
+    )
+
+    attempt_record = {
+        "attempt": attempt,
+        "started": datetime.fromtimestamp(started).isoformat(),
+        "duration": round(time.time() - started, 1),
+    }
+
+    if success:
+        attempt_record["result"] = "completed"
+        with traced_lock(history_lock, "history_lock"):
+            update_download_status(
+                url, "completed", file_path=result, attempt=attempt_record
+            )
+        logging.info(f"✅ Download concluído: {title}")
+        metrics.DOWNLOADS.inc(result="completed")
+
+        # Pré-calcula o waveform para o player em segundo plano
+        if result and result.lower().endswith(AUDIO_EXTENSIONS):
+            from waveform import schedule_peaks
+
+            schedule_peaks(result)
+        return True, None
+
+    error_class = classify_error(result)
+    retry_in = retry_policy.next_delay(error_class, attempt) if retry_policy else None
+    attempt_record.update(result=error_class, error=result, retry_in=retry_in)
+
+    if retry_in is None:
+        with traced_lock(history_lock, "history_lock"):
+            update_download_status(
+                url, "failed", error_msg=result, attempt=attempt_record
+            )
+        logging.error(f"❌ Erro no download de {title} ({error_class}): {result}")
+        metrics.DOWNLOADS.inc(
+            result="cancelled" if error_class == "cancelled" else "failed"
+        )
+        return False, None
+
+    with traced_lock(history_lock, "history_lock"):
+        update_download_status(
+            url, "retrying", error_msg=result, attempt=attempt_record
+        )
+    logging.warning(
+        f"🔁 Falha {error_class} em {title} (tentativa {attempt}), "
+        f"nova tentativa em {retry_in:.0f}s"
+    )
+    metrics.RETRIES.inc(error_class=error_class)
+    wrapped_progress_callback(
+        {
+            "status": "retrying",
+            "phase": "retry",
+            "percent": 0,
+            "attempt": attempt,
+            "retry_in": retry_in,
+            "message": f"Tentativa {attempt + 1} em {retry_in:.0f}s ({error_class})",
+        }
+    )
+    return False, retry_in
 
 
 def download_videos_parallel(
-    videos_info, download_path, to_mp3=True, keep_video=False, max_workers=2, progress_callback=None
+    videos_info,
+    download_path,
+    to_mp3=True,
+    keep_video=False,
+    max_workers=2,
+    progress_callback=None,
+    result_callback=None,
+    executor=None,
+    retry_policy=None,
+    queue=None,
+    **download_options,
 ):
-    """Download múltiplos vídeos em paralelo"""
-    # Prepara os argumentos para cada download
-    download_args = [
-        (video_info, download_path, to_mp3, keep_video, progress_callback)
-        for video_info in videos_info
-    ]
+    """Download múltiplos vídeos em paralelo
 
-    results = []
+    No máximo max_workers downloads ficam em andamento; os demais esperam
+    numa DownloadQueue e o próximo é escolhido por prioridade e política
+    (fifo, sjf ou size) cada vez que um worker fica livre. Falhas
+    passageiras (rede, throttling) voltam para a fila depois do backoff da
+    RetryPolicy; a espera acontece aqui, sem ocupar um worker.
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submete todas as tarefas de download
-        future_to_video = {
-            executor.submit(download_video_safe, args): args[0]
-            for args in download_args
-        }
+    Antes de começar, cada download reserva no DiskSpaceGuard o espaço que
+    vai ocupar (disk_space.required_space). Se não couber ao lado das
+    reservas dos downloads em andamento, ele espera um deles terminar; se
+    não couber nem no disco vazio de reservas, falha sem começar.
+
+    Args:
+        videos_info: Vídeos a baixar (VideoInfo ou dicts, convertidos aqui);
+            repetidos são unidos num só download (merge_duplicate_videos)
+        result_callback: Chamado com (video_info, sucesso) assim que cada
+            download termina
+        executor: Pool de threads compartilhado (ex.: o do daemon). Se
+            omitido, um pool com max_workers threads é criado para a chamada
+        retry_policy: Política de novas tentativas (padrão: a do config)
+        queue: DownloadQueue a usar, para mudar prioridades durante o lote
+            (padrão: uma fila nova com a política do config)
+        **download_options: Opções extras repassadas a download_single_video
+    """
+    config = load_config()
+    download_options.setdefault("config", config)
+    if retry_policy is None:
+        retry_policy = RetryPolicy.from_config(config)
+    if queue is None:
+        queue = DownloadQueue(config.get("download_scheduling"))
+    for video_info in merge_duplicate_videos(videos_info):
+        queue.push(video_info)
+    cancel_event = download_options.get("cancel_event")
+    disk_guard = get_disk_space_guard()
+
+    results = []
+    # Novas tentativas agendadas: (horário, desempate, video_info, tentativa)
+    delayed = []
+    sequence = itertools.count()
+    # Próximo item da fila, esperando espaço em disco: (video_info, tentativa)
+    held = None
+
+    owns_executor = executor is None
+    if owns_executor:
+        executor_context = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers
+        )
+        metrics.WORKER_SLOTS.inc(max_workers)
+    else:
+        # O dono do pool compartilhado (ex.: o daemon) contabiliza os workers
+        executor_context = contextlib.nullcontext(executor)
+
+    with executor_context as executor:
+        future_to_video = {}
+
+        def finish(video_info, success):
+            status = "completado" if success else "falhou"
+            logging.info(f"Download {status}: {video_info['title']}")
+            results.append((video_info, success))
+            if result_callback:
+                result_callback(video_info, success)
+
+        def admit(video_info, cancelled):
+            """Reserva o espaço do download; None se ele deve esperar"""
+            if disk_guard is None or cancelled:
+                return {}
+            needs = required_space(video_info, download_path, to_mp3, keep_video)
+            return disk_guard.reserve(needs)
+
+        def submit(video_info, attempt, reservation):
+            args = (video_info, download_path, to_mp3, keep_video, progress_callback)
+            future = executor.submit(
+                download_video_safe,
+                args,
+                attempt=attempt,
+                retry_policy=retry_policy,
+                **download_options,
+            )
+            future_to_video[future] = (video_info, attempt, reservation)
 
         # Coleta os resultados conforme ficam prontos
-        for future in concurrent.futures.as_completed(future_to_video):
-            video_info = future_to_video[future]
-            try:
-                success = future.result()
-                results.append((video_info, success))
-                status = "completado" if success else "falhou"
-                logging.info(f"Download {status}: {video_info['title']}")
-            except Exception as e:
-                logging.error(f"Erro no download de {video_info['title']}: {e}")
-                results.append((video_info, False))
+        while future_to_video or delayed or len(queue) or held:
+            now = time.monotonic()
+            cancelled = cancel_event is not None and cancel_event.is_set()
+            while delayed and (cancelled or delayed[0][0] <= now):
+                _, _, video_info, attempt = heapq.heappop(delayed)
+                metrics.JOBS.dec(state="retry_wait")
+                queue.push(video_info, attempt)
+
+            # Ocupa os workers livres com os próximos itens da fila; um item
+            # sem espaço em disco segura os seguintes, para não ser preterido
+            while len(future_to_video) < max_workers:
+                was_held = held is not None
+                item, held = held or queue.pop(), None
+                if item is None:
+                    break
+                video_info, attempt = item
+                try:
+                    reservation = admit(video_info, cancelled)
+                except OSError as e:
+                    # Não cabe nem sem outros downloads: falha sem começar
+                    if was_held:
+                        metrics.JOBS.dec(state="disk_wait")
+                    logging.error(f"❌ {video_info['title']}: {e}")
+                    with traced_lock(history_lock, "history_lock"):
+                        update_download_status(
+                            video_info["url"], "failed", error_msg=str(e)
+                        )
+                    metrics.DOWNLOADS.inc(result="failed")
+                    finish(video_info, False)
+                    continue
+                if reservation is None:
+                    if not was_held:
+                        metrics.JOBS.inc(state="disk_wait")
+                        logging.info(
+                            f"💽 Aguardando espaço em disco: {video_info['title']}"
+                        )
+                        if progress_callback:
+                            progress_callback(
+                                video_info["url"],
+                                {
+                                    "status": "pending",
+                                    "phase": "disk_space",
+                                    "percent": 0,
+                                    "message": "Aguardando espaço em disco",
+                                },
+                            )
+                    held = item
+                    break
+                if was_held:
+                    metrics.JOBS.dec(state="disk_wait")
+                submit(video_info, attempt, reservation)
+
+            timeout = delayed[0][0] - now if delayed else None
+            if held is not None:
+                timeout = min(timeout or RECHECK_INTERVAL, RECHECK_INTERVAL)
+            if not future_to_video:
+                if held is not None:
+                    # Reservas de outros lotes (ex.: outros jobs do daemon)
+                    disk_guard.wait(timeout)
+                elif not delayed:
+                    # Os últimos itens da fila foram recusados por espaço
+                    continue
+                elif cancel_event is not None:
+                    cancel_event.wait(timeout)
+                else:
+                    time.sleep(timeout)
+                continue
 
+            done, _ = concurrent.futures.wait(
+                future_to_video,
+                timeout=timeout,
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            for future in done:
+                video_info, attempt, reservation = future_to_video.pop(future)
+                if disk_guard is not None:
+                    disk_guard.release(reservation)
+                try:
+                    success, retry_in = future.result()
+                except Exception as e:
+                    logging.error(f"Erro no download de {video_info['title']}: {e}")
+                    success, retry_in = False, None
+
+                if retry_in is not None:
+                    metrics.JOBS.inc(state="retry_wait")
+                    heapq.heappush(
+                        delayed,
+                        (
+                            time.monotonic() + retry_in,
+                            next(sequence),
+                            video_info,
+                            attempt + 1,
+                        ),
+                    )
+                    continue
+
+                finish(video_info, success)
+
+    if owns_executor:
+        metrics.WORKER_SLOTS.dec(max_workers)
     return results
 
 
-def parse_urls_parallel(urls, max_workers=3):
-    """Parse de múltiplas URLs em paralelo"""
-    if isinstance(urls, str):
-        urls = [urls]
+def parse_urls_parallel(
+    urls,
+    max_workers=None,
+    per_host=None,
+    on_result=None,
+    cancel_event=None,
+    playlist_items=None,
+    newest=None,
+):
+    """Parse de múltiplas URLs em paralelo
 
-    all_videos = []
+    As extrações rodam pelo extraction.extract_all: no máximo max_workers ao
+    mesmo tempo (per_host por site), com os resultados chegando a on_result
+    conforme cada URL termina.
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submete todas as tarefas de parse
-        future_to_url = {executor.submit(extract_video_info, url): url for url in urls}
+    Args:
+        max_workers: Extrações simultâneas (padrão: "parse_concurrency")
+        per_host: Extrações simultâneas por host (padrão: "parse_per_host")
+        on_result: Callback (url, vídeos) para cada URL concluída
+        cancel_event: threading.Event que descarta as URLs ainda não iniciadas
+        playlist_items: Itens de cada playlist (ver playlist_entries; padrão:
+            "playlist_items" do config)
+        newest: Só os N primeiros itens de cada playlist/canal (padrão:
+            "playlist_newest" do config)
+    """
+    if isinstance(urls, str):
+        urls = [urls]
 
-        # Coleta os resultados
-        for future in concurrent.futures.as_completed(future_to_url):
-            url = future_to_url[future]
-            try:
-                videos = future.result()
-                all_videos.extend(videos)
-                logging.info(f"Parse completo para: {url}")
-            except Exception as e:
-                logging.error(f"Erro no parse de {url}: {e}")
+    config = load_config()
+    concurrency, host_limit = extraction_limits(config)
+    if playlist_items is None:
+        playlist_items = config.get("playlist_items")
+    if newest is None:
+        newest = config.get("playlist_newest")
+
+    def log_result(url, videos):
+        logging.info(f"Parse completo para: {url}")
+        if on_result is not None:
+            on_result(url, videos)
+
+    videos = extract_all(
+        urls,
+        functools.partial(
+            extract_video_info, playlist_items=playlist_items, newest=newest
+        ),
+        on_result=log_result,
+        concurrency=max_workers or concurrency,
+        per_host=per_host or host_limit,
+        cancel_event=cancel_event,
+    )
 
+    # URLs diferentes para o mesmo vídeo (playlists com faixas em comum)
+    all_videos = merge_duplicate_videos(videos)
     logging.info(f"Parse paralelo concluído: {len(all_videos)} vídeos")
     return all_videos
 
@@ -457,39 +1303,394 @@ def download_video(
     return success
 
 
+def read_urls_file(file_path):
+    """Lê URLs de um arquivo (uma por linha, ignorando vazias e comentários)"""
+    with open(file_path, "r", encoding="utf-8") as file:
+        lines = [line.strip() for line in file]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
 def download_from_file(
     file_path,
     output_path,
     convert_to_mp3=False,
     keep_video=False,
     progress_callback=None,
+    max_workers=2,
 ):
-    """Download de URLs de um arquivo"""
-    with open(file_path, "r") as file:
-        urls = file.readlines()
+    """Download de URLs de um arquivo (parse e downloads em paralelo)"""
+    videos = parse_urls_parallel(read_urls_file(file_path))
 
-    for url in urls:
-        if url.strip():
-            download_video(
-                url.strip(), output_path, convert_to_mp3, keep_video, progress_callback
-            )
+    def url_progress_callback(url, data):
+        if progress_callback:
+            progress_callback(data)
+
+    return download_videos_parallel(
+        videos,
+        output_path,
+        convert_to_mp3,
+        keep_video,
+        max_workers,
+        progress_callback=url_progress_callback,
+    )
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Download YouTube videos")
-    parser.add_argument("url", help="YouTube video or playlist URL")
+class JsonLinesReporter:
+    """Escreve eventos da CLI como JSON, um por linha (thread-safe)
+
+    Eventos de progresso de uma mesma URL são limitados a um a cada
+    `progress_interval` segundos, exceto quando a fase muda.
+    """
+
+    def __init__(self, stream, progress_interval=0.5):
+        self.stream = stream
+        self.progress_interval = progress_interval
+        self.lock = Lock()
+        self.last_progress = {}
+
+    def emit(self, event, **data):
+        record = {"event": event, "time": round(time.time(), 3), **data}
+        with self.lock:
+            self.write_record(record)
+
+    def write_record(self, record):
+        """Grava um evento (chamado com o lock já adquirido)"""
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def progress(self, url, data):
+        now = time.monotonic()
+        phase = data.get("phase", data.get("status"))
+        with self.lock:
+            last_time, last_phase = self.last_progress.get(url, (0, None))
+            if phase == last_phase and now - last_time < self.progress_interval:
+                return
+            self.last_progress[url] = (now, phase)
+
+        self.emit(
+            "progress",
+            url=url,
+            status=data.get("status"),
+            phase=phase,
+            percent=round(data.get("percent", 0), 1),
+            speed=data.get("speed"),
+            rate_limit=data.get("rate_limit"),
+            message=data.get("message"),
+        )
+
+
+def build_arg_parser():
+    """Cria o parser de argumentos da CLI"""
+    parser = argparse.ArgumentParser(
+        description="Download YouTube videos and playlists",
+        epilog="Progress is written to stdout as JSON lines; logs go to stderr.",
+    )
+    parser.add_argument("urls", nargs="*", help="YouTube video or playlist URLs")
+    parser.add_argument(
+        "-a",
+        "--batch-file",
+        action="append",
+        default=[],
+        help="File with one URL per line (can be repeated)",
+    )
     parser.add_argument("-o", "--output", help="Output directory", default=".")
     parser.add_argument("--mp3", action="store_true", help="Convert video to MP3")
+    parser.add_argument(
+        "--audio-format",
+        choices=sorted(AUDIO_CODECS),
+        help="Convert video to this audio format",
+    )
     parser.add_argument("--keep-video", action="store_true", help="Keep video file")
+    parser.add_argument(
+        "--workers", type=int, default=2, help="Parallel downloads (default: 2)"
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        help="Parallel URL extractions (default: parse_concurrency from config)",
+    )
+    parser.add_argument(
+        "--parse-per-host",
+        type=int,
+        help="Parallel URL extractions per site "
+        "(default: parse_per_host from config)",
+    )
+    parser.add_argument(
+        "--playlist-items",
+        help="Playlist entries to take, e.g. 1-10,15 (yt-dlp syntax, 1-based)",
+    )
+    parser.add_argument(
+        "--newest",
+        type=int,
+        metavar="N",
+        help="Take only the first N entries of each playlist "
+        "(the N newest videos of a channel)",
+    )
+    parser.add_argument(
+        "--archive", help="Download archive file; recorded videos are skipped"
+    )
+    parser.add_argument(
+        "--limit-rate",
+        help="Total download bandwidth for all workers, e.g. 500K or 2M "
+        "(default: bandwidth_limit/bandwidth_schedule from config)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Submit the batch to the running download daemon",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Write Prometheus text metrics to this file when the batch ends "
+        "(default: metrics_file from config)",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Record a Chrome/Perfetto trace of every job phase to FILE "
+        "(default: trace_file from config)",
+    )
+    return parser
+
+
+def run_cli(argv=None):
+    """Executa a CLI em lote
+
+    Returns:
+        Código de saída: 0 se tudo foi baixado, 1 se houve falhas e 2 para
+        erros de uso ou de ambiente
+    """
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+
+    from logging_setup import setup_logging
+
+    setup_logging(stream=sys.stderr)
+    reporter = JsonLinesReporter(sys.stdout)
+
+    trace_file = args.trace or load_config().get("trace_file")
+    if trace_file:
+        enable_tracing(trace_file)
+
+    urls = list(args.urls)
+    try:
+        for batch_file in args.batch_file:
+            urls.extend(read_urls_file(batch_file))
+    except OSError as e:
+        reporter.emit("error", message=f"Erro ao ler arquivo de URLs: {e}")
+        return 2
+
+    if not urls:
+        parser.print_usage(sys.stderr)
+        reporter.emit("error", message="Nenhuma URL informada")
+        return 2
+
+    if args.limit_rate:
+        try:
+            get_bandwidth_limiter().set_fixed_rate(args.limit_rate)
+        except ValueError as e:
+            reporter.emit("error", message=str(e))
+            return 2
+
+    if args.playlist_items:
+        from yt_dlp.utils import PlaylistEntries
+
+        try:
+            list(PlaylistEntries.parse_playlist_items(args.playlist_items))
+        except ValueError as e:
+            reporter.emit("error", message=f"--playlist-items inválido: {e}")
+            return 2
+
+    audio_format = args.audio_format or ("mp3" if args.mp3 else None)
+    if audio_format:
+        try:
+            set_ffmpeg_path()
+        except RuntimeError as e:
+            reporter.emit("error", message=str(e))
+            return 2
+
+    if args.daemon or load_config().get("use_daemon", False):
+        from daemon_client import DaemonClient
+
+        client = DaemonClient()
+        if client.is_available():
+            return run_cli_via_daemon(client, args, urls, audio_format, reporter)
+        if args.daemon:
+            reporter.emit("error", message="Daemon de downloads não está rodando")
+            return 2
+        logging.info("Daemon indisponível, baixando neste processo")
+
+    # Qualquer print de bibliotecas vai para stderr; stdout só tem JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        videos, results = run_batch(
+            reporter,
+            urls,
+            args.output,
+            audio_format=audio_format,
+            keep_video=args.keep_video,
+            max_workers=max(1, args.workers),
+            parse_workers=args.parse_workers,
+            parse_per_host=args.parse_per_host,
+            playlist_items=args.playlist_items,
+            newest=args.newest,
+            archive_path=args.archive,
+        )
+
+    metrics_file = args.metrics_file or load_config().get("metrics_file")
+    if metrics_file:
+        try:
+            metrics.write_metrics_file(metrics_file)
+        except OSError as e:
+            logging.error(f"Erro ao gravar métricas em {metrics_file}: {e}")
+
+    failed = sum(1 for _, success in results if not success)
+    if not videos or failed:
+        return 1
+    return 0
+
+
+def history_details(video_info):
+    """Campos do vídeo guardados no histórico para baixá-lo depois
+
+    Mantém duração, prioridade e playlist para que "Baixar Pendentes"
+    agende e organize o download como no lote original.
+    """
+    keys = (
+        "id",
+        "duration",
+        "filesize_approx",
+        "uploader",
+        "priority",
+        "playlist_title",
+        "is_playlist",
+        "playlists",
+    )
+    return {key: video_info[key] for key in keys if video_info.get(key) is not None}
+
+
+def run_batch(
+    reporter,
+    urls,
+    output_path,
+    audio_format=None,
+    keep_video=False,
+    max_workers=2,
+    parse_workers=None,
+    parse_per_host=None,
+    playlist_items=None,
+    newest=None,
+    archive_path=None,
+    videos=None,
+    **download_options,
+):
+    """Extrai, enfileira e baixa um lote de URLs reportando cada etapa
+
+    Usado pela CLI e pelos jobs do daemon, que emitem a mesma sequência de
+    eventos: start, extracted (uma por URL), parsed, queued, progress,
+    finished e summary.
+
+    Args:
+        reporter: JsonLinesReporter que recebe os eventos
+        videos: Vídeos já extraídos; se informado, as URLs não são analisadas
+        **download_options: Opções extras de download_videos_parallel
+            (executor, cancel_event)
+
+    Returns:
+        Tupla (vídeos, resultados de download_videos_parallel)
+    """
+    reporter.emit("start", urls=len(urls) if videos is None else len(videos))
+    if videos is None:
+        videos = parse_urls_parallel(
+            urls,
+            max_workers=parse_workers,
+            per_host=parse_per_host,
+            on_result=lambda url, found: reporter.emit(
+                "extracted", url=url, videos=len(found)
+            ),
+            cancel_event=download_options.get("cancel_event"),
+            playlist_items=playlist_items,
+            newest=newest,
+        )
+    reporter.emit("parsed", videos=len(videos))
 
-    args = parser.parse_args()
+    add_downloads_to_history(
+        {"title": video["title"], "url": video["url"], **history_details(video)}
+        for video in videos
+    )
+    for video in videos:
+        reporter.emit(
+            "queued",
+            url=video["url"],
+            title=video["title"],
+            playlist=video.get("playlist_title"),
+        )
 
-    set_ffmpeg_path()
-    logging.basicConfig(level=logging.INFO)
+    def on_result(video_info, success):
+        reporter.emit(
+            "finished",
+            url=video_info["url"],
+            title=video_info["title"],
+            success=success,
+        )
 
-    download_video(
-        args.url,
-        args.output,
-        convert_to_mp3=args.mp3,
-        keep_video=args.keep_video,
+    results = download_videos_parallel(
+        videos,
+        output_path,
+        to_mp3=bool(audio_format),
+        keep_video=keep_video,
+        max_workers=max_workers,
+        progress_callback=reporter.progress,
+        result_callback=on_result,
+        audio_format=audio_format or "mp3",
+        archive_path=archive_path,
+        **download_options,
     )
+
+    failed = sum(1 for _, success in results if not success)
+    reporter.emit(
+        "summary",
+        total=len(results),
+        completed=len(results) - failed,
+        failed=failed,
+    )
+    return videos, results
+
+
+def run_cli_via_daemon(client, args, urls, audio_format, reporter):
+    """Envia o lote ao daemon e repassa os eventos do job para o stdout"""
+    try:
+        job = client.submit(
+            urls=urls,
+            output=os.path.abspath(args.output),
+            audio_format=audio_format,
+            keep_video=args.keep_video,
+            archive=os.path.abspath(args.archive) if args.archive else None,
+            playlist_items=args.playlist_items,
+            newest=args.newest,
+            parse_workers=args.parse_workers,
+            parse_per_host=args.parse_per_host,
+        )
+    except RuntimeError as e:
+        reporter.emit("error", message=str(e))
+        return 2
+
+    summary = None
+    try:
+        for record in client.iter_events(job["id"]):
+            record.pop("id", None)
+            event = record.pop("event")
+            if event == "summary":
+                summary = record
+            reporter.emit(event, job=job["id"], **record)
+    except KeyboardInterrupt:
+        client.cancel(job["id"])
+        raise
+
+    if not summary or not summary["total"] or summary["failed"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
@@ -0,0 +1,185 @@
+import contextlib
+import errno
+import logging
+import os
+import re
+import shutil
+import threading
+
+from config import load_config
+from extraction import host_key
+from staging import candidate_paths, same_content
+
+# Nome da pasta do acervo dentro da pasta de download (oculta, para que a
+# biblioteca de músicas não liste as faixas duas vezes)
+STORE_DIR_NAME = ".media_store"
+
+# Variante dos downloads sem conversão (o vídeo como baixado)
+VIDEO_VARIANT = "video"
+
+# (raiz, chave, variante) -> [lock, jobs usando ou esperando o lock]
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+
+
+def store_root(output_path, config=None):
+    """Diretório do acervo para uma pasta de download ou None se desligado
+
+    Por padrão o acervo fica dentro da própria pasta de download, no mesmo
+    sistema de arquivos das pastas de playlist, o que permite hardlinks.
+    """
+    if config is None:
+        config = load_config()
+    if not config.get("use_media_store", True):
+        return None
+    return config.get("media_store_dir") or os.path.join(output_path, STORE_DIR_NAME)
+
+
+def link_file(source, destination):
+    """Cria destination apontando para o mesmo conteúdo de source
+
+    Tenta hardlink (sem espaço extra); entre sistemas de arquivos usa
+    symlink e, onde nem isso é possível (ex.: Windows sem privilégio), cópia.
+
+    Returns:
+        "hardlink", "symlink", "copy" ou "existing" (destino já é o arquivo
+        ou tem o mesmo conteúdo)
+
+    Raises:
+        FileExistsError: destination é outro arquivo (não é sobrescrito)
+    """
+    if os.path.lexists(destination):
+        if same_content(source, destination):
+            return "existing"
+        raise FileExistsError(
+            errno.EEXIST, "Já existe outro arquivo com esse nome", destination
+        )
+
+    # FileExistsError aqui é outro job criando o mesmo nome: não copia por cima
+    try:
+        os.link(source, destination)
+        return "hardlink"
+    except FileExistsError:
+        raise
+    except OSError:
+        pass
+    try:
+        os.symlink(os.path.abspath(source), destination)
+        return "symlink"
+    except FileExistsError:
+        raise
+    except (OSError, NotImplementedError):
+        pass
+    shutil.copy2(source, destination)
+    return "copy"
+
+
+def link_into(source, destination_dir):
+    """Liga source em destination_dir sem sobrescrever outro arquivo
+
+    Se já existe um arquivo diferente com o mesmo nome (outro vídeo com o
+    mesmo título), o link recebe um sufixo " (2)".
+
+    Returns:
+        Tupla (caminho do link, método de link_file)
+    """
+    os.makedirs(destination_dir, exist_ok=True)
+    for destination in candidate_paths(destination_dir, os.path.basename(source)):
+        try:
+            return destination, link_file(source, destination)
+        except FileExistsError:
+            continue
+
+
+class MediaStore:
+    """Acervo de arquivos endereçado pelo vídeo e formato de saída
+
+    Cada resultado fica em <raiz>/<site>/<id>/<variante>/<nome do arquivo>,
+    onde o site é o host da URL (ver key) e a variante é o formato de áudio
+    da conversão ou "video". As pastas de playlist recebem links para esses
+    arquivos, então um vídeo presente em várias playlists é baixado e
+    convertido uma vez só.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    @staticmethod
+    def variant(convert_to_audio, audio_format="mp3"):
+        return audio_format if convert_to_audio else VIDEO_VARIANT
+
+    @staticmethod
+    def key(url, video_id):
+        """Chave do vídeo no acervo: (site, id)
+
+        IDs só são únicos dentro de um site (dois sites podem ter o vídeo
+        "12345"), então o host da URL entra na chave. As formas de URL do
+        YouTube têm o mesmo host (ver host_key).
+        """
+        return host_key(url) or "_", str(video_id)
+
+    def _entry_dir(self, key, variant):
+        # Sem barras nem ".." nas partes: a pasta fica sempre dentro da raiz
+        parts = (re.sub(r"^\.+$", "_", re.sub(r"[^\w.-]", "_", part)) for part in key)
+        return os.path.join(self.root, *parts, variant)
+
+    def lookup(self, key, variant):
+        """Caminho do arquivo guardado para a chave e variante, ou None"""
+        try:
+            with os.scandir(self._entry_dir(key, variant)) as entries:
+                for entry in entries:
+                    if entry.is_file() and not entry.name.startswith("."):
+                        return entry.path
+        except FileNotFoundError:
+            pass
+        return None
+
+    def add(self, key, variant, path):
+        """Registra no acervo um arquivo já publicado na biblioteca"""
+        if not path or not os.path.isfile(path):
+            return None
+        if self.lookup(key, variant):
+            return None
+        entry_dir = self._entry_dir(key, variant)
+        try:
+            os.makedirs(entry_dir, exist_ok=True)
+            stored = os.path.join(entry_dir, os.path.basename(path))
+            method = link_file(path, stored)
+        except OSError as e:
+            logging.warning(f"⚠️ Não foi possível guardar {path} no acervo: {e}")
+            return None
+        logging.debug(f"🗃️ Acervo: {'/'.join(key)}/{variant} ({method})")
+        return stored
+
+    def materialise(self, key, variant, destination_dir):
+        """Liga o arquivo guardado na pasta de destino e retorna o caminho
+
+        Returns:
+            Caminho na pasta de destino ou None se o vídeo não está no acervo
+        """
+        stored = self.lookup(key, variant)
+        if stored is None:
+            return None
+        destination, method = link_into(stored, destination_dir)
+        logging.info(f"🔗 {key[1]} já está no acervo ({method}): {destination}")
+        return destination
+
+    @contextlib.contextmanager
+    def lock_for(self, key, variant):
+        """Lock do par vídeo/variante: jobs do mesmo vídeo não baixam em paralelo
+
+        O lock só existe enquanto algum job o segura ou espera por ele, então
+        a tabela não cresce com cada vídeo já baixado.
+        """
+        lock_key = (self.root, key, variant)
+        with _key_locks_lock:
+            entry = _key_locks.setdefault(lock_key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with _key_locks_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del _key_locks[lock_key]
@@ -0,0 +1,232 @@
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limites dos buckets das durações por fase (segundos)
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry = []
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Métrica no formato texto do Prometheus, com rótulos opcionais"""
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.lock = threading.Lock()
+        self.values = {}
+        (_registry if registry is None else registry).append(self)
+
+    def samples(self):
+        """Lista de (sufixo, rótulos, valor) para a exposição"""
+        with self.lock:
+            return [("", key, value) for key, value in sorted(self.values.items())]
+
+    def value(self, **labels):
+        with self.lock:
+            return self.values.get(_label_key(labels), 0)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, key, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(key)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[_label_key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets=DURATION_BUCKETS, registry=None):
+        super().__init__(name, documentation, registry)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = {
+                    "buckets": [0] * len(self.buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][index] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def value(self, **labels):
+        """Número de observações com esses rótulos"""
+        with self.lock:
+            entry = self.values.get(_label_key(labels))
+            return entry["count"] if entry else 0
+
+    def samples(self):
+        with self.lock:
+            samples = []
+            for key, entry in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, entry["buckets"]):
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    samples.append(("_bucket", key + (("le", le),), count))
+                samples.append(("_sum", key, entry["sum"]))
+                samples.append(("_count", key, entry["count"]))
+            return samples
+
+    def time(self, **labels):
+        """Context manager que observa a duração do bloco"""
+        return _Timer(self, labels)
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+# Métricas do pipeline de downloads
+DOWNLOADS = Counter(
+    "u2be_downloads_total",
+    "Finished downloads by result (completed, failed, cancelled)",
+)
+RETRIES = Counter(
+    "u2be_download_retries_total", "Scheduled retries by error class (throttled...)"
+)
+DOWNLOADED_BYTES = Counter(
+    "u2be_downloaded_bytes_total", "Bytes received from the network"
+)
+JOBS = Gauge(
+    "u2be_jobs",
+    "Downloads by state: queued, disk_wait (no disk space), retry_wait (backoff)"
+    " and active",
+)
+WORKER_SLOTS = Gauge("u2be_worker_slots", "Download worker threads available")
+WORKER_BUSY_SECONDS = Counter(
+    "u2be_worker_busy_seconds_total",
+    "Time workers spent on downloads; rate() / u2be_worker_slots is utilisation",
+)
+PHASE_DURATION = Histogram(
+    "u2be_phase_duration_seconds",
+    "Duration of each pipeline phase (extract, fetch, merge, convert, publish)",
+)
+
+
+def render_metrics():
+    """Todas as métricas no formato texto do Prometheus"""
+    lines = []
+    for metric in list(_registry):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path):
+    """Grava as métricas num arquivo (textfile collector do node_exporter)
+
+    O arquivo é trocado atomicamente para que um coletor nunca leia pela metade.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write(render_metrics())
+    os.replace(temp_path, path)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Serve GET /metrics"""
+
+    def log_message(self, format, *args):
+        logging.debug(f"metrics: {format % args}")
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        send_metrics(self)
+
+
+def send_metrics(handler):
+    """Responde uma requisição HTTP com as métricas atuais"""
+    body = render_metrics().encode("utf-8")
+    handler.send_response(200)
+    handler.send_header("Content-Type", CONTENT_TYPE)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Expõe /metrics em segundo plano; retorna o servidor (ou None se falhar)"""
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    except OSError as e:
+        logging.warning(f"⚠️ Não foi possível expor métricas na porta {port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"📊 Métricas em http://{host}:{server.server_port}/metrics")
+    return server
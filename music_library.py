@@ -0,0 +1,84 @@
+import argparse
+import logging
+import os
+from pathlib import Path
+
+from audio_processor import AUDIO_EXTENSIONS
+
+
+def iter_audio_files(folder):
+    """Percorre recursivamente uma pasta retornando os arquivos de áudio
+
+    Pastas ocultas (como o acervo de mídia, cujos arquivos já aparecem como
+    links nas pastas de playlist) são ignoradas.
+    """
+    for directory, subdirectories, files in os.walk(folder):
+        subdirectories[:] = [
+            name for name in subdirectories if not name.startswith(".")
+        ]
+        for name in files:
+            file_path = Path(directory, name)
+            if file_path.suffix.lower() in AUDIO_EXTENSIONS:
+                yield file_path
+
+
+def read_track_metadata(file_path):
+    """Lê título, artista e duração de uma faixa (sem dispositivo de áudio)
+
+    Returns:
+        Dicionário com "path", "title", "artist" e "duration" (segundos, 0 se
+        desconhecida)
+    """
+    file_path = Path(file_path)
+    track = {
+        "path": str(file_path),
+        "title": file_path.stem,
+        "artist": "",
+        "duration": 0,
+    }
+
+    if file_path.suffix.lower() != ".mp3":
+        return track
+
+    try:
+        from mutagen.mp3 import MP3
+
+        audio = MP3(str(file_path))
+        track["duration"] = int(audio.info.length)
+        if audio.tags:
+            title = audio.tags.get("TIT2")
+            artist = audio.tags.get("TPE1")
+            if title:
+                track["title"] = str(title)
+            if artist:
+                track["artist"] = str(artist)
+    except Exception as e:
+        logging.debug(f"Erro ao ler metadados de {file_path}: {e}")
+
+    return track
+
+
+def scan_music_library(folder):
+    """Lista as faixas de uma pasta com seus metadados
+
+    Não depende de Qt nem de pygame, então pode ser usada em modo headless.
+    """
+    if not os.path.exists(folder):
+        logging.warning(f"Pasta {folder} não encontrada")
+        return []
+
+    return [read_track_metadata(file_path) for file_path in iter_audio_files(folder)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List the music library")
+    parser.add_argument("path", help="Library directory")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    for library_track in scan_music_library(args.path):
+        artist_suffix = (
+            f" - {library_track['artist']}" if library_track["artist"] else ""
+        )
+        print(f"{library_track['title']}{artist_suffix}\t{library_track['path']}")
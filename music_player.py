@@ -1,7 +1,7 @@
 import os
 import random
 from pathlib import Path
-from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtCore import QTimer, Qt, pyqtSignal
 from PyQt5.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -17,16 +17,77 @@ from PyQt5.QtWidgets import (
     QFileDialog,
     QSpinBox,
 )
-from PyQt5.QtGui import QFont
-import pygame
-from mutagen.mp3 import MP3
+from PyQt5.QtGui import QColor, QFont, QPainter
 import logging
+from audio_backend import create_audio_backend
 from audio_processor import AsyncSimpleAudioProcessor, check_ffmpeg
+from music_library import iter_audio_files, read_track_metadata, scan_music_library
+from waveform import get_cached_peaks, schedule_peaks
+
+
+class WaveformSlider(QSlider):
+    """Slider de progresso que desenha o waveform da faixa ao fundo"""
+
+    def __init__(self, orientation, parent=None):
+        super().__init__(orientation, parent)
+        self.peaks = None
+        self.columns = None
+        self.setMinimumHeight(48)
+
+    def set_peaks(self, peaks):
+        """Define os picos (mins, maxs) da faixa atual"""
+        self.peaks = peaks
+        self.columns = None
+        self.update()
+
+    def clear_peaks(self):
+        """Remove o waveform exibido"""
+        self.set_peaks(None)
+
+    def resizeEvent(self, event):
+        self.columns = None
+        super().resizeEvent(event)
+
+    def _build_columns(self):
+        """Reamostra os picos para a largura atual do widget"""
+        mins, maxs = self.peaks
+        width = max(1, self.width())
+        columns = []
+        for x in range(width):
+            start = x * len(mins) // width
+            end = max(start + 1, (x + 1) * len(mins) // width)
+            columns.append((int(mins[start:end].min()), int(maxs[start:end].max())))
+        return columns
+
+    def paintEvent(self, event):
+        if self.peaks is not None and len(self.peaks[0]):
+            if self.columns is None:
+                self.columns = self._build_columns()
+
+            painter = QPainter(self)
+            center = self.height() / 2
+            scale = (self.height() / 2 - 2) / 127.0
+            span = max(1, self.maximum() - self.minimum())
+            played_x = (self.value() - self.minimum()) * self.width() / span
+
+            played_color = QColor("#4CAF50")
+            pending_color = QColor("#9E9E9E")
+            for x, (low, high) in enumerate(self.columns):
+                painter.setPen(played_color if x <= played_x else pending_color)
+                painter.drawLine(
+                    x, int(center - high * scale), x, int(center - low * scale)
+                )
+            painter.end()
+
+        super().paintEvent(event)
 
 
 class MusicPlayer(QWidget):
     """Player de música interno com controles completos"""
 
+    # Emitido (a partir do pool de waveform) quando os picos ficam prontos
+    waveform_ready = pyqtSignal(str, object)
+
     def __init__(self, downloads_path="downloads"):
         super().__init__()
 
@@ -57,10 +118,11 @@ class MusicPlayer(QWidget):
         # Processador de áudio
         self.audio_processor = AsyncSimpleAudioProcessor(self.on_audio_processed)
 
-        # Inicializar pygame mixer
-        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=2048)
+        # Backend de áudio criado só na primeira reprodução
+        self._audio = None
 
         self.init_ui()
+        self.waveform_ready.connect(self.on_waveform_ready)
         self.load_music_library()
 
         # Timer para atualizar posição da música
@@ -68,6 +130,15 @@ class MusicPlayer(QWidget):
         self.position_timer.timeout.connect(self.update_position)
         self.position_timer.start(1000)  # Atualiza a cada segundo
 
+    @property
+    def audio(self):
+        """Backend de áudio, inicializado (abrindo o dispositivo) no primeiro uso"""
+        if self._audio is None:
+            self._audio = create_audio_backend()
+            self._audio.set_volume(self.volume)
+            logging.info(f"Backend de áudio inicializado: {self._audio.name}")
+        return self._audio
+
     def init_ui(self):
         """Inicializa a interface do player"""
         layout = QVBoxLayout()
@@ -140,7 +211,7 @@ class MusicPlayer(QWidget):
         # Barra de progresso
         progress_layout = QVBoxLayout()
 
-        self.progress_slider = QSlider(Qt.Orientation.Horizontal)
+        self.progress_slider = WaveformSlider(Qt.Orientation.Horizontal)
         self.progress_slider.setMinimum(0)
         self.progress_slider.setMaximum(100)
         self.progress_slider.sliderPressed.connect(self.on_seek_start)
@@ -320,42 +391,18 @@ class MusicPlayer(QWidget):
         self.music_list.clear()
         self.playlist.clear()
 
-        if not os.path.exists(self.downloads_path):
-            logging.warning(f"Pasta {self.downloads_path} não encontrada")
-            return
-
-        supported_formats = [".mp3", ".wav", ".ogg", ".m4a"]
+        for track in scan_music_library(self.downloads_path):
+            self.playlist.append(track["path"])
 
-        for file_path in Path(self.downloads_path).rglob("*"):
-            if file_path.suffix.lower() in supported_formats:
-                self.playlist.append(str(file_path))
+            # Criar item da lista
+            item = QListWidgetItem()
+            if track["artist"]:
+                item.setText(f"{track['title']} - {track['artist']}")
+            else:
+                item.setText(track["title"])
 
-                # Tentar extrair metadados
-                display_name = file_path.stem
-                artist = ""
-
-                try:
-                    if file_path.suffix.lower() == ".mp3":
-                        audio = MP3(str(file_path))
-                        if audio.tags:
-                            title = audio.tags.get("TIT2")
-                            artist_tag = audio.tags.get("TPE1")
-                            if title:
-                                display_name = str(title)
-                            if artist_tag:
-                                artist = str(artist_tag)
-                except Exception as e:
-                    logging.debug(f"Erro ao ler metadados de {file_path}: {e}")
-
-                # Criar item da lista
-                item = QListWidgetItem()
-                if artist:
-                    item.setText(f"{display_name} - {artist}")
-                else:
-                    item.setText(display_name)
-
-                item.setData(Qt.ItemDataRole.UserRole, str(file_path))
-                self.music_list.addItem(item)
+            item.setData(Qt.ItemDataRole.UserRole, track["path"])
+            self.music_list.addItem(item)
 
         logging.info(f"Carregadas {len(self.playlist)} músicas na biblioteca")
 
@@ -364,18 +411,15 @@ class MusicPlayer(QWidget):
         folder = QFileDialog.getExistingDirectory(self, "Selecionar Pasta de Músicas")
         if folder:
             # Adicionar músicas da pasta selecionada
-            supported_formats = [".mp3", ".wav", ".ogg", ".m4a"]
-
-            for file_path in Path(folder).rglob("*"):
-                if file_path.suffix.lower() in supported_formats:
-                    if str(file_path) not in self.playlist:
-                        self.playlist.append(str(file_path))
+            for file_path in iter_audio_files(folder):
+                if str(file_path) not in self.playlist:
+                    self.playlist.append(str(file_path))
 
-                        # Criar item da lista
-                        item = QListWidgetItem()
-                        item.setText(file_path.stem)
-                        item.setData(Qt.ItemDataRole.UserRole, str(file_path))
-                        self.music_list.addItem(item)
+                    # Criar item da lista
+                    item = QListWidgetItem()
+                    item.setText(file_path.stem)
+                    item.setData(Qt.ItemDataRole.UserRole, str(file_path))
+                    self.music_list.addItem(item)
 
     def play_selected_song(self, item):
         """Reproduz a música selecionada"""
@@ -387,7 +431,7 @@ class MusicPlayer(QWidget):
         """Reproduz uma música específica"""
         try:
             if self.is_playing:
-                pygame.mixer.music.stop()
+                self.audio.stop()
 
             # Limpar estado de processamento anterior
             self.cleanup_processed_file()
@@ -397,8 +441,8 @@ class MusicPlayer(QWidget):
             self.pitch_slider.setValue(0)
             self.update_pitch_display()
 
-            pygame.mixer.music.load(file_path)
-            pygame.mixer.music.play()
+            self.audio.load(file_path)
+            self.audio.play()
 
             self.current_song = file_path
             self.is_playing = True
@@ -411,18 +455,14 @@ class MusicPlayer(QWidget):
             self.current_song_label.setText(song_name)
 
             # Tentar obter duração
-            try:
-                if file_path.lower().endswith(".mp3"):
-                    audio = MP3(file_path)
-                    self.duration = int(audio.info.length)
-                    self.duration_label.setText(self.format_time(self.duration))
-                else:
-                    self.duration = 0
-                    self.duration_label.setText("--:--")
-            except:
-                self.duration = 0
+            self.duration = read_track_metadata(file_path)["duration"]
+            if self.duration:
+                self.duration_label.setText(self.format_time(self.duration))
+            else:
                 self.duration_label.setText("--:--")
 
+            self.load_waveform(file_path)
+
             # Destacar música atual na lista
             for i in range(self.music_list.count()):
                 item = self.music_list.item(i)
@@ -436,6 +476,21 @@ class MusicPlayer(QWidget):
             QMessageBox.warning(self, "Erro", f"Erro ao reproduzir música: {str(e)}")
             logging.error(f"Erro ao reproduzir {file_path}: {e}")
 
+    def load_waveform(self, file_path):
+        """Exibe o waveform da faixa (do cache ou gerado em segundo plano)"""
+        peaks = get_cached_peaks(file_path)
+        if peaks is not None:
+            self.progress_slider.set_peaks(peaks)
+            return
+
+        self.progress_slider.clear_peaks()
+        schedule_peaks(file_path, self.waveform_ready.emit)
+
+    def on_waveform_ready(self, file_path, peaks):
+        """Callback quando o waveform gerado em segundo plano fica pronto"""
+        if peaks is not None and file_path == self.current_song:
+            self.progress_slider.set_peaks(peaks)
+
     def toggle_play_pause(self):
         """Alterna entre play e pause"""
         if not self.current_song:
@@ -445,11 +500,11 @@ class MusicPlayer(QWidget):
             return
 
         if self.is_playing and not self.is_paused:
-            pygame.mixer.music.pause()
+            self.audio.pause()
             self.is_paused = True
             self.play_pause_btn.setText("▶️")
         elif self.is_paused:
-            pygame.mixer.music.unpause()
+            self.audio.unpause()
             self.is_paused = False
             self.play_pause_btn.setText("⏸️")
         else:
@@ -457,7 +512,8 @@ class MusicPlayer(QWidget):
 
     def stop_music(self):
         """Para a reprodução"""
-        pygame.mixer.music.stop()
+        if self._audio:
+            self._audio.stop()
         self.is_playing = False
         self.is_paused = False
         self.position = 0
@@ -512,7 +568,8 @@ class MusicPlayer(QWidget):
     def change_volume(self, value):
         """Altera o volume"""
         self.volume = value / 100.0
-        pygame.mixer.music.set_volume(self.volume)
+        if self._audio:
+            self._audio.set_volume(self.volume)
         self.volume_label.setText(f"{value}%")
 
     def update_position(self):
@@ -520,7 +577,7 @@ class MusicPlayer(QWidget):
         if self.is_playing and not self.is_paused:
             # Verificar se a música acabou
             # Mas não considerar como acabou se estamos processando áudio
-            music_not_busy = not pygame.mixer.music.get_busy()
+            music_not_busy = not self.audio.get_busy()
             processor_not_busy = not self.audio_processor.is_busy()
             if music_not_busy and processor_not_busy:
                 if self.repeat_mode:
@@ -657,7 +714,7 @@ class MusicPlayer(QWidget):
         # Pausar música atual se estiver tocando
         was_playing = self.is_playing and not self.is_paused
         if was_playing:
-            pygame.mixer.music.pause()
+            self.audio.pause()
             logging.debug("Música pausada para processamento")
 
         # Processar áudio de forma assíncrona (apenas pitch)
@@ -685,8 +742,8 @@ class MusicPlayer(QWidget):
 
             # Carregar áudio processado
             try:
-                pygame.mixer.music.load(output_path)
-                pygame.mixer.music.play()
+                self.audio.load(output_path)
+                self.audio.play()
 
                 self.is_playing = True
                 self.is_paused = False
@@ -807,12 +864,12 @@ class MusicPlayer(QWidget):
 
     def closeEvent(self, event):
         """Limpa recursos ao fechar"""
-        if self.is_playing:
-            pygame.mixer.music.stop()
-
         # Limpar arquivos processados
         self.cleanup_processed_file()
         self.audio_processor.cleanup()
 
-        pygame.mixer.quit()
+        # Só fecha o dispositivo se ele chegou a ser aberto
+        if self._audio:
+            self._audio.stop()
+            self._audio.quit()
         event.accept()
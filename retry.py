@@ -0,0 +1,97 @@
+import random
+import re
+
+from config import load_config
+
+# Padrões de mensagens do yt-dlp por classe de erro, verificados em ordem
+ERROR_PATTERNS = (
+    ("cancelled", r"download cancelado|DownloadCancelled"),
+    (
+        "throttled",
+        r"HTTP Error 429|Too Many Requests|rate.?limit|not a bot",
+    ),
+    (
+        "unavailable",
+        r"Video unavailable|Private video|available in your country|"
+        r"geo.?restrict|has been removed|members.only|account .*terminated|"
+        r"copyright|HTTP Error 40[134]|HTTP Error 410|Unsupported URL|"
+        r"Sign in to confirm your age",
+    ),
+    ("format", r"Requested format is not available|No video formats found"),
+    (
+        "transient",
+        r"HTTP Error 5\d\d|timed? ?out|Connection (?:reset|refused|aborted)|"
+        r"Temporary failure|Network is unreachable|IncompleteRead|"
+        r"Remote end closed|EOF occurred|Name or service not known|"
+        r"getaddrinfo failed|giving up after|Errno 104|Errno 110",
+    ),
+)
+
+_COMPILED_PATTERNS = [
+    (error_class, re.compile(pattern, re.I)) for error_class, pattern in ERROR_PATTERNS
+]
+
+
+def classify_error(message):
+    """Classifica a mensagem de erro de um download
+
+    Returns:
+        "transient" (rede, 5xx), "throttled" (429, anti-bot), "unavailable"
+        (removido, privado, geo-bloqueado), "format", "cancelled" ou "fatal"
+    """
+    message = str(message or "")
+    for error_class, pattern in _COMPILED_PATTERNS:
+        if pattern.search(message):
+            return error_class
+    return "fatal"
+
+
+class RetryPolicy:
+    """Backoff exponencial com jitter para erros passageiros
+
+    Só "transient" e "throttled" são repetidos; throttling usa uma espera
+    base maior para não insistir enquanto o servidor está limitando.
+    """
+
+    RETRYABLE = ("transient", "throttled")
+
+    def __init__(
+        self,
+        max_attempts=4,
+        base_delay=5.0,
+        max_delay=300.0,
+        throttle_factor=4.0,
+        jitter=0.5,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttle_factor = throttle_factor
+        self.jitter = jitter
+
+    @classmethod
+    def from_config(cls, config=None):
+        config = config or load_config()
+        return cls(
+            max_attempts=config.get("retry_max_attempts", 4),
+            base_delay=config.get("retry_base_delay", 5.0),
+            max_delay=config.get("retry_max_delay", 300.0),
+        )
+
+    def next_delay(self, error_class, attempt):
+        """Retorna a espera antes da próxima tentativa, ou None para desistir
+
+        Args:
+            error_class: Resultado de classify_error
+            attempt: Número da tentativa que acabou de falhar (a partir de 1)
+        """
+        if error_class not in self.RETRYABLE or attempt >= self.max_attempts:
+            return None
+
+        delay = self.base_delay * 2 ** (attempt - 1)
+        if error_class == "throttled":
+            delay *= self.throttle_factor
+        delay = min(delay, self.max_delay)
+
+        # Jitter espalha as novas tentativas de workers que falharam juntos
+        return delay * (1 - self.jitter * random.random())
@@ -0,0 +1,136 @@
+import heapq
+import itertools
+import threading
+
+import metrics
+from config import load_config
+
+SCHEDULING_POLICIES = ("fifo", "sjf", "size")
+
+# Bitrate usado para estimar o tamanho quando o extrator não informa (bytes/s)
+ESTIMATED_BYTES_PER_SECOND = 256 * 1024
+
+
+def estimated_size(video_info):
+    """Tamanho esperado do download em bytes (ou None se desconhecido)"""
+    size = video_info.get("filesize") or video_info.get("filesize_approx")
+    if size:
+        return size
+    if video_info.get("duration"):
+        return video_info["duration"] * ESTIMATED_BYTES_PER_SECOND
+    return None
+
+
+class DownloadQueue:
+    """Fila de downloads ordenada por prioridade e pela política configurada
+
+    Prioridades maiores saem primeiro; entre iguais, a política decide:
+    "fifo" (ordem de chegada), "sjf" (menor duração primeiro) ou "size"
+    (menor tamanho estimado primeiro). Itens sem duração ou tamanho
+    conhecidos vão para o fim do grupo, como uma live sem duração.
+
+    A prioridade de itens ainda na fila pode mudar a qualquer momento (ex.:
+    pelo menu de contexto da GUI) e vale para a próxima escolha.
+
+    Os itens ficam num heap, então push e pop custam O(log n) mesmo em lotes
+    de dezenas de milhares. Mudar a prioridade ou reenfileirar uma URL põe
+    uma nova versão no heap; a antiga fica lá e é descartada quando chega
+    ao topo.
+    """
+
+    def __init__(self, policy=None):
+        policy = policy or load_config().get("download_scheduling", "fifo")
+        if policy not in SCHEDULING_POLICIES:
+            raise ValueError(f"Política de agendamento inválida: {policy!r}")
+        self.policy = policy
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.heap = []
+        self.sequence = itertools.count()
+        self.versions = itertools.count()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def _cost(self, video_info):
+        if self.policy == "sjf":
+            cost = video_info.get("duration")
+        elif self.policy == "size":
+            cost = estimated_size(video_info)
+        else:
+            return 0
+        return cost if cost else float("inf")
+
+    def push(self, video_info, attempt=1):
+        with self.lock:
+            if video_info["url"] not in self.entries:
+                metrics.JOBS.inc(state="queued")
+            entry = {
+                "video_info": video_info,
+                "attempt": attempt,
+                "priority": video_info.get("priority", 0),
+                "cost": self._cost(video_info),
+                "order": next(self.sequence),
+            }
+            self.entries[video_info["url"]] = entry
+            self._push_heap(entry)
+
+    def _sort_key(self, entry):
+        return (-entry["priority"], entry["cost"], entry["order"])
+
+    def _push_heap(self, entry):
+        """Põe a versão atual da entrada no heap (chamar com lock)"""
+        entry["version"] = next(self.versions)
+        heapq.heappush(
+            self.heap,
+            (*self._sort_key(entry), entry["version"], entry["video_info"]["url"]),
+        )
+        # Muitas versões antigas acumuladas: reconstrói só com as atuais
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = [
+                item
+                for item in self.heap
+                if self._current(item[-1], item[-2]) is not None
+            ]
+            heapq.heapify(self.heap)
+
+    def _current(self, url, version):
+        entry = self.entries.get(url)
+        if entry is None or entry["version"] != version:
+            return None
+        return entry
+
+    def pop(self):
+        """Remove e retorna (video_info, tentativa) do próximo item, ou None"""
+        with self.lock:
+            while self.heap:
+                *_, version, url = heapq.heappop(self.heap)
+                entry = self._current(url, version)
+                if entry is None:
+                    continue
+                del self.entries[url]
+                metrics.JOBS.dec(state="queued")
+                return entry["video_info"], entry["attempt"]
+            return None
+
+    def set_priority(self, url, priority):
+        """Muda a prioridade de um item na fila
+
+        Returns:
+            False se o item não está mais na fila (já começou ou terminou)
+        """
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None:
+                return False
+            entry["priority"] = priority
+            entry["video_info"]["priority"] = priority
+            self._push_heap(entry)
+            return True
+
+    def snapshot(self):
+        """Itens na ordem em que serão baixados"""
+        with self.lock:
+            entries = sorted(self.entries.values(), key=self._sort_key)
+            return [entry["video_info"] for entry in entries]
@@ -0,0 +1,210 @@
+import errno
+import filecmp
+import hashlib
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from config import load_config
+
+# Folga mínima deixada livre no destino ao mover arquivos (bytes)
+FREE_SPACE_MARGIN = 64 * 1024**2
+
+# O estágio guarda vídeo, áudio separado e o resultado do merge/conversão
+STAGING_SIZE_FACTOR = 3
+
+# Pastas de jobs abandonadas há mais tempo que isso são apagadas (segundos)
+STALE_JOB_AGE = 24 * 3600
+
+
+def staging_root(config=None):
+    """Diretório de estágio configurado ou None se o estágio está desligado"""
+    if config is None:
+        config = load_config()
+    if not config.get("use_staging", True):
+        return None
+    return config.get("staging_dir") or os.path.join(
+        tempfile.gettempdir(), "u2be_down-staging"
+    )
+
+
+def ensure_free_space(directory, needed):
+    """Levanta OSError(ENOSPC) se directory não comporta needed bytes"""
+    free = shutil.disk_usage(directory).free
+    if free < needed + FREE_SPACE_MARGIN:
+        raise OSError(
+            errno.ENOSPC,
+            f"Espaço insuficiente em {directory}: "
+            f"{needed / 1024**2:.1f} MB necessários, {free / 1024**2:.1f} MB livres",
+        )
+
+
+def candidate_paths(directory, name):
+    """Caminhos para um arquivo: name, depois "nome (2).ext", "nome (3).ext"..."""
+    stem, ext = os.path.splitext(name)
+    yield os.path.join(directory, name)
+    for number in itertools.count(2):
+        yield os.path.join(directory, f"{stem} ({number}){ext}")
+
+
+def same_content(path, other):
+    """True se os dois caminhos são o mesmo arquivo ou têm o mesmo conteúdo"""
+    try:
+        return os.path.samefile(path, other) or filecmp.cmp(path, other, shallow=False)
+    except OSError:
+        return False
+
+
+def _rename_no_clobber(source, destination):
+    """Renomeia source para destination sem sobrescrever um arquivo existente
+
+    Raises:
+        FileExistsError: destination já existe
+    """
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno == errno.EXDEV:
+            raise
+        # Sistemas de arquivos sem hardlink (FAT, exFAT): confere e renomeia
+        if os.path.lexists(destination):
+            raise FileExistsError(errno.EEXIST, "Arquivo já existe", destination)
+        os.replace(source, destination)
+        return
+    os.remove(source)
+
+
+def _place(source, destination_dir):
+    """Põe source na pasta com um nome livre e retorna o caminho final
+
+    Um arquivo diferente com o mesmo nome (outro vídeo com o mesmo título)
+    nunca é sobrescrito: o novo recebe um sufixo " (2)". Se o arquivo já
+    está lá com o mesmo conteúdo (o mesmo vídeo baixado de novo), o existente
+    é mantido e source é descartado.
+    """
+    name = os.path.basename(source)
+    for destination in candidate_paths(destination_dir, name):
+        if os.path.lexists(destination):
+            if same_content(source, destination):
+                os.remove(source)
+                logging.info(f"📦 Já estava na biblioteca: {destination}")
+                return destination
+            continue
+        try:
+            _rename_no_clobber(source, destination)
+        except FileExistsError:
+            continue
+        if os.path.basename(destination) != name:
+            logging.warning(
+                f"⚠️ Já existe outro {name} em {destination_dir}; "
+                f"salvo como {os.path.basename(destination)}"
+            )
+        return destination
+
+
+def move_into_library(source, destination_dir):
+    """Move um arquivo para a biblioteca sem expor arquivos pela metade
+
+    No mesmo sistema de arquivos é um único rename. Entre sistemas de
+    arquivos diferentes o arquivo é copiado para um nome oculto ao lado do
+    destino e renomeado no fim, depois de conferir o espaço livre. Um arquivo
+    diferente com o mesmo nome no destino não é sobrescrito (ver _place).
+
+    Returns:
+        Caminho final do arquivo
+    """
+    os.makedirs(destination_dir, exist_ok=True)
+    try:
+        return _place(source, destination_dir)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    ensure_free_space(destination_dir, os.path.getsize(source))
+    # A cópia vai para uma pasta oculta com o nome final, para que _place a
+    # renomeie para a biblioteca já no mesmo sistema de arquivos
+    name = os.path.basename(source)
+    partial_dir = os.path.join(destination_dir, f".{name}.{uuid.uuid4().hex[:8]}.part")
+    partial = os.path.join(partial_dir, name)
+    try:
+        os.makedirs(partial_dir)
+        shutil.copy2(source, partial)
+        destination = _place(partial, destination_dir)
+    finally:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+    os.remove(source)
+    return destination
+
+
+def cleanup_stale_jobs(root, max_age=STALE_JOB_AGE):
+    """Apaga pastas de jobs que ficaram no estágio (falhas definitivas)"""
+    now = time.time()
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_dir() and now - entry.stat().st_mtime > max_age:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+class StagingArea:
+    """Pasta de trabalho local de um download
+
+    Download, merge e conversão acontecem em path; publish() move cada
+    resultado para a biblioteca num único passo, de modo que o player nunca
+    vê arquivos incompletos. A pasta é derivada da URL: uma nova tentativa
+    reaproveita os .part deixados pela anterior, e a pasta só é removida
+    quando o download termina com sucesso.
+
+    Se o estágio estiver desligado ou sem espaço para expected_size, path é
+    a própria pasta de destino e publish() não move nada.
+    """
+
+    def __init__(self, url, destination_dir, expected_size=None, config=None):
+        self.destination_dir = destination_dir
+        self.path = destination_dir
+        self.staged = False
+
+        root = staging_root(config)
+        if root is None:
+            return
+
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+        try:
+            os.makedirs(root, exist_ok=True)
+            if expected_size:
+                ensure_free_space(root, expected_size * STAGING_SIZE_FACTOR)
+            cleanup_stale_jobs(root)
+            os.makedirs(os.path.join(root, key), exist_ok=True)
+        except OSError as e:
+            logging.warning(f"⚠️ Estágio indisponível, baixando direto no destino: {e}")
+            return
+
+        self.path = os.path.join(root, key)
+        self.staged = True
+
+    def publish(self, path):
+        """Move um arquivo do estágio para a biblioteca e retorna o novo caminho"""
+        if not self.staged or not path:
+            return path
+        # Arquivos fora do estágio (ex.: faixa que já estava na biblioteca)
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.path):
+            return path
+        final_path = move_into_library(path, self.destination_dir)
+        logging.info(f"📦 Movido para a biblioteca: {final_path}")
+        return final_path
+
+    def discard(self):
+        """Remove a pasta do job (chamado depois de publicar os resultados)"""
+        if self.staged:
+            shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Teste do limitador de banda global (token bucket e agenda por horário)
+"""
+
+import functools
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import main
+from bandwidth import BandwidthLimiter, TokenBucket, parse_rate, scheduled_rate
+
+
+def test_parse_rate():
+    """Limites aceitam sufixos K/M/G e vazio significa sem limite"""
+    assert parse_rate("500K") == 500 * 1024
+    assert parse_rate("1.5M") == 1.5 * 1024**2
+    assert parse_rate("2MiB/s") == 2 * 1024**2
+    assert parse_rate(250000) == 250000
+    assert parse_rate(None) is None and parse_rate("0") is None
+    try:
+        parse_rate("rápido")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Limite inválido deveria falhar")
+
+
+def test_scheduled_rate():
+    """A agenda considera horário, dias da semana e janelas noturnas"""
+    config = {
+        "bandwidth_limit": "10M",
+        "bandwidth_schedule": [
+            {
+                "start": "09:00",
+                "end": "18:00",
+                "limit": "1M",
+                "weekdays": [0, 1, 2, 3, 4],
+            },
+            {"start": "22:00", "end": "06:00", "limit": None},
+        ],
+    }
+    monday_noon = datetime(2026, 10, 19, 12, 0)
+    saturday_noon = datetime(2026, 10, 24, 12, 0)
+    tuesday_night = datetime(2026, 10, 20, 2, 30)
+
+    assert scheduled_rate(config, monday_noon) == 1024**2
+    assert scheduled_rate(config, saturday_noon) == 10 * 1024**2
+    assert scheduled_rate(config, tuesday_night) is None
+    assert scheduled_rate({}, monday_noon) is None
+
+
+def test_shared_bucket_caps_aggregate_rate():
+    """Vários consumidores juntos não passam do limite do balde"""
+    rate = 200_000
+    limiter = BandwidthLimiter()
+    limiter.set_fixed_rate(rate)
+    received = []
+
+    def worker(key):
+        deadline = time.monotonic() + 0.6
+        while time.monotonic() < deadline:
+            limiter.consume(key, 8192)
+            received.append(8192)
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    # Tolerância: rajada inicial de 1 s e o último bloco de cada worker
+    assert sum(received) <= rate * (elapsed + 1) + 3 * 8192
+    assert limiter.status()["active_downloads"] == 3
+
+
+def test_unused_bandwidth_goes_to_active_workers():
+    """Sem concorrência, um único consumidor usa o limite inteiro"""
+    bucket = TokenBucket(rate=100_000, burst_seconds=0)
+    assert bucket.reserve(50_000) == 0.5
+    time.sleep(0.5)
+    assert bucket.reserve(0) < 0.05
+
+
+def test_download_respects_limit(monkeypatch):
+    """Um download real via yt-dlp (servidor local) obedece o limite global"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        served = os.path.join(temp_dir, "srv")
+        os.makedirs(served)
+        with open(os.path.join(served, "clip.mp4"), "wb") as file:
+            file.write(os.urandom(300_000))
+
+        handler = functools.partial(SimpleHTTPRequestHandler, directory=served)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        limiter = BandwidthLimiter()
+        limiter.set_fixed_rate("200K")
+        monkeypatch.setattr(main, "get_bandwidth_limiter", lambda: limiter)
+        progress = []
+
+        try:
+            start = time.monotonic()
+            success, path = main.download_single_video(
+                f"http://127.0.0.1:{server.server_port}/clip.mp4",
+                temp_dir,
+                progress_callback=progress.append,
+            )
+            elapsed = time.monotonic() - start
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert success, path
+        # 300 KB a 200 KB/s com 1 s de rajada inicial
+        assert elapsed >= 0.4
+        assert any(data.get("rate_limit") == 200 * 1024 for data in progress)
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Teste do benchmark offline (extrator falso + servidor local) e da comparação
+com o baseline
+"""
+
+import os
+
+import bench_suite
+import main
+
+
+def test_offline_benchmark_runs(tmp_path):
+    """Todas as etapas rodam sem internet e sem tocar no histórico real"""
+    cwd = os.getcwd()
+    results = bench_suite.run_benchmark(
+        playlists=1,
+        playlist_size=3,
+        media_size=4096,
+        convert_items=1,
+        history_items=8,
+        history_processes=2,
+        video_info_items=100,
+        library_items=5,
+        gui_rows=5,
+    )
+
+    names = [entry["name"] for entry in results]
+    assert names == [
+        "parse",
+        "download",
+        "convert",
+        "history",
+        "history_procs",
+        "video_info",
+        "library_scan",
+        "gui_table",
+    ]
+    assert results[0]["items"] == 3 and results[1]["items"] == 3
+    memory = results[names.index("video_info")]
+    assert 0 < memory["bytes_per_item"] < memory["dict_bytes_per_item"]
+    assert os.getcwd() == cwd
+    assert bench_suite.install_stub_extractor not in main.youtube_dl_hooks
+
+
+def test_compare_with_baseline():
+    baseline = {
+        "results": [
+            {"name": "parse", "ms_per_item": 10.0},
+            {"name": "download", "ms_per_item": 50.0},
+            {"name": "convert", "skipped": "ffmpeg não encontrado"},
+            {"name": "video_info", "ms_per_item": 0.01, "bytes_per_item": 300},
+        ]
+    }
+    results = [
+        {"name": "parse", "ms_per_item": 12.0},
+        {"name": "download", "ms_per_item": 80.0},
+        {"name": "convert", "ms_per_item": 700.0},
+        {"name": "video_info", "ms_per_item": 0.01, "bytes_per_item": 600},
+    ]
+
+    regressions = bench_suite.compare_results(results, baseline, tolerance=0.3)
+    assert [(r["name"], r["metric"]) for r in regressions] == [
+        ("download", "ms_per_item"),
+        ("video_info", "bytes_per_item"),
+    ]
+    assert regressions[0]["ratio"] == 1.6
+    assert regressions[1]["baseline_bytes_per_item"] == 300
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
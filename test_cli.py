@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Teste da CLI em lote (sem rede: parse e download são substituídos)
+"""
+
+import io
+import json
+import logging
+import os
+import tempfile
+
+import pytest
+
+import logging_setup
+import main
+
+
+@pytest.fixture(autouse=True)
+def no_log_file(monkeypatch):
+    """setup_logging da CLI usa o config sem o arquivo de log do projeto"""
+    settings = {**logging_setup.load_config(), "log_file": None}
+    monkeypatch.setattr(logging_setup, "load_config", lambda: settings)
+    root_level = logging.getLogger().level
+    yield
+    logging_setup.shutdown_logging()
+    logging.getLogger().setLevel(root_level)
+
+
+def _run(monkeypatch, argv, videos, failing_urls=()):
+    """Executa run_cli com parse/download falsos e retorna (código, eventos)"""
+    calls = {}
+
+    def fake_parse(urls, **kwargs):
+        calls["urls"] = urls
+        return videos
+
+    def fake_download(videos_info, download_path, **kwargs):
+        calls["download"] = kwargs
+        results = []
+        for video in videos_info:
+            success = video["url"] not in failing_urls
+            kwargs["progress_callback"](video["url"], {"status": "downloading"})
+            kwargs["result_callback"](video, success)
+            results.append((video, success))
+        return results
+
+    stdout = io.StringIO()
+    monkeypatch.setattr(main, "parse_urls_parallel", fake_parse)
+    monkeypatch.setattr(main, "download_videos_parallel", fake_download)
+    monkeypatch.setattr(main, "add_downloads_to_history", lambda *args: None)
+    monkeypatch.setattr(main.sys, "stdout", stdout)
+
+    code = main.run_cli(argv)
+    events = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    return code, events, calls
+
+
+def test_cli_batch_file_and_json_output(monkeypatch):
+    """URLs do arquivo e da linha de comando viram um único lote"""
+    videos = [
+        {"title": "A", "url": "https://youtu.be/a"},
+        {"title": "B", "url": "https://youtu.be/b"},
+    ]
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as batch:
+        batch.write("https://youtu.be/a\n\n# comentário\nhttps://youtu.be/b\n")
+
+    try:
+        code, events, calls = _run(
+            monkeypatch,
+            [
+                "-a",
+                batch.name,
+                "https://youtu.be/c",
+                "--workers",
+                "4",
+                "--archive",
+                "x",
+            ],
+            videos,
+        )
+    finally:
+        os.remove(batch.name)
+
+    assert code == 0
+    assert calls["urls"] == [
+        "https://youtu.be/c",
+        "https://youtu.be/a",
+        "https://youtu.be/b",
+    ]
+    assert calls["download"]["max_workers"] == 4
+    assert calls["download"]["archive_path"] == "x"
+    assert calls["download"]["to_mp3"] is False
+
+    names = [event["event"] for event in events]
+    assert names[0] == "start" and names[-1] == "summary"
+    assert names.count("finished") == 2
+    assert events[-1]["failed"] == 0
+
+
+def test_cli_exit_code_on_failure(monkeypatch):
+    """Uma falha de download gera código de saída diferente de zero"""
+    videos = [{"title": "A", "url": "https://youtu.be/a"}]
+    code, events, _ = _run(
+        monkeypatch,
+        ["https://youtu.be/a"],
+        videos,
+        failing_urls={"https://youtu.be/a"},
+    )
+    assert code == 1
+    assert events[-1]["failed"] == 1
+
+
+def test_cli_without_urls(monkeypatch):
+    """Sem URLs, a CLI retorna erro de uso"""
+    code, events, _ = _run(monkeypatch, [], [])
+    assert code == 2
+    assert events[-1]["event"] == "error"
+
+
+def test_progress_events_are_throttled():
+    """Eventos de progresso repetidos da mesma fase são limitados"""
+    stream = io.StringIO()
+    reporter = main.JsonLinesReporter(stream, progress_interval=60)
+    for percent in range(10):
+        reporter.progress("u", {"status": "downloading", "phase": "download"})
+    reporter.progress("u", {"status": "converting", "phase": "conversion"})
+
+    assert len(stream.getvalue().splitlines()) == 2
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Teste do daemon de downloads e do seu cliente HTTP (downloads falsos, sem rede)
+"""
+
+import io
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+import daemon
+import daemon_client
+import logging_setup
+import main
+import watcher
+from daemon_client import DaemonClient
+from video_info import VideoInfo
+
+
+@pytest.fixture(autouse=True)
+def no_log_file(monkeypatch):
+    """setup_logging da CLI usa o config sem o arquivo de log do projeto"""
+    settings = {**logging_setup.load_config(), "log_file": None}
+    monkeypatch.setattr(logging_setup, "load_config", lambda: settings)
+    root_level = logging.getLogger().level
+    yield
+    logging_setup.shutdown_logging()
+    logging.getLogger().setLevel(root_level)
+
+
+def fake_download(
+    url, output_path, to_mp3, keep_video, progress_callback, *args, **options
+):
+    """Simula um download; URLs com "slow" esperam o cancelamento do job"""
+    progress_callback({"status": "downloading", "phase": "download", "percent": 50})
+    if "slow" in url:
+        options["cancel_event"].wait(10)
+        return False, "Download cancelado"
+    progress_callback({"status": "finished", "phase": "complete", "percent": 100})
+    return "fail" not in url, output_path
+
+
+def start_daemon(monkeypatch):
+    monkeypatch.setattr(main, "download_single_video", fake_download)
+    monkeypatch.setattr(main, "add_downloads_to_history", lambda *args: None)
+    monkeypatch.setattr(main, "update_download_status", lambda *args, **kw: None)
+
+    service = daemon.DownloadService(max_workers=2)
+    server = daemon.create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return service, server, DaemonClient(port=server.server_port)
+
+
+def stop_daemon(service, server):
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+
+def test_submit_and_stream_events(monkeypatch):
+    """Um job submetido emite a mesma sequência de eventos da CLI via SSE"""
+    service, server, client = start_daemon(monkeypatch)
+    try:
+        assert client.is_available()
+        videos = [
+            {"title": "A", "url": "https://youtu.be/a"},
+            {"title": "B", "url": "https://youtu.be/fail"},
+        ]
+        job = client.submit(videos=videos, output="/tmp")
+        events = list(client.iter_events(job["id"]))
+
+        names = [event["event"] for event in events]
+        assert names[0] == "start" and names[-1] == "summary"
+        assert [event["id"] for event in events] == list(range(1, len(events) + 1))
+        assert events[-1]["completed"] == 1 and events[-1]["failed"] == 1
+
+        details = client.get_job(job["id"])
+        assert details["state"] == "failed"
+        assert {item["status"] for item in details["items"]} == {"completed", "failed"}
+        assert [listed["id"] for listed in client.list_jobs()] == [job["id"]]
+
+        # Reconectar com Last-Event-ID devolve só os eventos seguintes
+        replay = list(client.iter_events(job["id"], after=len(events) - 1))
+        assert [event["event"] for event in replay] == ["summary"]
+    finally:
+        stop_daemon(service, server)
+
+
+def test_cancel_job(monkeypatch):
+    """Cancelar interrompe o download ativo e pula os que estão na fila"""
+    service, server, client = start_daemon(monkeypatch)
+    try:
+        videos = [
+            {"title": f"Slow {number}", "url": f"https://youtu.be/slow{number}"}
+            for number in range(4)
+        ]
+        job = client.submit(videos=videos, output="/tmp")
+        for event in client.iter_events(job["id"]):
+            if event["event"] == "progress":
+                client.cancel(job["id"])
+            if event["event"] == "summary":
+                assert event["failed"] == 4
+
+        assert client.get_job(job["id"])["state"] == "cancelled"
+    finally:
+        stop_daemon(service, server)
+
+
+def test_invalid_requests(monkeypatch):
+    """Jobs sem URLs, opções inválidas e ids desconhecidos retornam erro"""
+    service, server, client = start_daemon(monkeypatch)
+    try:
+        calls = (
+            lambda: client.submit(),
+            lambda: client.get_job("nada"),
+            lambda: client.submit(urls=["https://youtu.be/a"], newest="5"),
+        )
+        for call in calls:
+            try:
+                call()
+            except RuntimeError as e:
+                assert "400" in str(e) or "404" in str(e)
+            else:
+                raise AssertionError("Era esperado um erro do daemon")
+    finally:
+        stop_daemon(service, server)
+
+
+def test_watched_playlist_becomes_job(monkeypatch):
+    """Vídeos novos de uma playlist observada viram um job do daemon"""
+    playlist = [
+        VideoInfo(title=name, url=f"https://www.youtube.com/watch?v={name}")
+        for name in ("old", "new")
+    ]
+    monkeypatch.setattr(watcher, "extract_video_info", lambda url, newest: playlist)
+    monkeypatch.setattr(
+        watcher,
+        "load_downloads_history",
+        lambda: [{"url": "https://www.youtube.com/watch?v=old"}],
+    )
+    monkeypatch.setattr(watcher, "on_battery", lambda: False)
+    monkeypatch.setattr(watcher, "on_metered_connection", lambda: False)
+    monkeypatch.setattr(daemon, "set_ffmpeg_path", lambda: None)
+    service, server, client = start_daemon(monkeypatch)
+    try:
+        service.start_watcher(
+            {
+                "watch_list": ["https://youtube.com/playlist?list=PL"],
+                "watch_stagger": 0,
+                "watch_state_file": None,
+            }
+        )
+        deadline = time.time() + 5
+        while not client.list_jobs() and time.time() < deadline:
+            time.sleep(0.02)
+
+        (job,) = client.list_jobs()
+        events = list(client.iter_events(job["id"]))
+        assert [e["title"] for e in events if e["event"] == "queued"] == ["new"]
+        assert job["options"]["audio_format"] == "mp3"
+        assert client.watch_status()["sources"][0]["new_videos"] == 1
+    finally:
+        stop_daemon(service, server)
+
+
+def test_cli_uses_daemon(monkeypatch):
+    """Com --daemon, a CLI só submete o lote e repassa os eventos"""
+    service, server, client = start_daemon(monkeypatch)
+    port = server.server_port
+    monkeypatch.setattr(daemon_client, "load_config", lambda: {"daemon_port": port})
+    parse_options = {}
+
+    def fake_parse(urls, **kwargs):
+        parse_options.update(kwargs)
+        return [{"title": url, "url": url} for url in urls]
+
+    monkeypatch.setattr(main, "parse_urls_parallel", fake_parse)
+    stdout = io.StringIO()
+    monkeypatch.setattr(main.sys, "stdout", stdout)
+    try:
+        code = main.run_cli(
+            [
+                "--daemon",
+                "--newest",
+                "5",
+                "--playlist-items",
+                "1-3",
+                "--parse-workers",
+                "2",
+                "https://youtu.be/a",
+                "https://youtu.be/b",
+            ]
+        )
+    finally:
+        stop_daemon(service, server)
+
+    events = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert code == 0
+    # As opções de extração chegam ao job do daemon
+    assert parse_options["newest"] == 5 and parse_options["playlist_items"] == "1-3"
+    assert parse_options["max_workers"] == 2
+    assert events[-1]["event"] == "summary" and events[-1]["completed"] == 2
+    assert all(event["job"] == events[0]["job"] for event in events)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
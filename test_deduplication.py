@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Teste da remoção de repetidos entre URLs: formas diferentes da mesma URL do
+YouTube, playlists com faixas em comum e um download para várias pastas
+"""
+
+import os
+
+import pytest
+from yt_dlp.extractor.common import InfoExtractor
+
+import main
+import media_store
+from extraction import canonical_video_url, youtube_video_id
+from scheduler import DownloadQueue
+
+
+class FakeYouTubeIE(InfoExtractor):
+    """Playlists e vídeos curtos sintéticos com URLs do YouTube"""
+
+    IE_NAME = "fakeyoutube"
+    _VALID_URL = (
+        r"https://(?:www\.youtube\.com/playlist\?list=(?P<list>\w+)"
+        r"|youtu\.be/(?P<id>\w+))"
+    )
+    PLAYLISTS = {"A": ["v0", "v1", "v2"], "B": ["v2", "v3"]}
+
+    def _real_extract(self, url):
+        playlist, video_id = self._match_valid_url(url).group("list", "id")
+        if video_id:
+            return {"id": video_id, "title": f"Vídeo {video_id}"}
+        entries = [
+            self.url_result(
+                f"https://music.youtube.com/watch?v={number}&list={playlist}",
+                video_id=number,
+                video_title=f"Vídeo {number}",
+            )
+            for number in self.PLAYLISTS[playlist]
+        ]
+        return self.playlist_result(entries, playlist, f"Lista {playlist}")
+
+
+@pytest.fixture
+def fake_youtube(monkeypatch):
+    def install(ydl):
+        ie = FakeYouTubeIE()
+        ydl.add_info_extractor(ie)
+        ydl._ies = {ie.ie_key(): ie, **ydl._ies}
+
+    monkeypatch.setattr(main, "youtube_dl_hooks", [install])
+    config = {**main.load_config(), "reuse_youtube_dl": False}
+    monkeypatch.setattr(main, "load_config", lambda: config)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL1&index=2",
+        "https://youtu.be/dQw4w9WgXcQ?t=42",
+        "https://music.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+        "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+    ],
+)
+def test_canonical_video_url(url):
+    assert canonical_video_url(url) == "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+def test_other_urls_are_kept():
+    for url in (
+        "https://www.youtube.com/playlist?list=PL1",
+        "https://www.youtube.com/@canal/videos",
+        "https://vimeo.com/12345",
+    ):
+        assert youtube_video_id(url) is None
+        assert canonical_video_url(url) == url
+
+
+def test_shared_tracks_are_merged(fake_youtube):
+    urls = [
+        "https://www.youtube.com/playlist?list=A",
+        "https://www.youtube.com/playlist?list=B",
+        "https://youtu.be/v2?t=10",
+    ]
+    videos = main.parse_urls_parallel(urls, max_workers=1)
+
+    assert sorted(video["id"] for video in videos) == ["v0", "v1", "v2", "v3"]
+    shared = next(video for video in videos if video["id"] == "v2")
+    assert shared["url"] == "https://www.youtube.com/watch?v=v2"
+    assert shared["playlists"] == ["Lista A", "Lista B", None]
+    assert "playlists" not in videos[0]
+    assert main.history_details(shared)["playlists"] == ["Lista A", "Lista B", None]
+
+
+def test_merged_video_is_downloaded_once(tmp_path, monkeypatch):
+    """Sem o acervo, o arquivo baixado é ligado direto nas outras pastas"""
+    downloads = []
+
+    def fake_download(url, output_path, *args, video_info=None, **kwargs):
+        downloads.append(url)
+        folder = main.playlist_output_path(output_path, video_info)
+        path = os.path.join(folder, "faixa.mp3")
+        with open(path, "wb") as file:
+            file.write(b"mp3")
+        return True, path
+
+    monkeypatch.setattr(main, "_download_single_video", fake_download)
+    monkeypatch.setattr(main, "update_download_status", lambda *a, **k: None)
+    # O lote repassa o seu config ao acervo
+    config = {**main.load_config(), "use_media_store": False}
+    monkeypatch.setattr(main, "load_config", lambda: config)
+
+    videos = [
+        {
+            "id": "x",
+            "title": "Faixa",
+            "url": "https://youtu.be/x",
+            "is_playlist": False,
+        },
+        *(
+            {
+                "id": "x",
+                "title": "Faixa",
+                "url": f"https://music.youtube.com/watch?v=x&list={playlist}",
+                "is_playlist": True,
+                "playlist_title": playlist,
+            }
+            for playlist in ("Rock", "Favoritas")
+        ),
+    ]
+    results = main.download_videos_parallel(
+        videos, str(tmp_path), max_workers=2, queue=DownloadQueue("fifo")
+    )
+
+    assert len(results) == 1 and results[0][1]
+    assert downloads == ["https://youtu.be/x"]
+    paths = [tmp_path / "faixa.mp3"]
+    paths += [tmp_path / playlist / "faixa.mp3" for playlist in ("Rock", "Favoritas")]
+    assert all(os.path.samefile(paths[0], path) for path in paths)
+    assert not (tmp_path / media_store.STORE_DIR_NAME).exists()
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Teste do controle de admissão por espaço em disco: estimativa por sistema
+de arquivos, reservas e downloads segurados até haver espaço
+"""
+
+import errno
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import disk_space
+import main
+import metrics
+from disk_space import DiskSpaceGuard, required_space
+from scheduler import DownloadQueue
+from staging import FREE_SPACE_MARGIN, STAGING_SIZE_FACTOR
+
+MB = 1024**2
+
+
+def fake_free_space(monkeypatch, free):
+    monkeypatch.setattr(
+        disk_space.shutil,
+        "disk_usage",
+        lambda path: SimpleNamespace(free=free + FREE_SPACE_MARGIN),
+    )
+
+
+def test_required_space(tmp_path, monkeypatch):
+    video = {"filesize_approx": 10 * MB, "duration": 100}
+    staged = {"staging_dir": str(tmp_path / "staging")}
+
+    # Estágio e biblioteca no mesmo disco: só o pico do estágio conta
+    (need,) = required_space(video, str(tmp_path), True, config=staged).values()
+    assert need == (str(tmp_path), 10 * MB * STAGING_SIZE_FACTOR)
+
+    # Em discos diferentes, o destino recebe o áudio convertido
+    devices = {str(tmp_path / "staging"): 1, str(tmp_path / "music"): 2}
+    monkeypatch.setattr(disk_space, "_device", lambda path: (devices[path], path))
+    needs = required_space(video, str(tmp_path / "music"), True, config=staged)
+    assert needs[1][1] == 10 * MB * STAGING_SIZE_FACTOR
+    assert needs[2][1] == 100 * disk_space.AUDIO_BYTES_PER_SECOND
+
+    needs = required_space(video, str(tmp_path / "music"), False, config=staged)
+    assert needs[2][1] == 10 * MB
+
+
+def test_size_from_formats():
+    video = {"vcodec": "avc1", "acodec": "none", "height": 1080, "filesize": 50 * MB}
+    too_tall = {**video, "height": 2160, "filesize": 400 * MB}
+    audio = {"vcodec": "none", "acodec": "opus", "filesize_approx": 5 * MB}
+    assert main.approximate_filesize({"formats": [video, too_tall, audio]}) == 55 * MB
+
+    combined = {"vcodec": "avc1", "acodec": "mp4a", "height": 720, "filesize": 20 * MB}
+    formats = [video, audio, combined]
+    assert main.approximate_filesize({"formats": formats}) == 20 * MB
+    assert main.approximate_filesize({"formats": []}) is None
+
+
+def test_reservations(tmp_path, monkeypatch):
+    fake_free_space(monkeypatch, 100 * MB)
+    guard = DiskSpaceGuard()
+    needs = {1: (str(tmp_path), 60 * MB)}
+
+    first = guard.reserve(needs)
+    assert first and guard.reserved_bytes() == 60 * MB
+    assert guard.reserve(needs) is None
+    guard.release(first)
+    assert guard.reserved_bytes() == 0
+    assert guard.reserve(needs)
+
+    with pytest.raises(OSError) as error:
+        DiskSpaceGuard().reserve({1: (str(tmp_path), 150 * MB)})
+    assert error.value.errno == errno.ENOSPC
+
+
+def test_downloads_wait_for_disk_space(tmp_path, monkeypatch):
+    fake_free_space(monkeypatch, 100 * MB)
+    monkeypatch.setattr(main, "get_disk_space_guard", DiskSpaceGuard)
+    errors = {}
+    monkeypatch.setattr(
+        main,
+        "update_download_status",
+        lambda url, status, error_msg=None, **kw: (
+            errors.update({url: error_msg}) if status == "failed" else None
+        ),
+    )
+
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_download(url, *args, **kwargs):
+        with lock:
+            active.append(url)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(url)
+        return True, "/tmp/fake.mp3"
+
+    monkeypatch.setattr(main, "download_single_video", fake_download)
+
+    # 30 MB cada, 90 MB no estágio: só um por vez cabe em 100 MB
+    videos = [{"title": f"v{n}", "url": f"v{n}", "filesize": 30 * MB} for n in range(3)]
+    videos.append({"title": "grande", "url": "grande", "filesize": 1024 * MB})
+    statuses = []
+    failed_before = metrics.DOWNLOADS.value(result="failed")
+    results = main.download_videos_parallel(
+        videos,
+        str(tmp_path),
+        to_mp3=False,
+        max_workers=3,
+        progress_callback=lambda url, data: statuses.append((url, data["phase"])),
+        queue=DownloadQueue("fifo"),
+    )
+
+    outcome = {video["url"]: success for video, success in results}
+    assert outcome == {"v0": True, "v1": True, "v2": True, "grande": False}
+    assert max(peak) == 1
+    assert ("v1", "disk_space") in statuses
+    assert "Espaço insuficiente" in errors["grande"]
+    assert metrics.DOWNLOADS.value(result="failed") == failed_before + 1
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Teste do motor assíncrono de extração: limites total e por host, resultados
+chegando conforme terminam e cancelamento
+"""
+
+import threading
+import time
+
+import main
+from extraction import extract_all, host_key
+
+
+class ConcurrencyProbe:
+    """Extrator falso que mede quantas chamadas rodam ao mesmo tempo"""
+
+    def __init__(self, delay=0.03):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = {}
+        self.peak_total = 0
+        self.peak_per_host = {}
+        self.calls = []
+
+    def __call__(self, url, **options):
+        host = host_key(url)
+        with self.lock:
+            self.calls.append(url)
+            self.running[host] = self.running.get(host, 0) + 1
+            self.peak_total = max(self.peak_total, sum(self.running.values()))
+            self.peak_per_host[host] = max(
+                self.peak_per_host.get(host, 0), self.running[host]
+            )
+        time.sleep(0.2 if "slow" in url else self.delay)
+        with self.lock:
+            self.running[host] -= 1
+        return [{"title": url, "url": url}]
+
+
+def test_host_key_groups_youtube_hosts():
+    assert host_key("https://youtu.be/abc") == "youtube.com"
+    assert host_key("https://www.youtube.com/watch?v=abc") == "youtube.com"
+    assert host_key("https://music.youtube.com/watch?v=abc") == "youtube.com"
+    assert host_key("https://vimeo.com/1") == "vimeo.com"
+
+
+def test_limits_and_streaming():
+    probe = ConcurrencyProbe()
+    hosts = ["a.test", "b.test", "c.test", "d.test"]
+    urls = ["http://a.test/slow"] + [
+        f"http://{hosts[number % 4]}/{number}" for number in range(60)
+    ]
+    finished = []
+
+    videos = extract_all(
+        urls,
+        probe,
+        on_result=lambda url, found: finished.append(url),
+        concurrency=5,
+        per_host=2,
+    )
+
+    assert sorted(video["url"] for video in videos) == sorted(urls)
+    assert probe.peak_total == 5
+    assert max(probe.peak_per_host.values()) == 2
+    # A URL lenta não segura as outras: elas chegam antes dela
+    assert finished.index("http://a.test/slow") > 10
+
+
+def test_cancel_skips_urls_not_started():
+    probe = ConcurrencyProbe(delay=0.05)
+    cancel_event = threading.Event()
+    urls = [f"http://host{number % 3}.test/{number}" for number in range(30)]
+
+    videos = extract_all(
+        urls,
+        probe,
+        on_result=lambda url, found: cancel_event.set(),
+        concurrency=3,
+        cancel_event=cancel_event,
+    )
+
+    assert len(probe.calls) < 10
+    assert len(videos) == len(probe.calls)
+
+
+def test_parse_urls_parallel_streams_results(monkeypatch):
+    probe = ConcurrencyProbe()
+    monkeypatch.setattr(main, "extract_video_info", probe)
+    seen = []
+
+    videos = main.parse_urls_parallel(
+        ["https://youtu.be/a", "https://vimeo.com/b"],
+        on_result=lambda url, found: seen.append((url, len(found))),
+    )
+
+    assert len(videos) == 2
+    assert sorted(seen) == [("https://vimeo.com/b", 1), ("https://youtu.be/a", 1)]
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
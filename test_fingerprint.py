@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Teste do fingerprint acústico e da detecção de duplicatas (sem ffmpeg)
+"""
+
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+import fingerprint
+import main
+from fingerprint import (
+    FP_SAMPLE_RATE,
+    FingerprintIndex,
+    bit_error_rate,
+    fingerprint_from_chunks,
+    resolve_duplicates,
+)
+
+
+def _melody(seed, seconds=30):
+    """Gera uma sequência de notas aleatórias com harmônicos"""
+    rng = np.random.default_rng(seed)
+    note_samples = FP_SAMPLE_RATE // 4
+    t = np.arange(note_samples) / FP_SAMPLE_RATE
+    notes = []
+    for _ in range(seconds * 4):
+        base = rng.uniform(300, 900)
+        note = sum(np.sin(2 * np.pi * base * h * t) / h for h in (1, 2, 3))
+        notes.append(note)
+    return np.concatenate(notes)
+
+
+def _chunks(signal, gain=1.0, noise=0.0, shift=0, seed=0):
+    """Converte o sinal em blocos int16, com ganho, ruído e deslocamento"""
+    rng = np.random.default_rng(seed)
+    signal = signal[shift:] * gain + rng.normal(0, noise, len(signal) - shift)
+    pcm = np.clip(signal * 8000, -32768, 32767).astype(np.int16)
+    for start in range(0, len(pcm), 4096):
+        yield pcm[start : start + 4096]
+
+
+def test_same_audio_matches():
+    """Re-codificações (ganho, ruído, deslocamento) têm poucos bits diferentes"""
+    original = fingerprint_from_chunks(_chunks(_melody(1)))
+    copy = fingerprint_from_chunks(_chunks(_melody(1), gain=0.6, noise=0.05))
+    other = fingerprint_from_chunks(_chunks(_melody(2)))
+
+    assert len(original) > 100
+    assert bit_error_rate(original, copy) < 0.2
+    assert bit_error_rate(original, other) > 0.35
+
+
+def test_index_query_and_duplicates():
+    """O índice encontra cópias deslocadas e agrupa as duplicatas"""
+    index = FingerprintIndex()
+    index.add("/lib/a/song.mp3", fingerprint_from_chunks(_chunks(_melody(1))), 1, 1)
+    index.add(
+        "/lib/b/song.mp3",
+        fingerprint_from_chunks(_chunks(_melody(1), noise=0.05, shift=1536)),
+        1,
+        1,
+    )
+    for seed in range(2, 6):
+        index.add(
+            f"/lib/other_{seed}.mp3",
+            fingerprint_from_chunks(_chunks(_melody(seed))),
+            1,
+            1,
+        )
+
+    query = fingerprint_from_chunks(_chunks(_melody(1), gain=0.8, seed=3))
+    matches = [path for path, _ in index.query(query)]
+    assert set(matches) == {"/lib/a/song.mp3", "/lib/b/song.mp3"}
+
+    assert index.find_duplicates() == [["/lib/a/song.mp3", "/lib/b/song.mp3"]]
+
+    index.remove("/lib/b/song.mp3")
+    assert index.find_duplicates() == []
+
+
+def test_resolve_duplicates_with_hardlinks():
+    """Duplicatas com a mesma extensão viram hardlinks da faixa mantida"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        keep = os.path.join(temp_dir, "a.mp3")
+        duplicate = os.path.join(temp_dir, "b.mp3")
+        for path, content in ((keep, b"keep"), (duplicate, b"duplicate")):
+            with open(path, "wb") as file:
+                file.write(content)
+
+        index = FingerprintIndex(os.path.join(temp_dir, "index.json"))
+        signature = fingerprint_from_chunks(_chunks(_melody(1, seconds=5)))
+        index.add(keep, signature)
+        index.add(duplicate, signature)
+
+        original_index = fingerprint._index
+        fingerprint._index = index
+        try:
+            assert resolve_duplicates([[keep, duplicate]], "hardlink") == 1
+        finally:
+            fingerprint._index = original_index
+
+        assert os.path.samefile(keep, duplicate)
+
+        reloaded = FingerprintIndex(index.index_path)
+        reloaded.load()
+        assert set(reloaded.tracks) == {keep, duplicate}
+
+
+def test_linked_playlist_copies_are_not_duplicates(tmp_path):
+    """Links do acervo nas pastas de playlist não são duplicatas"""
+    store = tmp_path / ".media_store" / "abc" / "mp3" / "song.mp3"
+    store.parent.mkdir(parents=True)
+    store.write_bytes(b"audio")
+    rock, favorites, copy = (
+        tmp_path / name / "song.mp3" for name in ("Rock", "Favoritas", "Copia")
+    )
+    for path in (rock, favorites, copy):
+        path.parent.mkdir()
+    os.link(store, rock)
+    os.symlink(store, favorites)
+    copy.write_bytes(b"audio")
+
+    index = FingerprintIndex()
+    signature = fingerprint_from_chunks(_chunks(_melody(1, seconds=5)))
+    for path in (rock, favorites):
+        index.add(str(path), signature)
+    assert index.find_duplicates() == []
+
+    index.add(str(copy), signature)
+    assert index.find_duplicates() == [[str(copy), str(favorites)]]
+
+
+def test_concurrent_saves(tmp_path):
+    """Workers gravando ao mesmo tempo não disputam o arquivo temporário"""
+    index = FingerprintIndex(str(tmp_path / "fingerprints.json"))
+    signature = fingerprint_from_chunks(_chunks(_melody(1, seconds=5)))
+    errors = []
+
+    def worker(number):
+        for round_number in range(30):
+            index.add(f"/lib/{number}_{round_number}.mp3", signature, 1, 1)
+            try:
+                index.save()
+            except OSError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert os.listdir(tmp_path) == ["fingerprints.json"]
+    reloaded = FingerprintIndex(index.index_path)
+    reloaded.load()
+    assert len(reloaded.tracks) == 120
+
+
+def test_saves_are_batched(tmp_path, monkeypatch):
+    """Várias faixas convertidas viram uma só gravação do índice"""
+    index = FingerprintIndex(str(tmp_path / "fingerprints.json"))
+    saves = []
+    monkeypatch.setattr(index, "save", lambda: saves.append(len(index.tracks)))
+    monkeypatch.setattr(fingerprint, "_index", index)
+    signature = fingerprint_from_chunks(_chunks(_melody(1, seconds=5)))
+
+    for number in range(5):
+        track = tmp_path / f"{number}.mp3"
+        track.write_bytes(b"mp3")
+        main.register_fingerprint(str(track), signature)
+    assert saves == []
+    index.flush()
+    assert saves == [5]
+    index.flush()
+    assert saves == [5]
+
+
+def test_register_fingerprint_errors_do_not_fail_download(monkeypatch):
+    def broken_index():
+        raise PermissionError("somente leitura")
+
+    monkeypatch.setattr(fingerprint, "get_fingerprint_index", broken_index)
+    main.register_fingerprint("/lib/a.mp3", np.ones(10, dtype=np.uint32))
+
+
+if __name__ == "__main__":
+    test_same_audio_matches()
+    test_index_query_and_duplicates()
+    test_resolve_duplicates_with_hardlinks()
+    print("✅ Testes de fingerprint concluídos")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Teste do histórico: vários processos escrevendo ao mesmo tempo sem perder
+alterações, e o cache em memória gravando as alterações em grupo
+"""
+
+import json
+import multiprocessing
+import os
+import time
+
+import config
+
+
+def _bump_counter(args):
+    """Worker: incrementa o contador compartilhado e registra a sua entrada"""
+    directory, worker, rounds = args
+    os.chdir(directory)
+
+    def increment(downloads):
+        downloads[0]["count"] += 1
+
+    for number in range(rounds):
+        config.modify_downloads_history(increment)
+        config.add_download_to_history(
+            f"Worker {worker} #{number}", f"https://youtu.be/w{worker}n{number}"
+        )
+    # O Pool encerra os workers sem atexit
+    config.flush_downloads_history()
+    return worker
+
+
+def _read_while_writing(args):
+    """Worker: lê o histórico durante as escritas; nunca pode vê-lo truncado"""
+    directory, rounds = args
+    os.chdir(directory)
+    for _ in range(rounds):
+        with open(config.DOWNLOADS_HISTORY_FILE, "r", encoding="utf-8") as file:
+            json.load(file)
+    return rounds
+
+
+def test_no_lost_updates_across_processes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config.save_downloads_history(
+        [{"title": "counter", "url": "counter", "status": "pending", "count": 0}]
+    )
+
+    workers, rounds = 4, 15
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers + 1) as pool:
+        reader = pool.apply_async(_read_while_writing, ((str(tmp_path), 200),))
+        finished = pool.map(
+            _bump_counter,
+            [(str(tmp_path), worker, rounds) for worker in range(workers)],
+        )
+        assert reader.get(timeout=120) == 200
+    assert sorted(finished) == list(range(workers))
+
+    downloads = config.load_downloads_history()
+    assert downloads[0]["count"] == workers * rounds
+    assert len(downloads) == 1 + workers * rounds
+    assert not os.path.exists(config.DOWNLOADS_HISTORY_FILE + ".tmp")
+
+
+def test_unchanged_history_is_not_rewritten(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config.add_download_to_history("Vídeo", "https://youtu.be/a", priority=1)
+    config.flush_downloads_history()
+    mtime = os.stat(config.DOWNLOADS_HISTORY_FILE).st_mtime_ns
+
+    config.add_download_to_history("Vídeo", "https://youtu.be/a", priority=1)
+    config.update_download_status("https://youtu.be/missing", "completed")
+    config.flush_downloads_history()
+    assert os.stat(config.DOWNLOADS_HISTORY_FILE).st_mtime_ns == mtime
+
+    assert config.set_download_priority("https://youtu.be/a", 5)
+    assert not config.set_download_priority("https://youtu.be/missing", 5)
+    assert config.load_downloads_history()[0]["priority"] == 5
+
+
+def test_group_commit(tmp_path, monkeypatch):
+    """Uma playlist grande e as atualizações seguintes viram poucas gravações"""
+    monkeypatch.chdir(tmp_path)
+    writes = []
+    write_history = config._write_history
+
+    def counting_write(downloads, path=None):
+        writes.append(len(downloads))
+        write_history(downloads, path)
+
+    monkeypatch.setattr(config, "_write_history", counting_write)
+    urls = [f"https://youtu.be/p{number}" for number in range(1000)]
+    added = config.add_downloads_to_history(
+        {"title": f"Faixa {number}", "url": url, "playlist": "Mix"}
+        for number, url in enumerate(urls)
+    )
+    for url in urls[:50]:
+        config.update_download_status(url, "downloading")
+        config.update_download_status(url, "completed", file_path="/tmp/a.mp3")
+
+    assert added == 1000
+    assert config.load_downloads_history()[0]["status"] == "completed"
+    assert writes == []  # ainda só em memória
+
+    deadline = time.monotonic() + 5
+    while not writes and time.monotonic() < deadline:
+        time.sleep(0.05)
+    config.flush_downloads_history()
+    assert writes and len(writes) <= 2 and writes[-1] == 1000
+
+    with open(config.DOWNLOADS_HISTORY_FILE, "r", encoding="utf-8") as file:
+        stored = json.load(file)
+    assert [row["url"] for row in stored] == urls
+    assert stored[49]["file_path"] == "/tmp/a.mp3"
+    assert stored[50]["status"] == "pending"
+
+
+def test_other_process_changes_are_reloaded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config.add_download_to_history("Local", "https://youtu.be/local")
+    config.flush_downloads_history()
+
+    # Outro processo grava uma entrada nova direto no arquivo
+    with open(config.DOWNLOADS_HISTORY_FILE, "r", encoding="utf-8") as file:
+        stored = json.load(file)
+    stored.append(
+        {"title": "Cron", "url": "https://youtu.be/cron", "status": "pending"}
+    )
+    config._write_history(stored)
+
+    config.update_download_status("https://youtu.be/local", "completed")
+    config.flush_downloads_history()
+    with open(config.DOWNLOADS_HISTORY_FILE, "r", encoding="utf-8") as file:
+        statuses = {row["url"]: row["status"] for row in json.load(file)}
+    assert statuses == {
+        "https://youtu.be/local": "completed",
+        "https://youtu.be/cron": "pending",
+    }
+
+
+def test_two_caches_keep_each_others_fields(tmp_path):
+    """GUI e cron com caches próprios: cada um grava só o que alterou"""
+    path = str(tmp_path / "history.json")
+    url = "https://youtu.be/shared"
+    gui = config.HistoryCache(path, flush_interval=3600)
+    gui.add_many([{"title": "Faixa", "url": url}])
+    gui.flush()
+    cron = config.HistoryCache(path, flush_interval=3600)
+    assert cron.snapshot()[0]["status"] == "pending"
+
+    gui.update_many([{"url": url, "priority": 5, "attempt": {"error": "timeout"}}])
+    cron.update_many([{"url": url, "status": "completed", "attempt": {"error": None}}])
+    cron.flush()
+    gui.flush()
+
+    with open(path, "r", encoding="utf-8") as file:
+        (row,) = json.load(file)
+    assert row["status"] == "completed" and row["priority"] == 5
+    assert len(row["attempts"]) == 2
+    assert gui.snapshot()[0]["status"] == "completed"
+
+
+def test_update_does_not_bring_back_deleted_row(tmp_path):
+    """Alteração pendente de uma entrada que outro processo apagou é descartada"""
+    path = str(tmp_path / "history.json")
+    gui = config.HistoryCache(path, flush_interval=3600)
+    gui.add_many(
+        [
+            {"title": "Feita", "url": "u1", "status": "completed"},
+            {"title": "Nova", "url": "u2"},
+        ]
+    )
+    gui.flush()
+    cron = config.HistoryCache(path, flush_interval=3600)
+    cron.snapshot()
+
+    cron.update_many([{"url": "u1", "error_message": "late"}])
+    cron.add_many([{"title": "Do cron", "url": "u3"}])
+    gui.modify(lambda rows: [row for row in rows if row["status"] != "completed"])
+    cron.flush()
+
+    with open(path, "r", encoding="utf-8") as file:
+        assert [row["url"] for row in json.load(file)] == ["u2", "u3"]
+
+    # O mesmo vale quando a cópia em memória é recarregada antes de gravar
+    cron.update_many([{"url": "u2", "error_message": "late"}])
+    gui.modify(lambda rows: [row for row in rows if row["url"] != "u2"])
+    assert [row["url"] for row in cron.snapshot()] == ["u3"]
+    assert not cron.flush()
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
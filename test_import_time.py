@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark de tempo de import (-X importtime) com orçamento por módulo
+
+Falha se o import de um módulo de entrada passar do orçamento ou se puxar
+algum módulo pesado que deveria ser carregado só no primeiro uso.
+Execute diretamente para ver o relatório com os imports mais caros.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Orçamento do import cumulativo de cada módulo de entrada (microssegundos)
+IMPORT_BUDGETS_US = {
+    "main": 150_000,
+    "gui": 400_000,
+}
+
+# Orçamento de tempo total de `python main.py --help` (segundos)
+CLI_HELP_BUDGET_S = 1.5
+
+# Módulos que não podem ser carregados na inicialização
+HEAVY_MODULES = ("yt_dlp", "pygame", "mutagen", "moviepy", "librosa", "numpy")
+
+
+def measure_import(module):
+    """Importa um módulo em um processo novo e retorna os tempos de import
+
+    Returns:
+        Dicionário {nome do módulo: tempo cumulativo em microssegundos}
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, QT_QPA_PLATFORM="offscreen"),
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def _check_module(module):
+    timings = measure_import(module)
+    loaded_heavy = [name for name in timings if name.split(".")[0] in HEAVY_MODULES]
+    assert not loaded_heavy, f"{module} carregou módulos pesados: {loaded_heavy}"
+
+    budget = IMPORT_BUDGETS_US[module]
+    assert (
+        timings[module] <= budget
+    ), f"import {module} levou {timings[module]} us (orçamento: {budget} us)"
+
+
+def test_main_import_budget():
+    """Importar main não carrega yt_dlp nem dependências de áudio"""
+    _check_module("main")
+
+
+def test_gui_import_budget():
+    """Importar a GUI não carrega o player nem o yt_dlp"""
+    _check_module("gui")
+
+
+def test_cli_help_budget():
+    """`python main.py --help` responde dentro do orçamento"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "main.py", "--help"],
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert elapsed <= CLI_HELP_BUDGET_S, f"--help levou {elapsed:.2f}s"
+
+
+if __name__ == "__main__":
+    for entry_module in IMPORT_BUDGETS_US:
+        module_timings = measure_import(entry_module)
+        print(f"\n{entry_module}: {module_timings[entry_module] / 1000:.1f} ms")
+        slowest = sorted(module_timings.items(), key=lambda item: -item[1])[:10]
+        for name, cumulative in slowest:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
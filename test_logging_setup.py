@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Teste do logging assíncrono: registros JSON no arquivo rotativo, níveis por
+módulo e escrita de log fora dos locks do histórico
+"""
+
+import json
+import logging
+import threading
+
+import pytest
+
+import config
+import logging_setup
+
+
+class BlockedHandler(logging.Handler):
+    """Handler parado (como um console ou disco travado) até unblock"""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.emitting = threading.Event()
+        self.unblock = threading.Event()
+
+    def emit(self, record):
+        self.emitting.set()
+        self.unblock.wait(10)
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture(autouse=True)
+def restore_root_level():
+    """setup_logging muda o nível do logger raiz; os outros testes não"""
+    root = logging.getLogger()
+    level = root.level
+    yield
+    root.setLevel(level)
+
+
+def test_json_file_and_levels(tmp_path):
+    log_file = tmp_path / "app.log"
+    settings = {
+        "log_file": str(log_file),
+        "log_levels": {"downloads_debug": "DEBUG", "noisy.module": "ERROR"},
+    }
+    logging_setup.setup_logging(settings, console=False)
+    try:
+        logging.getLogger("noisy.module").warning("descartado")
+        config.debug_logger.debug("detalhe", extra={"url": "https://youtu.be/x"})
+        logging.info("mensagem com acento: ação")
+    finally:
+        logging_setup.shutdown_logging()
+        logging.getLogger("downloads_debug").setLevel(logging.WARNING)
+        logging.getLogger("noisy.module").setLevel(logging.NOTSET)
+
+    records = [json.loads(line) for line in log_file.read_text("utf-8").splitlines()]
+    messages = [record["message"] for record in records]
+    assert messages == ["detalhe", "mensagem com acento: ação"]
+    assert records[0]["logger"] == "downloads_debug"
+    assert records[0]["url"] == "https://youtu.be/x"
+    assert records[1]["level"] == "INFO"
+
+
+def test_history_lock_is_not_held_during_log_io(tmp_path, monkeypatch):
+    """Com o handler travado, os registros do histórico não esperam por ele"""
+    monkeypatch.chdir(tmp_path)
+    blocked = BlockedHandler()
+    logging_setup.setup_logging(
+        {"log_file": None, "log_levels": {"downloads_debug": "DEBUG"}}, console=False
+    )
+    logging_setup._listener.handlers = (blocked,)
+    try:
+        threads = [
+            threading.Thread(
+                target=config.add_download_to_history,
+                args=(f"Vídeo {n}", f"https://youtu.be/{n}"),
+            )
+            for n in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        # Todos os registros terminaram com o primeiro emit ainda travado
+        assert blocked.emitting.wait(5)
+        assert not any(thread.is_alive() for thread in threads)
+        assert not blocked.unblock.is_set()
+    finally:
+        blocked.unblock.set()
+        logging_setup.shutdown_logging()
+        logging.getLogger("downloads_debug").setLevel(logging.WARNING)
+
+    assert sum("ADD_DOWNLOAD" in message for message in blocked.messages) == 8
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Teste do acervo de mídia: um vídeo em várias playlists é baixado uma vez e
+as outras pastas recebem links
+"""
+
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import main
+import media_store
+from media_store import MediaStore, link_file
+from music_library import scan_music_library
+from scheduler import DownloadQueue
+
+
+class CountingHandler(SimpleHTTPRequestHandler):
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        CountingHandler.requests += 1
+        super().do_GET()
+
+
+def test_link_fallbacks(tmp_path, monkeypatch):
+    source = tmp_path / "a.mp3"
+    source.write_bytes(b"audio")
+
+    assert link_file(str(source), str(tmp_path / "hard.mp3")) == "hardlink"
+    assert os.path.samefile(source, tmp_path / "hard.mp3")
+    assert link_file(str(source), str(tmp_path / "hard.mp3")) == "existing"
+
+    def no_link(*args):
+        raise OSError("Invalid cross-device link")
+
+    monkeypatch.setattr(media_store.os, "link", no_link)
+    assert link_file(str(source), str(tmp_path / "soft.mp3")) == "symlink"
+    assert os.path.islink(tmp_path / "soft.mp3")
+
+    monkeypatch.setattr(media_store.os, "symlink", no_link)
+    assert link_file(str(source), str(tmp_path / "copy.mp3")) == "copy"
+    assert (tmp_path / "copy.mp3").read_bytes() == b"audio"
+
+
+def test_links_do_not_replace_other_files(tmp_path):
+    """Outra faixa com o mesmo nome na pasta fica intacta; o link ganha sufixo"""
+    store = MediaStore(str(tmp_path / "store"))
+    published = tmp_path / "Rock" / "Intro.mp3"
+    published.parent.mkdir()
+    published.write_bytes(b"faixa do acervo")
+    key = MediaStore.key("https://example.com/v/abc", "abc")
+    store.add(key, "mp3", str(published))
+
+    other = tmp_path / "Favoritas" / "Intro.mp3"
+    other.parent.mkdir()
+    other.write_bytes(b"outra faixa")
+    try:
+        link_file(str(published), str(other))
+    except FileExistsError:
+        pass
+    else:
+        raise AssertionError("link_file sobrescreveu outro arquivo")
+
+    linked = store.materialise(key, "mp3", str(other.parent))
+    assert linked == str(other.parent / "Intro (2).mp3")
+    assert os.path.samefile(linked, published)
+    assert other.read_bytes() == b"outra faixa"
+    assert store.materialise(key, "mp3", str(published.parent)) == str(published)
+
+
+def test_same_video_in_two_playlists_is_fetched_once(tmp_path):
+    media = tmp_path / "media"
+    media.mkdir()
+    (media / "clip.mp4").write_bytes(os.urandom(4096))
+    library = tmp_path / "library"
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(CountingHandler, directory=str(media))
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    CountingHandler.requests = 0
+    url = f"http://127.0.0.1:{server.server_port}/clip.mp4"
+    try:
+        results = []
+        requests = []
+        for playlist in ("Rock", "Favoritas"):
+            video_info = {
+                "id": "clip123",
+                "title": "Clip",
+                "url": url,
+                "is_playlist": True,
+                "playlist_title": playlist,
+            }
+            started = time.perf_counter()
+            results.append(
+                main.download_single_video(url, str(library), video_info=video_info)
+            )
+            elapsed = time.perf_counter() - started
+            requests.append(CountingHandler.requests)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    (first_ok, first), (second_ok, second) = results
+    assert first_ok and second_ok
+    assert first == str(library / "Rock" / "clip.mp4")
+    assert second == str(library / "Favoritas" / "clip.mp4")
+    assert os.path.samefile(first, second)
+    # Só o primeiro job tocou o servidor; o segundo foi só o link
+    assert requests[0] > 0 and requests[1] == requests[0]
+    assert elapsed < 0.5
+
+
+def test_parallel_duplicates_wait_for_the_first_job(tmp_path, monkeypatch):
+    downloads = []
+
+    def fake_download(url, output_path, *args, video_info=None, **kwargs):
+        downloads.append(video_info["playlist_title"])
+        time.sleep(0.1)
+        folder = main.playlist_output_path(output_path, video_info)
+        path = os.path.join(folder, "song.mp3")
+        with open(path, "wb") as file:
+            file.write(b"mp3")
+        return True, path
+
+    def reload_config():
+        raise AssertionError("o acervo deve usar o config do lote")
+
+    monkeypatch.setattr(main, "_download_single_video", fake_download)
+    monkeypatch.setattr(main, "update_download_status", lambda *a, **k: None)
+    monkeypatch.setattr(media_store, "load_config", reload_config)
+
+    videos = [
+        {
+            "id": "same",
+            "title": "Song",
+            "url": f"https://youtu.be/same?list={playlist}",
+            "is_playlist": True,
+            "playlist_title": playlist,
+        }
+        for playlist in ("A", "B", "C")
+    ]
+    results = main.download_videos_parallel(
+        videos, str(tmp_path), max_workers=3, queue=DownloadQueue("fifo")
+    )
+
+    assert all(success for _, success in results)
+    assert len(downloads) == 1
+    # Os locks por vídeo somem quando o último job os solta
+    assert media_store._key_locks == {}
+    for playlist in ("A", "B", "C"):
+        assert (tmp_path / playlist / "song.mp3").read_bytes() == b"mp3"
+
+    # A biblioteca de músicas não lista as cópias do acervo
+    assert len(scan_music_library(str(tmp_path))) == 3
+    store = MediaStore(str(tmp_path / media_store.STORE_DIR_NAME))
+    key = MediaStore.key("https://www.youtube.com/watch?v=same", "same")
+    assert store.lookup(key, "mp3")
+    assert store.lookup(key, "m4a") is None
+
+
+def test_same_id_on_two_sites(tmp_path):
+    """IDs só são únicos dentro de um site: o host faz parte da chave"""
+    store = MediaStore(str(tmp_path / "store"))
+    track = tmp_path / "Rock" / "faixa.mp3"
+    track.parent.mkdir()
+    track.write_bytes(b"vimeo")
+    store.add(MediaStore.key("https://vimeo.com/12345", "12345"), "mp3", str(track))
+
+    other_site = MediaStore.key("https://www.dailymotion.com/video/12345", "12345")
+    assert store.lookup(other_site, "mp3") is None
+    assert store.lookup(MediaStore.key("https://www.vimeo.com/12345", "12345"), "mp3")
+    assert MediaStore.key("https://youtu.be/x", "x") == MediaStore.key(
+        "https://music.youtube.com/watch?v=x", "x"
+    )
+    assert store._entry_dir(("..", ".."), "mp3").startswith(store.root + os.sep)
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Teste das métricas do pipeline: formato texto do Prometheus, contadores de
+um lote com nova tentativa, fases de um download real e o /metrics do daemon
+"""
+
+import functools
+import os
+import threading
+import urllib.request
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import daemon
+import main
+import metrics
+from metrics import Counter, Histogram
+from retry import RetryPolicy
+from scheduler import DownloadQueue
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def test_text_format():
+    registry = []
+    counter = Counter("test_events_total", "Events", registry)
+    counter.inc(2, kind='say "hi"')
+    histogram = Histogram("test_seconds", "Durations", (1, 5), registry)
+    histogram.observe(3, phase="fetch")
+
+    text = "\n".join(counter.render() + histogram.render())
+    assert "# TYPE test_events_total counter" in text
+    assert 'test_events_total{kind="say \\"hi\\""} 2' in text
+    assert 'test_seconds_bucket{phase="fetch",le="1"} 0' in text
+    assert 'test_seconds_bucket{phase="fetch",le="5"} 1' in text
+    assert 'test_seconds_bucket{phase="fetch",le="+Inf"} 1' in text
+    assert 'test_seconds_count{phase="fetch"} 1' in text
+
+
+def test_batch_counters(monkeypatch):
+    """Resultados, novas tentativas e gauges voltando a zero no fim do lote"""
+    attempts = {}
+
+    def fake_download(url, *args, **kwargs):
+        attempts[url] = attempts.get(url, 0) + 1
+        if url == "flaky" and attempts[url] == 1:
+            return False, "HTTP Error 503: Service Unavailable"
+        return url != "bad", "/tmp/fake.mp3"
+
+    monkeypatch.setattr(main, "download_single_video", fake_download)
+    monkeypatch.setattr(main, "update_download_status", lambda *a, **k: None)
+
+    before = {
+        "completed": metrics.DOWNLOADS.value(result="completed"),
+        "failed": metrics.DOWNLOADS.value(result="failed"),
+        "retries": metrics.RETRIES.value(error_class="transient"),
+        "busy": metrics.WORKER_BUSY_SECONDS.value(),
+    }
+    videos = [{"title": url, "url": url} for url in ("ok", "flaky", "bad")]
+    main.download_videos_parallel(
+        videos,
+        "/tmp",
+        max_workers=2,
+        retry_policy=RetryPolicy(base_delay=0.05, jitter=0),
+        queue=DownloadQueue("fifo"),
+    )
+
+    assert metrics.DOWNLOADS.value(result="completed") == before["completed"] + 2
+    assert metrics.DOWNLOADS.value(result="failed") == before["failed"] + 1
+    assert metrics.RETRIES.value(error_class="transient") == before["retries"] + 1
+    assert metrics.WORKER_BUSY_SECONDS.value() > before["busy"]
+    for state in ("queued", "retry_wait", "active"):
+        assert metrics.JOBS.value(state=state) == 0
+    assert metrics.WORKER_SLOTS.value() == 0
+
+
+def test_download_phases_and_daemon_endpoint(tmp_path):
+    """Um download real registra bytes e fases; o daemon expõe /metrics"""
+    media = tmp_path / "media"
+    media.mkdir()
+    with open(media / "clip.mp4", "wb") as file:
+        file.write(os.urandom(8192))
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(media))
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    received = metrics.DOWNLOADED_BYTES.value()
+    fetches = metrics.PHASE_DURATION.value(phase="fetch")
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/clip.mp4"
+        success, _ = main.download_single_video(url, str(tmp_path / "out"))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert success
+    assert metrics.DOWNLOADED_BYTES.value() == received + 8192
+    assert metrics.PHASE_DURATION.value(phase="fetch") == fetches + 1
+
+    service = daemon.DownloadService(max_workers=3)
+    api = daemon.create_server(service, port=0)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    try:
+        address = f"http://127.0.0.1:{api.server_port}/metrics"
+        with urllib.request.urlopen(address, timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            text = response.read().decode("utf-8")
+    finally:
+        api.shutdown()
+        api.server_close()
+        service.shutdown()
+
+    assert "u2be_worker_slots 3" in text
+    assert 'u2be_phase_duration_seconds_count{phase="extract"}' in text
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
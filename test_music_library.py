@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Teste da biblioteca de músicas e do backend de áudio nulo (sem dispositivo)
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+from audio_backend import NullAudioBackend, create_audio_backend
+from music_library import scan_music_library
+
+
+def test_scan_music_library():
+    """A varredura encontra só arquivos de áudio, inclusive em subpastas"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        playlist_dir = os.path.join(temp_dir, "Playlist")
+        os.makedirs(playlist_dir)
+        for name in ("a.mp3", "b.M4A", "capa.jpg", "c.mp4.part"):
+            with open(os.path.join(playlist_dir, name), "wb") as file:
+                file.write(b"\0" * 16)
+
+        tracks = scan_music_library(temp_dir)
+        titles = sorted(track["title"] for track in tracks)
+        assert titles == ["a", "b"]
+        assert all(track["duration"] == 0 for track in tracks)
+
+    assert scan_music_library("/caminho/que/nao/existe") == []
+
+
+def test_null_backend_playback_state():
+    """O backend nulo acompanha o estado sem abrir dispositivo de áudio"""
+    backend = create_audio_backend("null")
+    assert isinstance(backend, NullAudioBackend)
+
+    with tempfile.NamedTemporaryFile(suffix=".mp3") as track:
+        backend.load(track.name)
+        backend.play()
+        assert backend.get_busy()
+        backend.pause()
+        assert not backend.get_busy()
+        backend.unpause()
+        backend.stop()
+        assert not backend.get_busy()
+
+
+def test_player_does_not_open_audio_device():
+    """Criar o player e varrer a biblioteca não inicializa o pygame"""
+    code = (
+        "import sys\n"
+        "from PyQt5.QtWidgets import QApplication\n"
+        "app = QApplication([])\n"
+        "from music_player import MusicPlayer\n"
+        "player = MusicPlayer('.')\n"
+        "assert player._audio is None\n"
+        "assert 'pygame' not in sys.modules\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, QT_QPA_PLATFORM="offscreen"),
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+
+if __name__ == "__main__":
+    test_scan_music_library()
+    test_null_backend_playback_state()
+    test_player_does_not_open_audio_device()
+    print("✅ Testes da biblioteca de músicas concluídos")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Teste da enumeração sob demanda de playlists e canais: nada é lido além do
+que é consumido, seleção de itens e "newest N" sem ler o canal inteiro
+"""
+
+import pytest
+from yt_dlp.extractor.common import InfoExtractor
+from yt_dlp.utils import OnDemandPagedList
+
+import logging_setup
+import main
+
+
+class FakeChannelIE(InfoExtractor):
+    """Canal sintético: "fakechannel:<tamanho>:<gerador|paginas>" """
+
+    IE_NAME = "fakechannel"
+    _VALID_URL = r"fakechannel:(?P<size>\d+):(?P<kind>\w+)"
+    produced = []
+    pages = []
+
+    def _entry(self, number):
+        FakeChannelIE.produced.append(number)
+        return self.url_result(
+            f"https://www.youtube.com/watch?v=v{number}",
+            video_id=f"v{number}",
+            video_title=f"Vídeo {number}",
+        )
+
+    def _real_extract(self, url):
+        size, kind = self._match_valid_url(url).group("size", "kind")
+        size = int(size)
+
+        if kind == "paginas":
+
+            def page(number):
+                FakeChannelIE.pages.append(number)
+                first = number * 10
+                return [self._entry(n) for n in range(first, min(first + 10, size))]
+
+            entries = OnDemandPagedList(page, 10)
+        else:
+            entries = (self._entry(number) for number in range(size))
+        return self.playlist_result(entries, "canal", "Canal Falso")
+
+
+@pytest.fixture
+def fake_channel(monkeypatch):
+    def install(ydl):
+        ie = FakeChannelIE()
+        ydl.add_info_extractor(ie)
+        ydl._ies = {ie.ie_key(): ie, **ydl._ies}
+
+    FakeChannelIE.produced = []
+    FakeChannelIE.pages = []
+    monkeypatch.setattr(main, "youtube_dl_hooks", [install])
+    config = {**main.load_config(), "reuse_youtube_dl": False}
+    monkeypatch.setattr(main, "load_config", lambda: config)
+
+
+def test_entries_are_read_on_demand(fake_channel):
+    videos = main.iter_video_info("fakechannel:100000:gerador")
+    first = [next(videos) for _ in range(3)]
+    videos.close()
+
+    assert [video["id"] for video in first] == ["v0", "v1", "v2"]
+    assert first[0]["playlist_title"] == "Canal Falso"
+    assert first[0]["url"] == "https://www.youtube.com/watch?v=v0"
+    assert len(FakeChannelIE.produced) <= 4
+
+
+def test_newest_stops_paging(fake_channel):
+    videos = main.extract_video_info("fakechannel:10000:paginas", newest=15)
+    assert [video["id"] for video in videos] == [f"v{n}" for n in range(15)]
+    assert FakeChannelIE.pages == [0, 1]
+
+
+def test_playlist_items(fake_channel):
+    videos = main.extract_video_info(
+        "fakechannel:10000:paginas", playlist_items="52-54,60"
+    )
+    assert [video["id"] for video in videos] == ["v51", "v52", "v53", "v59"]
+    # Só as páginas com os itens pedidos foram buscadas
+    assert FakeChannelIE.pages == [5]
+
+    # Índices negativos leem a playlist inteira
+    videos = main.extract_video_info("fakechannel:25:gerador", playlist_items="-2:")
+    assert [video["id"] for video in videos] == ["v23", "v24"]
+
+
+def test_invalid_playlist_items_is_a_usage_error(monkeypatch, capsys):
+    # Sem o arquivo de log do config (u2be_down.log) dentro do repositório
+    settings = {**logging_setup.load_config(), "log_file": None}
+    monkeypatch.setattr(logging_setup, "load_config", lambda: settings)
+    assert main.run_cli(["--playlist-items", "1,,2", "https://youtu.be/x"]) == 2
+    assert "--playlist-items" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
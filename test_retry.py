@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Teste da classificação de erros e do agendador de novas tentativas
+"""
+
+import main
+from retry import RetryPolicy, classify_error
+
+
+def test_classify_error():
+    """Mensagens do yt-dlp caem na classe certa"""
+    cases = {
+        "ERROR: unable to download video data: HTTP Error 503": "transient",
+        "[Errno 104] Connection reset by peer": "transient",
+        "The read operation timed out": "transient",
+        "HTTP Error 429: Too Many Requests": "throttled",
+        "Sign in to confirm you're not a bot": "throttled",
+        "ERROR: [youtube] abc: Video unavailable": "unavailable",
+        "The uploader has not made this video available in your country": "unavailable",
+        "Requested format is not available": "format",
+        "Download cancelado": "cancelled",
+        "Algo totalmente diferente": "fatal",
+    }
+    for message, expected in cases.items():
+        assert classify_error(message) == expected, message
+
+
+def test_backoff_delays():
+    """Backoff cresce exponencialmente, respeita o teto e para no limite"""
+    policy = RetryPolicy(max_attempts=4, base_delay=2, max_delay=10, jitter=0)
+    assert policy.next_delay("transient", 1) == 2
+    assert policy.next_delay("transient", 2) == 4
+    assert policy.next_delay("throttled", 1) == 8
+    assert policy.next_delay("throttled", 3) == 10
+    assert policy.next_delay("transient", 4) is None
+    assert policy.next_delay("unavailable", 1) is None
+
+    jittered = RetryPolicy(base_delay=10, jitter=0.5)
+    assert all(5 <= jittered.next_delay("transient", 1) <= 10 for _ in range(50))
+
+
+def _run_parallel(monkeypatch, outcomes, max_workers=1):
+    """Executa download_videos_parallel com respostas falsas por URL
+
+    Returns:
+        (resultados, ordem de término, tentativas registradas por URL)
+    """
+    calls = {}
+    attempts = {}
+    finished = []
+
+    def fake_download(url, *args, **kwargs):
+        calls[url] = calls.get(url, 0) + 1
+        return outcomes[url][calls[url] - 1]
+
+    def fake_status(url, status, file_path=None, error_msg=None, attempt=None):
+        if attempt:
+            attempts.setdefault(url, []).append(attempt)
+
+    monkeypatch.setattr(main, "download_single_video", fake_download)
+    monkeypatch.setattr(main, "update_download_status", fake_status)
+
+    results = main.download_videos_parallel(
+        [{"title": url, "url": url} for url in outcomes],
+        "/tmp",
+        max_workers=max_workers,
+        result_callback=lambda video, success: finished.append(video["url"]),
+        retry_policy=RetryPolicy(base_delay=0.2, jitter=0),
+    )
+    return (
+        dict((video["url"], success) for video, success in results),
+        finished,
+        attempts,
+    )
+
+
+def test_transient_errors_are_requeued(monkeypatch):
+    """Falhas passageiras voltam para a fila e o histórico guarda as tentativas"""
+    results, _, attempts = _run_parallel(
+        monkeypatch,
+        {
+            "flaky": [(False, "HTTP Error 503"), (False, "timed out"), (True, "a.mp4")],
+            "gone": [(False, "Video unavailable")],
+        },
+    )
+    assert results == {"flaky": True, "gone": False}
+    assert [record["result"] for record in attempts["flaky"]] == [
+        "transient",
+        "transient",
+        "completed",
+    ]
+    assert attempts["flaky"][0]["retry_in"] == 0.2
+    assert len(attempts["gone"]) == 1 and attempts["gone"][0]["retry_in"] is None
+
+
+def test_backoff_does_not_hold_worker(monkeypatch):
+    """Com um único worker, outro vídeo roda enquanto a nova tentativa espera"""
+    _, finished, _ = _run_parallel(
+        monkeypatch,
+        {
+            "flaky": [(False, "Connection reset by peer"), (True, "a.mp4")],
+            "steady": [(True, "b.mp4")],
+        },
+    )
+    assert finished == ["steady", "flaky"]
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Teste da fila de downloads com prioridades e das políticas de agendamento
+"""
+
+import threading
+import time
+
+import main
+from scheduler import DownloadQueue
+
+
+def video(url, duration=None, priority=0):
+    info = {"title": url, "url": url, "duration": duration}
+    if priority:
+        info["priority"] = priority
+    return info
+
+
+def drain(queue):
+    order = []
+    while len(queue):
+        video_info, _ = queue.pop()
+        order.append(video_info["url"])
+    return order
+
+
+def test_priority_and_policies():
+    """Prioridade vem antes da política; duração desconhecida vai para o fim"""
+    videos = [
+        video("a", 300),
+        video("b"),
+        video("c", 60),
+        video("d", 120, priority=1),
+    ]
+
+    fifo = DownloadQueue("fifo")
+    sjf = DownloadQueue("sjf")
+    for video_info in videos:
+        fifo.push(dict(video_info))
+        sjf.push(dict(video_info))
+
+    assert drain(fifo) == ["d", "a", "b", "c"]
+    assert drain(sjf) == ["d", "c", "a", "b"]
+    assert DownloadQueue("sjf").pop() is None
+
+
+def test_size_policy_uses_filesize():
+    queue = DownloadQueue("size")
+    queue.push({"title": "a", "url": "a", "filesize": 50 * 1024**2})
+    queue.push({"title": "b", "url": "b", "filesize_approx": 5 * 1024**2})
+    queue.push({"title": "c", "url": "c", "duration": 10})
+    queue.push({"title": "d", "url": "d"})
+    assert drain(queue) == ["c", "b", "a", "d"]
+
+
+def test_set_priority_reorders_queue():
+    queue = DownloadQueue("fifo")
+    for url in ("a", "b", "c"):
+        queue.push(video(url))
+
+    assert queue.set_priority("c", 5)
+    assert [v["url"] for v in queue.snapshot()] == ["c", "a", "b"]
+    assert queue.pop()[0]["priority"] == 5
+    assert not queue.set_priority("c", 1)
+
+
+def test_stale_heap_entries_are_skipped():
+    """Prioridade mudada e URL reenfileirada deixam versões antigas no heap"""
+    queue = DownloadQueue("sjf")
+    for url, duration in (("a", 10), ("b", 20), ("c", 30)):
+        queue.push(video(url, duration))
+
+    queue.set_priority("c", 2)
+    queue.set_priority("c", 0)
+    queue.push(video("a", 40), attempt=2)
+
+    assert drain(queue) == ["b", "c", "a"]
+    assert queue.pop() is None
+
+
+def test_large_queue_drains_fast():
+    queue = DownloadQueue("sjf")
+    for number in range(50_000):
+        queue.push(video(f"v{number}", duration=number % 977))
+    for number in range(0, 50_000, 7):
+        queue.set_priority(f"v{number}", 1)
+
+    start = time.process_time()
+    order = drain(queue)
+    assert time.process_time() - start < 5
+    promoted = len(range(0, 50_000, 7))
+    assert len(order) == 50_000
+    assert all(int(url[1:]) % 7 == 0 for url in order[:promoted])
+
+
+def run_fake_batch(monkeypatch, policy):
+    """Roda download_videos_parallel com downloads simulados pela duração"""
+    durations = {"v0": 200, "v1": 150, "v2": 20, "v3": 30, "v4": 10, "v5": 40}
+    finished = {}
+    start = time.monotonic()
+    lock = threading.Lock()
+
+    def fake_download(url, *args, **kwargs):
+        time.sleep(durations[url] / 1000)
+        with lock:
+            finished[url] = time.monotonic() - start
+        return True, "/tmp/fake.mp3"
+
+    monkeypatch.setattr(main, "download_single_video", fake_download)
+    monkeypatch.setattr(main, "update_download_status", lambda *a, **k: None)
+
+    videos = [video(url, duration) for url, duration in durations.items()]
+    main.download_videos_parallel(
+        videos, "/tmp", max_workers=1, queue=DownloadQueue(policy)
+    )
+    return sum(finished.values()) / len(finished)
+
+
+def test_sjf_lowers_mean_completion_time(monkeypatch):
+    fifo = run_fake_batch(monkeypatch, "fifo")
+    sjf = run_fake_batch(monkeypatch, "sjf")
+    assert sjf < fifo * 0.6
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Teste do diretório de estágio: movimento atômico para a biblioteca, cópia
+entre sistemas de arquivos e download real via servidor HTTP local
+"""
+
+import errno
+import functools
+import os
+import threading
+from collections import namedtuple
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import main
+import staging
+from staging import StagingArea, move_into_library
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _write(path, size=1024):
+    with open(path, "wb") as file:
+        file.write(os.urandom(size))
+
+
+def _cross_device(monkeypatch, directory):
+    """Simula directory em outro sistema de arquivos: link/rename dão EXDEV
+
+    Returns:
+        Lista com o nome da pasta de origem de cada link/rename que passou
+    """
+    moves = []
+
+    def patched(real):
+        def move(src, dst):
+            if os.path.dirname(src) == str(directory):
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            moves.append(os.path.basename(os.path.dirname(src)))
+            return real(src, dst)
+
+        return move
+
+    monkeypatch.setattr(staging.os, "replace", patched(os.replace))
+    monkeypatch.setattr(staging.os, "link", patched(os.link))
+    return moves
+
+
+def test_move_across_filesystems(tmp_path, monkeypatch):
+    """Com EXDEV o arquivo é copiado para um nome oculto e renomeado"""
+    source = tmp_path / "stage" / "song.mp3"
+    source.parent.mkdir()
+    _write(source)
+    library = tmp_path / "library"
+    moves = _cross_device(monkeypatch, source.parent)
+
+    final_path = move_into_library(str(source), str(library))
+
+    assert final_path == str(library / "song.mp3")
+    assert not source.exists()
+    assert moves and moves[0].startswith(".song.mp3.")
+    assert os.listdir(library) == ["song.mp3"]
+
+
+def test_existing_files_are_not_overwritten(tmp_path, monkeypatch):
+    """Outro vídeo com o mesmo título ganha sufixo; o mesmo arquivo é mantido"""
+    library = tmp_path / "library"
+    library.mkdir()
+    (library / "Intro.mp3").write_bytes(b"primeiro")
+
+    for number, cross_device in enumerate((False, True)):
+        stage = tmp_path / f"stage{number}"
+        stage.mkdir()
+        if cross_device:
+            _cross_device(monkeypatch, stage)
+        (stage / "Intro.mp3").write_bytes(b"segundo")
+        final_path = move_into_library(str(stage / "Intro.mp3"), str(library))
+
+        assert final_path == str(library / "Intro (2).mp3")
+        assert (library / "Intro.mp3").read_bytes() == b"primeiro"
+        assert not (stage / "Intro.mp3").exists()
+
+    assert sorted(os.listdir(library)) == ["Intro (2).mp3", "Intro.mp3"]
+
+
+def test_free_space_is_checked(tmp_path, monkeypatch):
+    source = tmp_path / "song.mp3"
+    _write(source)
+    Usage = namedtuple("Usage", "total used free")
+    monkeypatch.setattr(staging.shutil, "disk_usage", lambda path: Usage(0, 0, 10))
+    _cross_device(monkeypatch, tmp_path)
+
+    with pytest.raises(OSError) as error:
+        move_into_library(str(source), str(tmp_path / "library"))
+    assert error.value.errno == errno.ENOSPC
+    assert source.exists()
+
+    # Sem espaço no estágio, o download vai direto para o destino
+    area = StagingArea("u", str(tmp_path), 10**9, {"staging_dir": str(tmp_path / "s")})
+    assert not area.staged and area.path == str(tmp_path)
+
+
+def test_download_goes_through_staging(tmp_path, monkeypatch):
+    """O arquivo só aparece na biblioteca pronto e o estágio é limpo"""
+    media = tmp_path / "media"
+    media.mkdir()
+    _write(media / "clip.mp4", 4096)
+    stage_root = tmp_path / "stage"
+    library = tmp_path / "library"
+    library.mkdir()
+
+    config = {**main.load_config(), "staging_dir": str(stage_root)}
+    monkeypatch.setattr(staging, "load_config", lambda: config)
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(media))
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    seen_in_library = []
+
+    def progress(data):
+        seen_in_library.extend(os.listdir(library))
+
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/clip.mp4"
+        success, path = main.download_single_video(
+            url, str(library), progress_callback=progress
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert success
+    assert path == str(library / "clip.mp4")
+    assert os.path.getsize(path) == 4096
+    assert not seen_in_library
+    assert os.listdir(stage_root) == []
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Teste do trace no formato do Chrome/Perfetto: spans por job e por fase,
+espera pelo history_lock e o arquivo gravado
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import main
+import tracing
+from scheduler import DownloadQueue
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def fresh_tracer(monkeypatch):
+    tracer = tracing.Tracer()
+    tracer.enable()
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    return tracer
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = tracing.Tracer()
+    with tracer.span("parse"):
+        pass
+    tracer.add_span("fetch", 0, 1)
+    assert tracer.events == []
+
+
+def test_jobs_and_lock_wait(monkeypatch, tmp_path):
+    """Cada worker vira uma linha do tempo com seus jobs e esperas de lock"""
+    tracer = fresh_tracer(monkeypatch)
+
+    def fake_download(url, *args, **kwargs):
+        time.sleep(0.05)
+        return True, "/tmp/fake.mp3"
+
+    def slow_status(*args, **kwargs):
+        time.sleep(0.01)
+
+    monkeypatch.setattr(main, "download_single_video", fake_download)
+    monkeypatch.setattr(main, "update_download_status", slow_status)
+
+    videos = [{"title": f"v{n}", "url": f"v{n}"} for n in range(4)]
+    main.download_videos_parallel(
+        videos, "/tmp", max_workers=2, queue=DownloadQueue("fifo")
+    )
+
+    trace_path = tmp_path / "trace.json"
+    tracer.save(str(trace_path))
+    with open(trace_path, encoding="utf-8") as file:
+        events = json.load(file)["traceEvents"]
+
+    jobs = [e for e in events if e["name"] == "download"]
+    assert sorted(e["args"]["url"] for e in jobs) == [f"v{n}" for n in range(4)]
+    assert len({e["tid"] for e in jobs}) == 2
+    assert all(e["ph"] == "X" and e["dur"] >= 50000 for e in jobs)
+
+    waits = [e for e in events if e["name"] == "history_lock (espera)"]
+    held = [e for e in events if e["name"] == "history_lock"]
+    assert len(waits) == len(held) == 8
+    threads = {e["tid"] for e in events if e["ph"] == "M"}
+    assert {e["tid"] for e in jobs} <= threads
+
+
+def test_download_phases_are_traced(monkeypatch, tmp_path):
+    tracer = fresh_tracer(monkeypatch)
+    media = tmp_path / "media"
+    media.mkdir()
+    with open(media / "clip.mp4", "wb") as file:
+        file.write(os.urandom(4096))
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(media))
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/clip.mp4"
+        success, _ = main.download_single_video(url, str(tmp_path / "out"))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert success
+    phases = [e["name"] for e in tracer.events if e["cat"] == "phase"]
+    assert phases == ["extract", "fetch", "merge", "publish"]
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
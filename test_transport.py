@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Teste das opções de transporte (fragmentos, blocos, aria2c) e dos cenários
+do benchmark, pelas requisições que chegam a um servidor local
+"""
+
+import functools
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import bench_transport
+import transport
+from transport import transport_options
+
+
+def test_transport_options(monkeypatch):
+    """O config vira opções do yt-dlp e o aria2c só atende HTTP simples"""
+    monkeypatch.setattr(transport.shutil, "which", lambda name: "/usr/bin/aria2c")
+    config = {
+        "concurrent_fragment_downloads": 4,
+        "http_chunk_size": "10M",
+        "external_downloader": "auto",
+        "aria2c_connections": 6,
+    }
+
+    options = transport_options(config)
+    assert options["concurrent_fragment_downloads"] == 4
+    assert options["http_chunk_size"] == 10 * 1024**2
+    assert options["external_downloader"] == {"default": "native", "http": "aria2c"}
+    assert options["external_downloader_args"]["aria2c"][:2] == ["-x", "6"]
+
+    # Com limite de banda, o downloader nativo é mantido
+    assert "external_downloader" not in transport_options(config, rate_limited=True)
+
+    monkeypatch.setattr(transport.shutil, "which", lambda name: None)
+    assert "external_downloader" not in transport_options(config)
+    assert transport_options({"concurrent_fragment_downloads": 1}) == {}
+
+
+class RecordingHandler(bench_transport.ThrottledRequestHandler):
+    """Sem limite de velocidade; anota as requisições e os fragmentos abertos
+
+    Com all_open, cada fragmento espera até "fragments" deles estarem
+    abertos ao mesmo tempo, o que só acontece se forem baixados em paralelo.
+    """
+
+    rate = burst = 1 << 40
+    lock = threading.Lock()
+    requests = []
+    active = peak = 0
+    fragments = 1
+    all_open = None
+
+    def send_head(self):
+        with self.lock:
+            RecordingHandler.requests.append((self.path, self.headers.get("Range")))
+        return super().send_head()
+
+    def copyfile(self, source, outputfile):
+        if not self.path.endswith(".ts"):
+            return super().copyfile(source, outputfile)
+        cls = RecordingHandler
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+            if cls.all_open is not None and cls.active >= cls.fragments:
+                cls.all_open.set()
+        try:
+            if cls.all_open is not None:
+                cls.all_open.wait(5)
+            super().copyfile(source, outputfile)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+
+@pytest.fixture
+def bench_server(tmp_path):
+    """Mídia do benchmark num servidor local; retorna a função de download"""
+    media = tmp_path / "media"
+    media.mkdir()
+    bench_transport.create_media(str(media), 256 * 1024, 4, 32 * 1024)
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(RecordingHandler, directory=str(media))
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    options = {name: opts for _, name, opts in bench_transport.scenarios("64K", 4)}
+
+    def download(path, scenario, fragments=1):
+        RecordingHandler.requests = []
+        RecordingHandler.active = RecordingHandler.peak = 0
+        RecordingHandler.fragments = fragments
+        RecordingHandler.all_open = threading.Event() if fragments > 1 else None
+        bench_transport.timed_download(
+            f"http://127.0.0.1:{server.server_port}/{path}",
+            str(tmp_path / "out"),
+            options[scenario],
+        )
+        return [
+            rng for request, rng in RecordingHandler.requests if request == "/" + path
+        ]
+
+    yield download
+    server.shutdown()
+    server.server_close()
+
+
+def test_chunked_download_uses_ranged_requests(bench_server):
+    """Com http_chunk_size, o arquivo vem em requisições Range de ~64K"""
+    assert not any(bench_server("progressive.mp4", "conexão única"))
+
+    ranges = [
+        tuple(map(int, rng[len("bytes=") :].split("-")))
+        for rng in bench_server("progressive.mp4", "blocos de 64K")
+        if rng
+    ]
+    assert len(ranges) > 1
+    # O yt-dlp varia o tamanho de cada bloco em ±5%
+    assert all(end - start + 1 <= 64 * 1024 * 1.05 for start, end in ranges)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 256 * 1024 - 1
+    assert all(
+        start == previous_end + 1
+        for (_, previous_end), (start, _) in zip(ranges, ranges[1:])
+    )
+
+
+def test_fragments_are_fetched_in_parallel(bench_server):
+    """concurrent_fragment_downloads abre vários fragmentos de uma vez"""
+    bench_server("stream.m3u8", "fragmentos sequenciais")
+    assert RecordingHandler.peak == 1
+
+    bench_server("stream.m3u8", "4 fragmentos em paralelo", fragments=4)
+    assert RecordingHandler.peak == 4
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Teste do VideoInfo: compatível com o dict de antes, textos da playlist
+internados e histórico compartilhando as strings repetidas
+"""
+
+import json
+
+import pytest
+
+import config
+from scheduler import DownloadQueue
+from video_info import VideoInfo
+
+
+def playlist_video(number):
+    # Cada entrada com suas próprias strings, como vêm do JSON do yt-dlp
+    return {
+        "id": f"v{number}",
+        "title": f"Video {number}",
+        "url": f"https://www.youtube.com/watch?v=v{number}",
+        "duration": 60,
+        "uploader": "".join(["Canal", " X"]),
+        "playlist_title": "".join(["Minha", " Playlist"]),
+        "is_playlist": True,
+    }
+
+
+def test_behaves_like_dict():
+    video = VideoInfo.from_dict({**playlist_video(1), "filesize": 1000})
+
+    assert video["title"] == "Video 1"
+    assert video.get("playlist_uploader") is None
+    assert video.get("missing", "padrão") == "padrão"
+    assert "filesize" in video and "priority" not in video
+    with pytest.raises(KeyError):
+        video["playlist_uploader"]
+
+    video["priority"] = 5
+    assert video["priority"] == 5
+    assert video == {**playlist_video(1), "filesize": 1000, "priority": 5}
+    assert json.loads(json.dumps(dict(video)))["priority"] == 5
+    assert VideoInfo.from_dict(video) is video
+
+
+def test_playlist_metadata_is_shared():
+    videos = [VideoInfo.from_dict(playlist_video(n)) for n in range(3)]
+
+    assert videos[0].playlist_title is videos[2].playlist_title
+    assert videos[0].uploader is videos[1].uploader
+    assert not hasattr(videos[0], "__dict__")
+
+
+def test_queue_priority_on_video_info():
+    queue = DownloadQueue("fifo")
+    videos = [VideoInfo.from_dict(playlist_video(n)) for n in range(2)]
+    for video in videos:
+        queue.push(video)
+
+    assert queue.set_priority(videos[1]["url"], 10)
+    assert queue.pop()[0] is videos[1]
+    assert videos[1]["priority"] == 10
+
+
+def test_history_interns_repeated_values(tmp_path):
+    path = tmp_path / "history.json"
+    rows = [
+        {"title": f"T{n}", "url": f"u{n}", "status": "".join(["pend", "ing"])}
+        for n in range(3)
+    ]
+    path.write_text(json.dumps(rows), encoding="utf-8")
+
+    cache = config.HistoryCache(str(path))
+    downloads = cache.snapshot()
+    cache.add_many(
+        [{**playlist_video(n), "status": "".join(["pend", "ing"])} for n in range(2)]
+    )
+
+    statuses = [row["status"] for row in cache.downloads]
+    assert len(downloads) == 3
+    assert all(status is statuses[0] for status in statuses)
+    assert cache.index["https://www.youtube.com/watch?v=v1"]["playlist_title"] is (
+        cache.index["https://www.youtube.com/watch?v=v0"]["playlist_title"]
+    )
+    cache.flush()
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Teste da lista de observação: só vídeos novos são enviados (também depois
+de limpar o histórico), consultas espaçadas, pausa na bateria e detecção da
+fonte de energia
+"""
+
+import time
+
+import pytest
+
+import watcher
+from video_info import VideoInfo
+
+
+def fake_playlist(monkeypatch, contents, history=()):
+    """Playlists sintéticas (url -> ids) e um histórico com as URLs dadas"""
+    polls = []
+
+    def extract(url, newest=None):
+        polls.append((url, time.time()))
+        return [
+            VideoInfo(
+                id=video_id,
+                title=video_id,
+                url=f"https://www.youtube.com/watch?v={video_id}",
+                is_playlist=True,
+                playlist_title=url,
+            )
+            for video_id in contents[url][:newest]
+        ]
+
+    monkeypatch.setattr(watcher, "extract_video_info", extract)
+    monkeypatch.setattr(
+        watcher, "load_downloads_history", lambda: [{"url": url} for url in history]
+    )
+    return polls
+
+
+def make_watcher(sources, submitted, **options):
+    config = {
+        "watch_list": sources,
+        "watch_stagger": 0.05,
+        "watch_state_file": None,
+        **options,
+    }
+    return watcher.PlaylistWatcher(
+        lambda videos, source: submitted.append([video["id"] for video in videos]),
+        config,
+    )
+
+
+def test_parse_interval():
+    assert watcher.parse_interval("30m") == 1800
+    assert watcher.parse_interval("6h") == 6 * 3600
+    assert watcher.parse_interval(90) == 90
+    with pytest.raises(ValueError):
+        watcher.parse_interval("toda hora")
+
+
+def test_only_new_videos_are_submitted(monkeypatch):
+    contents = {"lista": ["a", "b"]}
+    fake_playlist(monkeypatch, contents, history=["https://youtu.be/a"])
+    submitted = []
+    playlist_watcher = make_watcher(["lista"], submitted)
+    source = playlist_watcher.sources[0]
+
+    playlist_watcher.poll(source)
+    playlist_watcher.poll(source)
+    contents["lista"].append("c")
+    playlist_watcher.poll(source)
+
+    assert submitted == [["b"], ["c"]]
+    assert source["new_videos"] == 2
+
+
+def test_seen_videos_survive_cleared_history(tmp_path, monkeypatch):
+    """Com o histórico limpo e o daemon reiniciado, nada é baixado de novo"""
+    contents = {"lista": ["a", "b"]}
+    fake_playlist(monkeypatch, contents, history=["https://youtu.be/a"])
+    state_file = str(tmp_path / "watch_state.json")
+    submitted = []
+    first = make_watcher(["lista"], submitted, watch_state_file=state_file)
+    first.poll(first.sources[0])
+    fake_playlist(monkeypatch, contents)
+    contents["lista"].append("c")
+    restarted = make_watcher(["lista"], submitted, watch_state_file=state_file)
+    restarted.poll(restarted.sources[0])
+
+    assert submitted == [["b"], ["c"]]
+
+
+def test_failed_submit_keeps_videos_new(tmp_path, monkeypatch):
+    """Se submit falha, os vídeos não são marcados como vistos"""
+    fake_playlist(monkeypatch, {"lista": ["a", "b"]})
+    state_file = tmp_path / "watch_state.json"
+    submitted = []
+
+    def submit(videos, source):
+        if not submitted:
+            submitted.append(None)
+            raise RuntimeError("fila indisponível")
+        submitted.append([video["id"] for video in videos])
+
+    playlist_watcher = watcher.PlaylistWatcher(
+        submit, {"watch_list": ["lista"], "watch_state_file": str(state_file)}
+    )
+    source = playlist_watcher.sources[0]
+    with pytest.raises(RuntimeError):
+        playlist_watcher.poll(source)
+    assert not state_file.exists() and source["new_videos"] == 0
+
+    playlist_watcher.poll(source)
+    assert submitted == [None, ["a", "b"]]
+
+
+def test_polls_read_one_page_by_default(monkeypatch):
+    contents = {"canal": [str(number) for number in range(500)], "tudo": ["x"]}
+    fake_playlist(monkeypatch, contents)
+    playlist_watcher = make_watcher(
+        ["canal", {"url": "tudo", "newest": 0}], [], watch_newest=20
+    )
+    channel, everything = playlist_watcher.sources
+
+    assert len(playlist_watcher.poll(channel)) == 20
+    assert everything["newest"] is None
+    assert make_watcher(["canal"], []).sources[0]["newest"] == 100
+
+
+def test_polls_are_staggered(monkeypatch):
+    polls = fake_playlist(monkeypatch, {"a": [], "b": [], "c": []})
+    monkeypatch.setattr(watcher, "on_battery", lambda: False)
+    monkeypatch.setattr(watcher, "on_metered_connection", lambda: False)
+    playlist_watcher = make_watcher(
+        [{"url": "a", "interval": 0.01}, "b", "c"], [], watch_interval=3600
+    )
+
+    playlist_watcher.start()
+    time.sleep(0.4)
+    playlist_watcher.stop()
+
+    urls = [url for url, _ in polls]
+    # A fonte de intervalo curto volta, mas não impede as outras
+    assert urls.count("a") > 1 and urls.count("b") == urls.count("c") == 1
+    gaps = [later - earlier for (_, earlier), (_, later) in zip(polls, polls[1:])]
+    assert min(gaps) >= 0.045
+
+
+def test_paused_on_battery(monkeypatch):
+    polls = fake_playlist(monkeypatch, {"a": ["x"]})
+    battery = [True]
+    monkeypatch.setattr(watcher, "on_battery", lambda: battery[0])
+    monkeypatch.setattr(watcher, "on_metered_connection", lambda: False)
+    monkeypatch.setattr(watcher, "PAUSE_RECHECK_INTERVAL", 0.05)
+    submitted = []
+    playlist_watcher = make_watcher(["a"], submitted)
+
+    playlist_watcher.start()
+    time.sleep(0.2)
+    assert polls == [] and playlist_watcher.status()["paused"] == "na bateria"
+    battery[0] = False
+    time.sleep(0.2)
+    playlist_watcher.stop()
+
+    assert submitted == [["x"]]
+    assert playlist_watcher.status()["paused"] is None
+
+
+def test_battery_from_power_supply(tmp_path, monkeypatch):
+    monkeypatch.setattr(watcher.sys, "platform", "linux")
+
+    def supply(name, kind, online=None, scope=None):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "type").write_text(kind + "\n")
+        if online is not None:
+            (tmp_path / name / "online").write_text(online + "\n")
+        if scope is not None:
+            (tmp_path / name / "scope").write_text(scope + "\n")
+
+    assert not watcher.on_battery(str(tmp_path))
+    # Desktop sem fonte Mains, com um mouse sem fio: não está na bateria
+    supply("hid-00:11:22:33:44:55-battery", "Battery", scope="Device")
+    supply("ucsi-source-psy-USBC000:001", "USB", "0")
+    assert not watcher.on_battery(str(tmp_path))
+    supply("BAT0", "Battery")
+    supply("AC", "Mains", "0")
+    assert watcher.on_battery(str(tmp_path))
+    (tmp_path / "AC" / "online").write_text("1\n")
+    assert not watcher.on_battery(str(tmp_path))
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
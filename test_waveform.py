@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Teste do cálculo e do cache de picos do waveform (não precisa de ffmpeg)
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from waveform import (
+    compute_peaks_from_chunks,
+    get_cached_peaks,
+    load_peaks,
+    peaks_cache_path,
+    save_peaks,
+)
+
+
+def _sine_chunks(seconds=3, sample_rate=8000, chunk_samples=1000):
+    """Gera blocos PCM int16 de uma senoide com amplitude crescente"""
+    total = seconds * sample_rate
+    t = np.arange(total) / sample_rate
+    envelope = np.linspace(0.1, 1.0, total)
+    signal = (np.sin(2 * np.pi * 440 * t) * envelope * 32000).astype(np.int16)
+    for start in range(0, total, chunk_samples):
+        yield signal[start : start + chunk_samples]
+
+
+def test_compute_peaks_from_chunks():
+    """Os picos respeitam a resolução pedida e acompanham a amplitude"""
+    mins, maxs = compute_peaks_from_chunks(_sine_chunks(), num_peaks=100)
+
+    assert len(mins) == len(maxs) == 100
+    assert mins.dtype == np.int8 and maxs.dtype == np.int8
+    assert (mins <= maxs).all()
+    # Amplitude crescente: o fim do waveform é maior que o início
+    assert maxs[-1] > maxs[0]
+    assert mins[-1] < mins[0]
+
+
+def test_compute_peaks_short_input():
+    """Entradas curtas geram menos picos e entrada vazia não gera nenhum"""
+    mins, maxs = compute_peaks_from_chunks(_sine_chunks(seconds=1), num_peaks=5000)
+    assert len(mins) == 100
+
+    mins, maxs = compute_peaks_from_chunks(iter([]), num_peaks=100)
+    assert len(mins) == 0 and len(maxs) == 0
+
+
+def test_save_and_load_peaks():
+    """O arquivo binário preserva os picos"""
+    mins, maxs = compute_peaks_from_chunks(_sine_chunks(), num_peaks=64)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "track.peaks")
+        save_peaks(path, mins, maxs)
+
+        loaded = load_peaks(path)
+        assert loaded is not None
+        assert (loaded[0] == mins).all() and (loaded[1] == maxs).all()
+        assert os.path.getsize(path) < 64 * 2 + 16
+
+        with open(path, "wb") as file:
+            file.write(b"lixo")
+        assert load_peaks(path) is None
+
+
+def test_cache_invalidated_when_file_changes():
+    """Um arquivo de áudio modificado não reutiliza o cache antigo"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        audio_path = os.path.join(temp_dir, "song.mp3")
+        with open(audio_path, "wb") as file:
+            file.write(b"a" * 10)
+
+        mins, maxs = compute_peaks_from_chunks(_sine_chunks(), num_peaks=10)
+        save_peaks(peaks_cache_path(audio_path, temp_dir), mins, maxs)
+        assert get_cached_peaks(audio_path, temp_dir) is not None
+
+        with open(audio_path, "wb") as file:
+            file.write(b"b" * 20)
+        assert get_cached_peaks(audio_path, temp_dir) is None
+
+
+if __name__ == "__main__":
+    test_compute_peaks_from_chunks()
+    test_compute_peaks_short_input()
+    test_save_and_load_peaks()
+    test_cache_invalidated_when_file_changes()
+    print("✅ Testes de waveform concluídos")
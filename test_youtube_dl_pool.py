@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Teste do reaproveitamento de YoutubeDL por thread (servidor HTTP local)
+"""
+
+import concurrent.futures
+import functools
+import logging
+import os
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import youtube_dl_pool
+from main import create_youtube_dl
+from youtube_dl_pool import close_thread_instances, reused_youtube_dl
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(directory):
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_instance_is_reconfigured_per_job():
+    """A mesma instância atende jobs com outtmpl, hooks e archive próprios"""
+    created = []
+
+    def factory(ydl_opts):
+        created.append(ydl_opts)
+        return create_youtube_dl(ydl_opts)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        media = os.path.join(temp_dir, "media")
+        os.makedirs(media)
+        for name in ("a", "b"):
+            with open(os.path.join(media, f"{name}.mp4"), "wb") as file:
+                file.write(os.urandom(2048))
+
+        server = _serve(media)
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        archive = os.path.join(temp_dir, "archive.txt")
+        hooks = {"a": [], "b": []}
+        instances = []
+
+        try:
+            for name in ("a", "b", "a"):
+                ydl_opts = {
+                    "quiet": True,
+                    "outtmpl": os.path.join(temp_dir, name, "%(title)s.%(ext)s"),
+                    "progress_hooks": [hooks[name].append],
+                    "download_archive": archive,
+                }
+                with reused_youtube_dl(ydl_opts, factory) as ydl:
+                    instances.append(ydl)
+                    ydl.extract_info(f"{base_url}/{name}.mp4", download=True)
+        finally:
+            server.shutdown()
+            server.server_close()
+            close_thread_instances()
+
+        assert len(created) == 1
+        assert instances[0] is instances[1] is instances[2]
+        assert os.path.exists(os.path.join(temp_dir, "a", "a.mp4"))
+        assert os.path.exists(os.path.join(temp_dir, "b", "b.mp4"))
+
+        # Cada job chamou só os próprios hooks; o terceiro foi pulado pelo archive
+        assert {hook["filename"] for hook in hooks["b"]} == {
+            os.path.join(temp_dir, "b", "b.mp4")
+        }
+        assert sum(hook["status"] == "finished" for hook in hooks["a"]) == 1
+
+
+def test_profiles_and_errors_use_separate_instances():
+    """Perfis diferentes não compartilham instância e erros a descartam"""
+    created = []
+
+    def factory(ydl_opts):
+        created.append(ydl_opts)
+        return create_youtube_dl(ydl_opts)
+
+    with reused_youtube_dl({"quiet": True}, factory):
+        pass
+    with reused_youtube_dl({"quiet": True, "extract_flat": True}, factory):
+        pass
+    try:
+        with reused_youtube_dl({"quiet": True}, factory):
+            raise RuntimeError("falha no job")
+    except RuntimeError:
+        pass
+    with reused_youtube_dl({"quiet": True}, factory):
+        pass
+    close_thread_instances()
+
+    assert len(created) == 3
+
+
+def test_unsupported_yt_dlp_falls_back_to_new_instances(monkeypatch, caplog):
+    """Sem os atributos internos esperados, cada job ganha um YoutubeDL novo"""
+    created = []
+
+    def factory(ydl_opts):
+        ydl = create_youtube_dl(ydl_opts)
+        created.append(ydl)
+        return ydl
+
+    def apply_job_options(ydl, ydl_opts):
+        raise AttributeError("'YoutubeDL' object has no attribute '_parse_outtmpl'")
+
+    monkeypatch.setattr(youtube_dl_pool, "_apply_job_options", apply_job_options)
+    monkeypatch.setattr(youtube_dl_pool, "_reset_failure_logged", False)
+    with caplog.at_level(logging.WARNING):
+        for _ in range(3):
+            with reused_youtube_dl({"quiet": True}, factory):
+                pass
+    close_thread_instances()
+
+    assert len(created) == len(set(created)) == 3
+    assert len([r for r in caplog.records if "yt-dlp" in r.getMessage()]) == 1
+
+
+def test_threads_do_not_share_instances():
+    """Cada worker tem as suas próprias instâncias"""
+    seen = []
+
+    def worker():
+        with reused_youtube_dl({"quiet": True}, create_youtube_dl) as ydl:
+            seen.append(ydl)
+        close_thread_instances()
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen[0] is not seen[1]
+
+
+def test_instances_are_closed_when_the_worker_ends():
+    """Um executor por lote: as instâncias fecham junto com as suas threads"""
+    closed = []
+
+    def factory(ydl_opts):
+        ydl = create_youtube_dl(ydl_opts)
+        close = ydl.close
+        ydl.close = lambda: (closed.append(ydl), close())
+        return ydl
+
+    def job():
+        with reused_youtube_dl({"quiet": True}, factory) as ydl:
+            return ydl
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        used = {future.result() for future in [executor.submit(job) for _ in range(4)]}
+    assert closed and set(closed) == used
+
+
+if __name__ == "__main__":
+    test_instance_is_reconfigured_per_job()
+    test_profiles_and_errors_use_separate_instances()
+    test_threads_do_not_share_instances()
+    test_instances_are_closed_when_the_worker_ends()
+    print("✅ Testes do reaproveitamento de YoutubeDL concluídos")
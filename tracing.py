@@ -0,0 +1,133 @@
+import atexit
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+# Limite de eventos guardados em memória (os excedentes são descartados)
+MAX_EVENTS = 500000
+
+
+class Tracer:
+    """Coleta spans no formato de trace do Chrome/Perfetto
+
+    Desligado por padrão: enquanto enabled for False, span() e add_span()
+    retornam sem registrar nada. Cada thread vira uma linha do tempo, então
+    a sobreposição dos workers e as esperas aparecem lado a lado.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.events = []
+        self.thread_names = {}
+        self.dropped = 0
+        self.origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def add_span(self, name, start, end, category="job", **args):
+        """Registra um span já medido (instantes de time.perf_counter())"""
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self.origin) * 1e6, 1),
+            "dur": round(max(end - start, 0) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        with self.lock:
+            self.thread_names.setdefault(thread.ident, thread.name)
+            if len(self.events) >= MAX_EVENTS:
+                self.dropped += 1
+                return
+            self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name, category="job", **args):
+        """Context manager que registra a duração do bloco como um span"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.perf_counter(), category, **args)
+
+    def to_dict(self):
+        pid = os.getpid()
+        with self.lock:
+            metadata = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+                for tid, name in self.thread_names.items()
+            ]
+            return {
+                "traceEvents": metadata + list(self.events),
+                "displayTimeUnit": "ms",
+                "otherData": {"dropped_events": self.dropped},
+            }
+
+    def save(self, path):
+        """Grava o trace (abra em chrome://tracing ou ui.perfetto.dev)"""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file)
+        logging.info(f"🧭 Trace gravado em {path} ({len(self.events)} spans)")
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def enable_tracing(path):
+    """Liga o tracing e grava o arquivo quando o processo terminar"""
+    if _tracer.enabled:
+        return _tracer
+    _tracer.enable()
+    atexit.register(_save_quietly, path)
+    logging.info(f"🧭 Tracing ligado, o trace será gravado em {path}")
+    return _tracer
+
+
+def _save_quietly(path):
+    try:
+        _tracer.save(path)
+    except OSError as e:
+        logging.error(f"Erro ao gravar trace em {path}: {e}")
+
+
+@contextlib.contextmanager
+def traced_lock(lock, name):
+    """Adquire lock registrando o tempo de espera e o tempo com ele"""
+    if not _tracer.enabled:
+        with lock:
+            yield
+        return
+
+    requested = time.perf_counter()
+    with lock:
+        acquired = time.perf_counter()
+        try:
+            yield
+        finally:
+            released = time.perf_counter()
+            _tracer.add_span(f"{name} (espera)", requested, acquired, "lock")
+            _tracer.add_span(name, acquired, released, "lock")
@@ -0,0 +1,55 @@
+import logging
+import shutil
+
+from bandwidth import parse_size
+from config import load_config
+
+
+def transport_options(config=None, rate_limited=False):
+    """Opções de transporte do yt-dlp montadas a partir do config
+
+    - "concurrent_fragment_downloads": fragmentos DASH/HLS baixados em
+      paralelo (conexões simultâneas por download)
+    - "http_chunk_size": baixa arquivos HTTP em requisições Range desse
+      tamanho, o que contorna o throttling por conexão do YouTube
+    - "external_downloader": "auto", "aria2c" ou "native". O aria2c só é
+      usado para downloads HTTP de arquivo único, que ele divide em várias
+      conexões; fragmentos DASH/HLS continuam com o downloader nativo, que
+      já os baixa em paralelo. Em "auto", o aria2c é usado se estiver
+      instalado e não houver limite de banda ativo (o limite global só
+      controla o downloader nativo).
+
+    Args:
+        config: Configuração (padrão: load_config())
+        rate_limited: Se o limitador de banda global está ativo
+    """
+    config = config or load_config()
+    options = {}
+
+    fragments = int(config.get("concurrent_fragment_downloads") or 1)
+    if fragments > 1:
+        options["concurrent_fragment_downloads"] = fragments
+
+    try:
+        chunk_size = parse_size(config.get("http_chunk_size"))
+    except ValueError as e:
+        logging.warning(f"http_chunk_size inválido no config: {e}")
+        chunk_size = None
+    if chunk_size:
+        options["http_chunk_size"] = int(chunk_size)
+
+    downloader = config.get("external_downloader") or "native"
+    if downloader == "auto":
+        downloader = (
+            "aria2c" if shutil.which("aria2c") and not rate_limited else "native"
+        )
+
+    if downloader != "native":
+        options["external_downloader"] = {"default": "native", "http": downloader}
+        if downloader == "aria2c":
+            connections = str(config.get("aria2c_connections", 8))
+            options["external_downloader_args"] = {
+                "aria2c": ["-x", connections, "-s", connections, "-k", "1M"]
+            }
+
+    return options
@@ -0,0 +1,117 @@
+import sys
+
+# Campos conhecidos de um vídeo extraído, cada um num slot próprio
+FIELDS = (
+    "id",
+    "title",
+    "url",
+    "duration",
+    "uploader",
+    "playlist_title",
+    "playlist_uploader",
+    "is_playlist",
+)
+
+# Campos que se repetem entre vídeos do mesmo lote (mesma playlist, mesmo
+# canal): interná-los faz todas as entradas apontarem para uma só string
+INTERNED_FIELDS = ("uploader", "playlist_title", "playlist_uploader")
+
+_SLOTS = frozenset(FIELDS)
+
+
+def intern_value(value):
+    """Interna strings; outros valores passam sem mudança"""
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+class VideoInfo:
+    """Informações de um vídeo extraído, em formato compacto
+
+    Num lote de dezenas de milhares de vídeos cada dict carrega sua própria
+    tabela de chaves e cópias dos textos da playlist. Aqui os campos
+    conhecidos ficam em slots, os textos repetidos são internados e o resto
+    (priority, filesize...) vai para um dict "extra" criado só quando usado.
+
+    Continua se comportando como o dict de antes (get, [], in, keys, items,
+    dict(video)), então agendador, histórico e daemon não precisam saber a
+    diferença. Campo ausente e campo com valor None são a mesma coisa.
+    """
+
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, **fields):
+        for name in FIELDS:
+            setattr(self, name, None)
+        self.extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data):
+        """Converte um dict de vídeo (um VideoInfo volta sem cópia)"""
+        if isinstance(data, cls):
+            return data
+        return cls(**data)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __getitem__(self, key):
+        if key in _SLOTS:
+            value = getattr(self, key)
+        elif self.extra is not None:
+            value = self.extra.get(key)
+        else:
+            value = None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in _SLOTS:
+            if key in INTERNED_FIELDS:
+                value = intern_value(value)
+            setattr(self, key, value)
+        elif value is None:
+            if self.extra is not None:
+                self.extra.pop(key, None)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def keys(self):
+        keys = [name for name in FIELDS if getattr(self, name) is not None]
+        if self.extra:
+            keys.extend(self.extra)
+        return keys
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (VideoInfo, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"VideoInfo({self.to_dict()!r})"
@@ -0,0 +1,340 @@
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+from config import load_config, load_downloads_history
+from extraction import canonical_video_url
+from main import extract_video_info, merge_duplicate_videos
+
+# Intervalo para reavaliar bateria/rede enquanto as consultas estão pausadas
+PAUSE_RECHECK_INTERVAL = 60
+
+# Variação aleatória do intervalo de cada fonte (±10%), para que fontes com
+# o mesmo intervalo não voltem a coincidir
+INTERVAL_JITTER = 0.1
+
+POWER_SUPPLY_DIR = "/sys/class/power_supply"
+
+# Itens lidos por consulta quando nem a fonte nem o config dizem (uma página)
+DEFAULT_WATCH_NEWEST = 100
+
+_INTERVAL_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_interval(value):
+    """Converte um intervalo ("30m", "6h", "1d", 900) em segundos"""
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = re.fullmatch(r"\s*([\d.]+)\s*([smhd]?)\s*", str(value), re.I)
+        if not match:
+            raise ValueError(f"Intervalo inválido: {value!r}")
+        seconds = float(match.group(1)) * _INTERVAL_UNITS[match.group(2).lower()]
+    if seconds <= 0:
+        raise ValueError(f"Intervalo inválido: {value!r}")
+    return seconds
+
+
+def on_battery(power_supply_dir=POWER_SUPPLY_DIR):
+    """True se a máquina está na bateria (False se não há como saber)"""
+    if sys.platform == "darwin":
+        try:
+            output = subprocess.run(
+                ["pmset", "-g", "batt"], capture_output=True, text=True, timeout=5
+            ).stdout
+        except (OSError, subprocess.SubprocessError):
+            return False
+        return "Battery Power" in output
+
+    if sys.platform == "win32":
+        import ctypes
+
+        class SystemPowerStatus(ctypes.Structure):
+            _fields_ = [
+                ("ACLineStatus", ctypes.c_byte),
+                ("BatteryFlag", ctypes.c_byte),
+                ("BatteryLifePercent", ctypes.c_byte),
+                ("SystemStatusFlag", ctypes.c_byte),
+                ("BatteryLifeTime", ctypes.c_ulong),
+                ("BatteryFullLifeTime", ctypes.c_ulong),
+            ]
+
+        status = SystemPowerStatus()
+        if not ctypes.windll.kernel32.GetSystemPowerStatus(ctypes.byref(status)):
+            return False
+        return status.ACLineStatus == 0
+
+    # Linux: na bateria se há bateria do sistema e nenhuma fonte externa
+    # ligada. Baterias de mouse e teclado sem fio (scope "Device") não
+    # contam, e só tomada (Mains) e USB são fonte externa.
+    try:
+        supplies = os.listdir(power_supply_dir)
+    except OSError:
+        return False
+    has_battery = external_online = False
+    for name in supplies:
+        supply_dir = os.path.join(power_supply_dir, name)
+        if _read_supply(supply_dir, "scope") == "Device":
+            continue
+        kind = _read_supply(supply_dir, "type")
+        if kind == "Battery":
+            has_battery = True
+        elif kind == "Mains" or (kind or "").startswith("USB"):
+            external_online = (
+                external_online or _read_supply(supply_dir, "online") == "1"
+            )
+    return has_battery and not external_online
+
+
+def _read_supply(supply_dir, attribute):
+    """Valor de um atributo de /sys/class/power_supply/<fonte>, ou None"""
+    try:
+        with open(os.path.join(supply_dir, attribute)) as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def on_metered_connection():
+    """True se o NetworkManager marca a conexão como limitada
+
+    Fora do Linux (ou sem NetworkManager) não há como saber: False.
+    """
+    busctl = shutil.which("busctl")
+    if not busctl:
+        return False
+    try:
+        output = subprocess.run(
+            [
+                busctl,
+                "get-property",
+                "org.freedesktop.NetworkManager",
+                "/org/freedesktop/NetworkManager",
+                "org.freedesktop.NetworkManager",
+                "Metered",
+            ],
+            capture_output=True,
+            text=True,
+            timeout=5,
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return False
+    # NMMetered: 1 = sim, 3 = provavelmente sim
+    return output.split()[-1:] in (["1"], ["3"])
+
+
+def watch_sources(config):
+    """Fontes da lista "watch_list" do config, com os padrões aplicados
+
+    Cada entrada é uma URL ou um dict com "url" e, opcionalmente,
+    "interval" ("6h", segundos...), "newest" (só os N primeiros itens;
+    padrão "watch_newest", 0 lê a lista inteira), "output" e
+    "audio_format".
+    """
+    default_newest = config.get("watch_newest", DEFAULT_WATCH_NEWEST)
+    sources = []
+    for entry in config.get("watch_list") or []:
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        sources.append(
+            {
+                **entry,
+                "newest": entry.get("newest", default_newest) or None,
+                "interval": parse_interval(
+                    entry.get("interval", config.get("watch_interval", "6h"))
+                ),
+                "last_poll": None,
+                "next_poll": None,
+                "new_videos": 0,
+            }
+        )
+    return sources
+
+
+class PlaylistWatcher:
+    """Consulta as playlists da lista de observação e baixa os vídeos novos
+
+    Uma única thread faz as consultas, uma de cada vez e com pelo menos
+    "watch_stagger" segundos entre elas, então várias fontes vencidas ao
+    mesmo tempo (na partida ou depois de uma pausa) não viram uma rajada.
+    Cada consulta é uma extração plana (sem abrir cada vídeo) só da
+    primeira página ("newest" itens). Os vídeos já vistos de cada fonte
+    ficam num arquivo próprio ("watch_state_file"), então limpar o
+    histórico não faz a lista inteira ser baixada de novo; vídeos cuja URL
+    está no histórico também são ignorados, e os novos vão para submit.
+    Com "watch_pause_on_battery" / "watch_pause_on_metered", as consultas
+    esperam a máquina voltar à tomada ou a uma rede sem limite.
+    """
+
+    def __init__(self, submit, config=None):
+        """
+        Args:
+            submit: Função (vídeos, fonte) que baixa os vídeos novos pelo
+                caminho normal (ex.: DownloadService.submit no daemon)
+            config: Config a usar (padrão: load_config())
+        """
+        if config is None:
+            config = load_config()
+        self.submit = submit
+        self.sources = watch_sources(config)
+        self.stagger = float(config.get("watch_stagger", 60))
+        self.pause_on_battery = config.get("watch_pause_on_battery", True)
+        self.pause_on_metered = config.get("watch_pause_on_metered", True)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.paused = None
+        self.previous_poll = 0.0
+        self.state_path = config.get("watch_state_file", "watch_state.json")
+        # Fonte -> URLs já vistas (e enviadas) nas consultas anteriores
+        self.seen = self.load_state()
+
+        # Na partida as fontes vencem uma depois da outra, na ordem da lista
+        now = time.time()
+        for number, source in enumerate(self.sources):
+            source["next_poll"] = now + number * self.stagger
+
+    def load_state(self):
+        """Vídeos já vistos por fonte, do arquivo de estado"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"⚠️ Estado da lista de observação inválido: {e}")
+            return {}
+        return {url: set(seen) for url, seen in data.get("seen", {}).items()}
+
+    def save_state(self):
+        """Grava os vídeos já vistos por fonte (escrita atômica)"""
+        if not self.state_path:
+            return
+        with self.lock:
+            data = {"seen": {url: sorted(seen) for url, seen in self.seen.items()}}
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temp_path, self.state_path)
+
+    def pause_reason(self):
+        """Motivo para não consultar agora, ou None"""
+        if self.pause_on_battery and on_battery():
+            return "na bateria"
+        if self.pause_on_metered and on_metered_connection():
+            return "rede limitada"
+        return None
+
+    def poll(self, source):
+        """Consulta uma fonte e envia os vídeos novos; retorna os novos"""
+        videos = merge_duplicate_videos(
+            extract_video_info(source["url"], newest=source.get("newest"))
+        )
+        known = {
+            canonical_video_url(entry["url"])
+            for entry in load_downloads_history()
+            if entry.get("url")
+        }
+        with self.lock:
+            seen = self.seen.setdefault(source["url"], set())
+            new_videos = [
+                video
+                for video in videos
+                if video["url"] not in known and video["url"] not in seen
+            ]
+
+        # Envia antes de marcar como vistos: se submit falhar, os vídeos
+        # continuam novos na próxima consulta
+        if new_videos:
+            logging.info(f"👀 {len(new_videos)} vídeos novos em {source['url']}")
+            self.submit(new_videos, source)
+        else:
+            logging.debug(f"👀 Nada novo em {source['url']}")
+
+        with self.lock:
+            # Vídeos que já estavam no histórico também contam como vistos
+            changed = any(video["url"] not in seen for video in videos)
+            seen.update(video["url"] for video in videos)
+            source["last_poll"] = time.time()
+            source["new_videos"] += len(new_videos)
+        if changed:
+            try:
+                self.save_state()
+            except OSError as e:
+                logging.error(f"❌ Erro ao salvar {self.state_path}: {e}")
+        return new_videos
+
+    def run(self):
+        while self.sources and not self.stop_event.is_set():
+            with self.lock:
+                source = min(self.sources, key=lambda source: source["next_poll"])
+            # A fonte mais atrasada vai primeiro, mas nunca colada na anterior
+            wait = max(source["next_poll"], self.previous_poll + self.stagger)
+            wait -= time.time()
+            if wait > 0:
+                self.stop_event.wait(wait)
+                continue
+
+            reason = self.pause_reason()
+            if reason != self.paused:
+                if reason:
+                    logging.info(
+                        f"⏸️ Consultas da lista de observação pausadas: {reason}"
+                    )
+                else:
+                    logging.info("▶️ Consultas da lista de observação retomadas")
+                self.paused = reason
+            if reason:
+                self.stop_event.wait(PAUSE_RECHECK_INTERVAL)
+                continue
+
+            try:
+                self.poll(source)
+            except Exception as e:
+                logging.error(f"❌ Erro ao consultar {source['url']}: {e}")
+
+            self.previous_poll = time.time()
+            jitter = random.uniform(1 - INTERVAL_JITTER, 1 + INTERVAL_JITTER)
+            with self.lock:
+                source["next_poll"] = self.previous_poll + source["interval"] * jitter
+
+    def start(self):
+        if self.sources and self.thread is None:
+            logging.info(f"👀 Observando {len(self.sources)} playlists")
+            self.thread = threading.Thread(
+                target=self.run, name="playlist-watcher", daemon=True
+            )
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def status(self):
+        """Estado de cada fonte (para a API do daemon)"""
+        with self.lock:
+            return {
+                "paused": self.paused,
+                "sources": [
+                    {
+                        key: source.get(key)
+                        for key in (
+                            "url",
+                            "interval",
+                            "last_poll",
+                            "next_poll",
+                            "new_videos",
+                        )
+                    }
+                    for source in self.sources
+                ],
+            }
@@ -0,0 +1,202 @@
+import concurrent.futures
+import hashlib
+import logging
+import os
+import struct
+import threading
+
+import numpy as np
+
+from audio_processor import check_ffmpeg, stream_pcm
+from config import load_config
+
+# Formato do arquivo de picos: cabeçalho + pares (min, max) em int8
+PEAKS_MAGIC = b"U2WF"
+PEAKS_VERSION = 1
+PEAKS_HEADER = struct.Struct("<4sBI")
+
+DEFAULT_NUM_PEAKS = 1000
+DECODE_SAMPLE_RATE = 8000
+RAW_WINDOW = 80  # Amostras por pico bruto (100 picos por segundo a 8 kHz)
+
+# Pool em segundo plano para geração de picos
+_executor = None
+_executor_lock = threading.RLock()
+_in_flight = {}
+_ffmpeg_available = None
+
+
+def compute_peaks_from_chunks(chunks, num_peaks=DEFAULT_NUM_PEAKS, window=RAW_WINDOW):
+    """Calcula picos min/max a partir de blocos PCM int16
+
+    Cada bloco é reduzido para picos brutos assim que chega, portanto só os
+    picos (e não o PCM) ficam na memória.
+
+    Returns:
+        Tupla (mins, maxs) de arrays int8 com no máximo num_peaks elementos
+    """
+    raw_mins = []
+    raw_maxs = []
+    remainder = np.empty(0, dtype=np.int16)
+
+    for chunk in chunks:
+        data = np.concatenate((remainder, chunk)) if remainder.size else chunk
+        usable = (len(data) // window) * window
+        if usable:
+            blocks = data[:usable].reshape(-1, window)
+            raw_mins.append(blocks.min(axis=1))
+            raw_maxs.append(blocks.max(axis=1))
+        remainder = data[usable:].copy()
+
+    if remainder.size:
+        raw_mins.append(remainder.min(keepdims=True))
+        raw_maxs.append(remainder.max(keepdims=True))
+
+    if not raw_mins:
+        empty = np.zeros(0, dtype=np.int8)
+        return empty, empty.copy()
+
+    mins = np.concatenate(raw_mins)
+    maxs = np.concatenate(raw_maxs)
+
+    # Reduz os picos brutos para a resolução final
+    count = min(num_peaks, len(mins))
+    starts = np.linspace(0, len(mins), count, endpoint=False).astype(np.int64)
+    mins = np.minimum.reduceat(mins, starts)
+    maxs = np.maximum.reduceat(maxs, starts)
+
+    scale = 127.0 / 32768.0
+    mins = np.round(mins.astype(np.float32) * scale).astype(np.int8)
+    maxs = np.round(maxs.astype(np.float32) * scale).astype(np.int8)
+    return mins, maxs
+
+
+def compute_peaks(file_path, num_peaks=DEFAULT_NUM_PEAKS):
+    """Calcula os picos de um arquivo de áudio decodificando em streaming"""
+    chunks = stream_pcm(file_path, sample_rate=DECODE_SAMPLE_RATE)
+    return compute_peaks_from_chunks(chunks, num_peaks)
+
+
+def save_peaks(path, mins, maxs):
+    """Salva os picos em formato binário compacto (escrita atômica)"""
+    interleaved = np.empty(len(mins) * 2, dtype=np.int8)
+    interleaved[0::2] = mins
+    interleaved[1::2] = maxs
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(PEAKS_HEADER.pack(PEAKS_MAGIC, PEAKS_VERSION, len(mins)))
+        file.write(interleaved.tobytes())
+    os.replace(temp_path, path)
+
+
+def load_peaks(path):
+    """Carrega picos salvos por save_peaks, ou None se inválido"""
+    try:
+        with open(path, "rb") as file:
+            header = file.read(PEAKS_HEADER.size)
+            if len(header) != PEAKS_HEADER.size:
+                return None
+            magic, version, count = PEAKS_HEADER.unpack(header)
+            if magic != PEAKS_MAGIC or version != PEAKS_VERSION:
+                return None
+            data = np.frombuffer(file.read(count * 2), dtype=np.int8)
+    except OSError:
+        return None
+
+    if len(data) != count * 2:
+        return None
+    return data[0::2].copy(), data[1::2].copy()
+
+
+def get_cache_dir():
+    """Retorna (criando se necessário) a pasta de cache de waveforms"""
+    cache_dir = load_config().get("waveform_cache_dir", ".waveform_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def peaks_cache_path(audio_path, cache_dir=None):
+    """Caminho do arquivo de picos de uma faixa
+
+    A chave inclui tamanho e data de modificação, então um arquivo
+    substituído gera um novo cache automaticamente.
+    """
+    stat = os.stat(audio_path)
+    key = f"{os.path.abspath(audio_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir or get_cache_dir(), f"{digest}.peaks")
+
+
+def get_cached_peaks(audio_path, cache_dir=None):
+    """Retorna os picos em cache de uma faixa, ou None se ainda não gerados"""
+    try:
+        return load_peaks(peaks_cache_path(audio_path, cache_dir))
+    except OSError:
+        return None
+
+
+def generate_peaks(audio_path, cache_dir=None, num_peaks=DEFAULT_NUM_PEAKS):
+    """Gera e salva os picos de uma faixa (usa o cache se já existir)"""
+    cache_path = peaks_cache_path(audio_path, cache_dir)
+    cached = load_peaks(cache_path)
+    if cached is not None:
+        return cached
+
+    mins, maxs = compute_peaks(audio_path, num_peaks)
+    if len(mins):
+        save_peaks(cache_path, mins, maxs)
+        logging.info(f"Waveform gerado para: {audio_path}")
+    return mins, maxs
+
+
+def schedule_peaks(audio_path, callback=None):
+    """Agenda a geração de picos no pool em segundo plano
+
+    Args:
+        audio_path: Arquivo de áudio
+        callback: Chamado com (audio_path, picos) quando terminar; picos é
+            None em caso de erro
+
+    Returns:
+        Future da geração, ou None se o ffmpeg não estiver disponível
+    """
+    global _executor, _ffmpeg_available
+
+    with _executor_lock:
+        if _ffmpeg_available is None:
+            _ffmpeg_available = check_ffmpeg()
+        if not _ffmpeg_available:
+            logging.debug("FFmpeg não encontrado, waveform não será gerado")
+            return None
+
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="waveform"
+            )
+
+        future = _in_flight.get(audio_path)
+        if future is None:
+            future = _executor.submit(generate_peaks, audio_path)
+            _in_flight[audio_path] = future
+            future.add_done_callback(lambda f: _on_generated(audio_path, f))
+
+    if callback:
+
+        def notify(done_future):
+            peaks = None if done_future.exception() else done_future.result()
+            callback(audio_path, peaks)
+
+        future.add_done_callback(notify)
+
+    return future
+
+
+def _on_generated(audio_path, future):
+    """Remove a geração da lista de pendentes e registra falhas"""
+    with _executor_lock:
+        _in_flight.pop(audio_path, None)
+
+    error = future.exception()
+    if error:
+        logging.warning(f"Erro ao gerar waveform de {audio_path}: {error}")
@@ -0,0 +1,156 @@
+import contextlib
+import json
+import logging
+import threading
+import weakref
+
+# Opções que mudam a cada job. O restante define o "perfil" da instância:
+# threads com o mesmo perfil reaproveitam o mesmo YoutubeDL entre jobs.
+JOB_OPTIONS = ("outtmpl", "format", "progress_hooks", "download_archive")
+
+# Perfis mantidos por thread (o mais antigo é fechado ao passar do limite)
+MAX_PROFILES_PER_THREAD = 4
+
+_local = threading.local()
+
+# O reset usa atributos internos do yt-dlp (versões testadas: ver
+# requirements.txt); se uma versão nova os mudar, avisa uma vez só
+_reset_failure_logged = False
+
+
+class _ThreadInstances:
+    """YoutubeDL de uma thread, por perfil
+
+    Executores criados por lote (download_videos_parallel, extract_stream)
+    encerram as suas threads no fim do lote. Quando a thread termina, o
+    threading.local solta este objeto e o finalizador fecha as instâncias:
+    o pool HTTP é liberado e o cookie jar é gravado. Threads ainda vivas
+    na saída do processo têm as instâncias fechadas pelo atexit do weakref.
+    """
+
+    def __init__(self):
+        self.instances = {}
+        weakref.finalize(self, _close_all, self.instances)
+
+
+def _close_all(instances):
+    while instances:
+        _, ydl = instances.popitem()
+        try:
+            ydl.close()
+        except Exception as e:
+            logging.debug(f"Erro ao fechar YoutubeDL: {e}")
+
+
+def _thread_instances():
+    holder = getattr(_local, "holder", None)
+    if holder is None:
+        holder = _local.holder = _ThreadInstances()
+    return holder.instances
+
+
+def _profile_key(ydl_opts):
+    profile = {key: value for key, value in ydl_opts.items() if key not in JOB_OPTIONS}
+    return json.dumps(profile, sort_keys=True, default=repr)
+
+
+def _load_archive(path):
+    """Lê o arquivo do download_archive como o construtor do yt-dlp faz"""
+    if not path:
+        return set()
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return {line.strip() for line in file}
+    except FileNotFoundError:
+        return set()
+
+
+def _apply_job_options(ydl, ydl_opts):
+    """Reaplica num YoutubeDL existente as opções que o construtor processa"""
+    for key in JOB_OPTIONS:
+        if key in ydl_opts:
+            ydl.params[key] = ydl_opts[key]
+        else:
+            ydl.params.pop(key, None)
+
+    # O yt-dlp normaliza outtmpl, compila o formato, registra os hooks e
+    # carrega o archive no __init__; aqui isso é refeito para o novo job
+    ydl._parse_outtmpl()
+    fmt = ydl.params.get("format")
+    ydl.format_selector = (
+        fmt if fmt in (None, "-") or callable(fmt) else ydl.build_format_selector(fmt)
+    )
+    ydl._progress_hooks = []
+    for hook in ydl.params.get("progress_hooks") or []:
+        ydl.add_progress_hook(hook)
+    ydl.archive = _load_archive(ydl.params.get("download_archive"))
+
+    # Estado que o yt-dlp acumula por execução
+    ydl._download_retcode = 0
+    ydl._playlist_level = 0
+    ydl._playlist_urls.clear()
+
+
+def _log_reset_failure(error):
+    global _reset_failure_logged
+    if not _reset_failure_logged:
+        _reset_failure_logged = True
+        logging.warning(
+            f"⚠️ Esta versão do yt-dlp não permite reaproveitar o YoutubeDL "
+            f"({error}); criando uma instância por job"
+        )
+
+
+def _release(ydl):
+    """Solta as referências do job anterior (hooks guardam closures)"""
+    ydl._progress_hooks = []
+    ydl.params["progress_hooks"] = []
+
+
+@contextlib.contextmanager
+def reused_youtube_dl(ydl_opts, factory):
+    """Usa o YoutubeDL desta thread para o perfil de ydl_opts
+
+    A instância (com extratores inicializados, cookies e o pool de conexões
+    HTTP com keep-alive) é criada uma vez por thread e perfil e reconfigurada
+    a cada job. Se o job levantar uma exceção, a instância é descartada.
+
+    Args:
+        ydl_opts: Opções do job, como seriam passadas ao YoutubeDL
+        factory: Função que cria um YoutubeDL a partir das opções
+    """
+    instances = _thread_instances()
+    key = _profile_key(ydl_opts)
+    ydl = instances.pop(key, None)
+    if ydl is None:
+        ydl = factory(dict(ydl_opts))
+        if len(instances) >= MAX_PROFILES_PER_THREAD:
+            oldest = next(iter(instances))
+            instances.pop(oldest).close()
+    else:
+        try:
+            _apply_job_options(ydl, ydl_opts)
+        except AttributeError as e:
+            _log_reset_failure(e)
+            ydl.close()
+            ydl = factory(dict(ydl_opts))
+
+    try:
+        yield ydl
+    except BaseException:
+        ydl.close()
+        raise
+    else:
+        _release(ydl)
+        # Reinsere no fim do dicionário (ordem de uso mais recente)
+        instances[key] = ydl
+
+
+def close_thread_instances():
+    """Fecha já os YoutubeDL reaproveitados pela thread atual
+
+    Sem esta chamada, eles são fechados quando a thread termina.
+    """
+    holder = getattr(_local, "holder", None)
+    if holder is not None:
+        _close_all(holder.instances)